@@ -0,0 +1,125 @@
+# analysis_cache.py
+"""
+Reuse of advisor analyses across near-identical judgments of the same scenario.
+
+Many judges write essentially the same ruling ("split the cow evenly"). With the cache
+enabled, each scenario keeps the judgments it has analyzed in a MinHash/LSH index over
+word pairs; a new judgment whose word-pair overlap with a cached one (exact Jaccard,
+checked after the LSH lookup) reaches the threshold is given that analysis, with the
+earlier judge's name replaced by the new judge's. Analyses made against a different
+Advisor's brief, or by a different model, are kept apart. Everything is in memory, per process.
+"""
+import os
+import re
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+from models import Analysis
+from scenario_similarity import SimilarityIndex, minhash_signature, shingles
+
+logger = logging.getLogger(__name__)
+
+# Set to any value to enable the cache
+ANALYSIS_CACHE = bool(os.getenv("ANALYSIS_CACHE"))
+# Word-pair Jaccard similarity (0–1) at or above which a cached analysis is reused
+ANALYSIS_CACHE_THRESHOLD = float(os.getenv("ANALYSIS_CACHE_THRESHOLD", "0.85"))
+ANALYSIS_CACHE_SCENARIOS = int(os.getenv("ANALYSIS_CACHE_SCENARIOS", "200"))
+ANALYSIS_CACHE_PER_SCENARIO = int(os.getenv("ANALYSIS_CACHE_PER_SCENARIO", "50"))
+# Judgments are short, so they are compared on word pairs rather than scenario-sized triples
+JUDGMENT_SHINGLE_SIZE = 2
+
+def _scenario_key(scenario_text, brief=None, model=None):
+    """Analyses are shared only between calls with the same scenario, brief text and model."""
+    key = "\0".join([scenario_text.strip(), brief or "", model or ""])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def personalize(text, old_name, new_name):
+    """Replaces whole-word mentions of one judge's name with another's."""
+    if not old_name or old_name == new_name:
+        return text
+    return re.sub(rf"\b{re.escape(old_name)}\b", lambda _: new_name, text)
+
+class _ScenarioEntries:
+    def __init__(self, capacity):
+        self.index = SimilarityIndex(capacity)
+        # entry_id -> (shingles, player_name, analysis, tokens); pruned with the index
+        self.entries = {}
+
+class AnalysisCache:
+    """Per-scenario cache of analyses keyed by judgment similarity, with hit-rate and token-savings counters."""
+
+    def __init__(self, enabled=ANALYSIS_CACHE, threshold=ANALYSIS_CACHE_THRESHOLD,
+                 max_scenarios=ANALYSIS_CACHE_SCENARIOS, per_scenario=ANALYSIS_CACHE_PER_SCENARIO):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_scenarios = max_scenarios
+        self.per_scenario = per_scenario
+        self._scenarios = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.tokens_saved = 0
+
+    def _entries(self, scenario_text, create, brief=None, model=None):
+        key = _scenario_key(scenario_text, brief, model)
+        with self._lock:
+            entries = self._scenarios.get(key)
+            if entries is None and create:
+                entries = self._scenarios[key] = _ScenarioEntries(self.per_scenario)
+                while len(self._scenarios) > self.max_scenarios:
+                    self._scenarios.popitem(last=False)
+            if entries is not None:
+                self._scenarios.move_to_end(key)
+            return entries
+
+    def get(self, scenario_text, judgment, player_name, brief=None, model=None):
+        """
+        A cached analysis of a near-identical judgment of this scenario (with the same brief
+        and model), personalized for player_name, or None.
+        """
+        if not self.enabled:
+            return None
+        entries = self._entries(scenario_text, create=False, brief=brief, model=model)
+        match = None
+        if entries is not None:
+            _, entry_id = entries.index.most_similar(judgment, minhash_signature(judgment, JUDGMENT_SHINGLE_SIZE))
+            match = entries.entries.get(entry_id)
+            if match is not None and _jaccard(match[0], shingles(judgment, JUDGMENT_SHINGLE_SIZE)) < self.threshold:
+                match = None
+        with self._lock:
+            self.lookups += 1
+            if match is not None:
+                self.hits += 1
+                self.tokens_saved += match[3]
+        if match is None:
+            return None
+        _, cached_player, analysis, tokens = match
+        logger.info("analysis_cache hit player=%s tokens_saved=%d", player_name, tokens)
+        return Analysis(**{field: personalize(value, cached_player, player_name) for field, value in analysis.model_dump().items()})
+
+    def put(self, scenario_text, judgment, player_name, analysis: Analysis, tokens=0, brief=None, model=None):
+        """Caches an analysis; tokens is what the call cost, counted as saved on every reuse."""
+        if not self.enabled:
+            return
+        entries = self._entries(scenario_text, create=True, brief=brief, model=model)
+        entry_id = entries.index.add(judgment, minhash_signature(judgment, JUDGMENT_SHINGLE_SIZE))
+        with self._lock:
+            entries.entries[entry_id] = (shingles(judgment, JUDGMENT_SHINGLE_SIZE), player_name, analysis, tokens)
+            if len(entries.entries) > self.per_scenario:
+                for stale in [e for e in entries.entries if e not in entries.index]:
+                    del entries.entries[stale]
+
+    def report(self):
+        """Counters for display: lookups, hits, hit_rate, tokens_saved, scenarios."""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "tokens_saved": self.tokens_saved,
+                "scenarios": len(self._scenarios),
+            }
@@ -0,0 +1,335 @@
+# api.py
+"""
+Headless JSON API for playing the game without the Streamlit UI (LMS integrations, bots).
+
+    uvicorn api:app --workers 4
+
+Endpoints:
+    POST /classrooms                     {"difficulty"} -> Classroom (share its code with the class)
+    POST /cases                          {"player_name", "difficulty", "classroom_code"?} -> CaseState
+    GET  /cases/{case_id}                -> CaseState
+    POST /cases/{case_id}/questions      {"character", "question"} -> {"response", "questions_remaining"}
+    POST /cases/{case_id}/judgment       {"judgment"} -> JudgmentResult (the case is archived)
+    GET  /archive?limit=20&offset=0      -> newest archived cases, summarised
+    GET  /archive/{case_id}              -> CaseRecord
+    GET  /players/{player_name}          -> PlayerProfile
+    GET  /leaderboard?limit=20           -> [PlayerProfile]
+    GET  /health
+
+Cases in progress are kept as JSON files in API_CASES_DIR, so any worker can serve any
+request; a lock file beside each draft keeps concurrent requests on one case in order. LLM calls and file I/O run in a bounded thread pool; the event loop never blocks.
+Set API_TOKEN to require "Authorization: Bearer <token>" on every endpoint but /health.
+"""
+import os
+import re
+import html
+import json
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+from weakref import WeakValueDictionary
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+import anyio
+from pydantic import ValidationError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import file_utils
+# Imported for its save hook (see file_utils.register_save_hook); archive_watcher and player_profiles register theirs below
+import archive_analytics  # noqa: F401
+import llm_integration
+from classroom import classrooms
+from case_view import load_case_view
+from archive_watcher import get_archive_index
+from llm_scheduler import bind_session
+from player_profiles import load_profile, get_leaderboard
+from models import (CaseRecord, CaseState, Classroom, InquiryEntry, JudgmentRequest, JudgmentResult,
+                    NewCaseRequest, NewClassroomRequest, Scenario, WitnessQuestion, WitnessResponse, Analysis)
+
+API_TOKEN = os.getenv("API_TOKEN")
+API_CASES_DIR = os.getenv("API_CASES_DIR", "api_cases")
+# Threads available for blocking work (LLM calls, disk) per worker process
+API_THREADS = int(os.getenv("API_THREADS", "64"))
+MAX_PAGE_SIZE = 100
+QUESTIONS_PER_CASE = 3
+SAFE_CASE_ID = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+class ApiError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+def _sanitize(text, max_length):
+    """Same cleaning as the UI's sanitize_input: trim, cap the length, HTML-escape."""
+    return html.escape(text.strip()[:max_length])
+
+def _json(model, status_code=200):
+    return JSONResponse(model.model_dump(mode="json"), status_code=status_code)
+
+def endpoint(handler):
+    """
+    Wraps a handler with bearer-token auth and maps errors to JSON {"error": ...} responses.
+    LLM calls made for the request share the scheduler's slots per case (or per client).
+    """
+    @functools.wraps(handler)
+    async def wrapper(request):
+        if API_TOKEN and request.headers.get("authorization") != f"Bearer {API_TOKEN}":
+            return JSONResponse({"error": "Unauthorized."}, status_code=401)
+        session = request.path_params.get("case_id") or (request.client.host if request.client else None)
+        try:
+            with bind_session(session):
+                return await handler(request)
+        except ApiError as e:
+            return JSONResponse({"error": e.message}, status_code=e.status_code)
+        except ValidationError as e:
+            return JSONResponse({"error": "Invalid request.", "details": e.errors(include_url=False, include_context=False)}, status_code=422)
+        except json.JSONDecodeError:
+            return JSONResponse({"error": "Request body must be JSON."}, status_code=400)
+    return wrapper
+
+async def _body(request, schema):
+    return schema.model_validate(json.loads(await request.body() or b"null"))
+
+def _llm_result(result, expected):
+    if isinstance(result, expected):
+        return result
+    message = result.get("error", "Unexpected response.") if isinstance(result, dict) else "Unexpected response."
+    raise ApiError(502, f"The Oracle could not answer: {message}")
+
+# --- Cases in progress ---
+
+def _case_id(case_id):
+    if not SAFE_CASE_ID.match(case_id):
+        raise ApiError(404, "Unknown case.")
+    return case_id
+
+def _draft_path(case_id):
+    return os.path.join(API_CASES_DIR, f"{case_id}.json")
+
+def _load_state(case_id):
+    try:
+        with open(_draft_path(_case_id(case_id)), "r", encoding="utf-8") as f:
+            return CaseState.model_validate_json(f.read())
+    except FileNotFoundError:
+        raise ApiError(404, "Unknown case, or its judgment has already been given.")
+
+def _save_state(state):
+    os.makedirs(API_CASES_DIR, exist_ok=True)
+    file_utils.atomic_write_text(_draft_path(state.case_id), state.model_dump_json(), fsync=False)
+
+# One lock per case in this process, so concurrent requests on a case apply in order
+_case_locks = WeakValueDictionary()
+
+def _lock_path(case_id):
+    return os.path.join(API_CASES_DIR, f".{case_id}.lock")
+
+def _lock_case_file(case_id):
+    """Opens and flock()s the case's lock file next to its draft; see _unlock_case_file."""
+    os.makedirs(API_CASES_DIR, exist_ok=True)
+    f = open(_lock_path(case_id), "a")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+def _unlock_case_file(case_id, f):
+    """
+    Releases a case's lock. Once the case has no draft (it was archived, or never existed)
+    the lock file is deleted first, while still held: a request already waiting on it then
+    finds the draft gone, and lock files do not pile up.
+    """
+    try:
+        if not os.path.exists(_draft_path(case_id)):
+            os.remove(_lock_path(case_id))
+    except FileNotFoundError:
+        pass
+    finally:
+        f.close()
+
+@asynccontextmanager
+async def _case_lock(case_id):
+    """
+    Serializes a case's read-modify-write across requests: an asyncio lock within this worker
+    and, where fcntl is available, a file lock across workers (uvicorn --workers N).
+    """
+    case_id = _case_id(case_id)
+    lock = _case_locks.get(case_id)
+    if lock is None:
+        lock = _case_locks[case_id] = asyncio.Lock()
+    async with lock:
+        if fcntl is None:
+            yield
+            return
+        # flock blocks, so it is taken in the thread pool; one waiter per case per worker
+        f = await run_in_threadpool(_lock_case_file, case_id)
+        try:
+            yield
+        finally:
+            await run_in_threadpool(_unlock_case_file, case_id, f)
+
+@endpoint
+async def new_classroom(request):
+    body = await _body(request, NewClassroomRequest)
+    classroom = _llm_result(await run_in_threadpool(classrooms.create, body.difficulty), Classroom)
+    return _json(classroom, status_code=201)
+
+@endpoint
+async def new_case(request):
+    body = await _body(request, NewCaseRequest)
+    player_name = _sanitize(body.player_name, 32)
+    if not player_name:
+        raise ApiError(422, "A Judge must have a valid name.")
+    difficulty, classroom_code = body.difficulty, None
+    if body.classroom_code:
+        classroom = await run_in_threadpool(classrooms.join, body.classroom_code, player_name)
+        if classroom is None:
+            raise ApiError(404, "No classroom has that code.")
+        scenario, difficulty, classroom_code = classroom.scenario, classroom.difficulty, classroom.code
+    else:
+        scenario = _llm_result(await run_in_threadpool(llm_integration.start_case_scenario, player_name, difficulty), Scenario)
+    state = CaseState(case_id=file_utils.generate_case_id(), player_name=player_name, difficulty=difficulty,
+                      scenario=scenario, questions_remaining=QUESTIONS_PER_CASE, classroom_code=classroom_code)
+    await run_in_threadpool(_save_state, state)
+    return _json(state, status_code=201)
+
+@endpoint
+async def get_case(request):
+    return _json(await run_in_threadpool(_load_state, request.path_params["case_id"]))
+
+@endpoint
+async def ask_witness(request):
+    body = await _body(request, WitnessQuestion)
+    case_id = request.path_params["case_id"]
+    question = _sanitize(body.question, 500)
+    if not question:
+        raise ApiError(422, "The King must speak his mind. Please enter a question.")
+    async with _case_lock(case_id):
+        state = await run_in_threadpool(_load_state, case_id)
+        if body.character not in state.scenario.characters:
+            raise ApiError(422, f"{body.character} is not part of this case.")
+        if state.questions_remaining <= 0:
+            raise ApiError(409, "You have exhausted your inquiries for this case.")
+        response = _llm_result(await run_in_threadpool(
+            llm_integration.get_witness_response_with_llm, state.scenario.highlighted_scenario, body.character,
+            question, history=state.inquiry_history, difficulty=state.difficulty
+        ), WitnessResponse)
+        state.inquiry_history.append(InquiryEntry(character=body.character, question=question, response=response.response))
+        state.questions_remaining -= 1
+        await run_in_threadpool(_save_state, state)
+    return JSONResponse({"response": response.response, "questions_remaining": state.questions_remaining})
+
+def _archive(state, judgment, analysis):
+    case_record = CaseRecord(
+        case_id=state.case_id,
+        player_name=state.player_name,
+        difficulty=state.difficulty,
+        scenario=state.scenario.highlighted_scenario,
+        inquiry_history=state.inquiry_history,
+        judgment=judgment,
+        analysis=analysis.highlighted_analysis,
+    )
+    saved = file_utils.save_case(case_record)
+    if saved:
+        os.remove(_draft_path(state.case_id))
+    return saved
+
+@endpoint
+async def submit_judgment(request):
+    body = await _body(request, JudgmentRequest)
+    case_id = request.path_params["case_id"]
+    judgment = _sanitize(body.judgment, 1000)
+    if not judgment:
+        raise ApiError(422, "An empty or invalid scroll offers no wisdom. Please pen your judgment.")
+    async with _case_lock(case_id):
+        state = await run_in_threadpool(_load_state, case_id)
+        brief = await run_in_threadpool(classrooms.brief, state.classroom_code) if state.classroom_code else None
+        analysis = _llm_result(await run_in_threadpool(
+            llm_integration.analyze_judgment_with_llm, judgment, state.scenario.highlighted_scenario,
+            state.player_name, difficulty=state.difficulty, advisor_brief=brief
+        ), Analysis)
+        saved = await run_in_threadpool(_archive, state, judgment, analysis)
+    result = JudgmentResult(case_id=case_id, analysis=analysis.analysis, highlighted_analysis=analysis.highlighted_analysis, saved=saved)
+    return _json(result)
+
+# --- Archive queries ---
+
+def _page(request, default=20):
+    try:
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.query_params.get("limit", default))))
+        offset = max(0, int(request.query_params.get("offset", 0)))
+    except ValueError:
+        raise ApiError(422, "limit and offset must be integers.")
+    return limit, offset
+
+def _archive_page(limit, offset):
+    rows = []
+    for filename in get_archive_index().cases()[offset:offset + limit]:
+        view = load_case_view(filename)
+        if view is not None:
+            rows.append({"case_id": view.case_id, "date": view.date, "player_name": view.player_name,
+                         "difficulty": view.difficulty, "questions": len(view.inquiry_history)})
+    return rows
+
+@endpoint
+async def list_archive(request):
+    limit, offset = _page(request)
+    return JSONResponse({"cases": await run_in_threadpool(_archive_page, limit, offset), "limit": limit, "offset": offset})
+
+@endpoint
+async def get_archived_case(request):
+    case_id = _case_id(request.path_params["case_id"])
+    case_record = await run_in_threadpool(file_utils.load_case, file_utils.case_filename(case_id))
+    if case_record is None:
+        raise ApiError(404, "No such case in the royal archives.")
+    return _json(case_record)
+
+@endpoint
+async def get_player(request):
+    profile = await run_in_threadpool(load_profile, request.path_params["player_name"])
+    if profile is None:
+        raise ApiError(404, "This judge has not resolved any cases.")
+    return _json(profile)
+
+@endpoint
+async def leaderboard(request):
+    limit, _ = _page(request)
+    profiles = await run_in_threadpool(lambda: get_leaderboard().top(limit))
+    return JSONResponse([profile.model_dump(mode="json") for profile in profiles])
+
+async def health(request):
+    return JSONResponse({"status": "ok", "llm": llm_integration.circuit_breaker.state,
+                         "llm_queue": llm_integration.llm_scheduler.report()})
+
+@asynccontextmanager
+async def lifespan(app):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+    yield
+
+app = Starlette(
+    routes=[
+        Route("/classrooms", new_classroom, methods=["POST"]),
+        Route("/cases", new_case, methods=["POST"]),
+        Route("/cases/{case_id}", get_case, methods=["GET"]),
+        Route("/cases/{case_id}/questions", ask_witness, methods=["POST"]),
+        Route("/cases/{case_id}/judgment", submit_judgment, methods=["POST"]),
+        Route("/archive", list_archive, methods=["GET"]),
+        Route("/archive/{case_id}", get_archived_case, methods=["GET"]),
+        Route("/players/{player_name}", get_player, methods=["GET"]),
+        Route("/leaderboard", leaderboard, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("api:app", host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")),
+                workers=int(os.getenv("API_WORKERS", "1")))
@@ -1,13 +1,26 @@
 # app.py
 import streamlit as st
 import os
-from llm_integration import OPENAI_API_KEY
-from file_utils import list_past_cases
-from ui.styles import inject_custom_css
-from ui.welcome import display_welcome
+import logging
+from llm_integration import OPENAI_API_KEY, analysis_cache, llm_scheduler
+from archive_watcher import get_archive_index
+from ui.styles import inject_custom_css, fragment
+from ui.welcome import display_welcome, return_to_welcome
 from ui.scenario import display_scenario_and_task
-from ui.analysis import display_ai_analysis
+from ui.analysis import display_ai_analysis, resume_case_from_url
 from ui.archives import display_archives
+from ui.stats import display_stats
+from ui.leaderboard import display_leaderboard
+from player_profiles import load_profile
+from session_budget import session_registry, state_report, touch_current_session, SWEEP_INTERVAL_SECONDS
+from token_budget import prompt_stats
+from rerun_profiler import rerun_profiler
+
+# Set LOG_LEVEL=INFO to see per-call decisions such as model_policy's tier choices
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
+
+# Times each phase of this rerun when RERUN_PROFILE is set; see rerun_profiler.py
+rerun_profiler.begin()
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -17,7 +30,8 @@ st.set_page_config(
 )
 
 # --- Inject CSS ---
-inject_custom_css()
+with rerun_profiler.phase("inject_custom_css"):
+    inject_custom_css()
 
 # --- Session State Initialization ---
 def init_session_state():
@@ -49,55 +63,129 @@ def init_session_state():
         st.session_state.difficulty = "Moderate"
     if "selected_archive_case" not in st.session_state:
         st.session_state.selected_archive_case = None
+    if "classroom_code" not in st.session_state:
+        st.session_state.classroom_code = None
+
+with rerun_profiler.phase("init_session_state"):
+    init_session_state()
+
+# --- Session Memory Budget ---
+# Caps this session's stored case text, restores it if it was evicted while idle,
+# and periodically marks other idle sessions for eviction.
+with rerun_profiler.phase("session_budget"):
+    touch_current_session()
+
+@fragment(run_every=SWEEP_INTERVAL_SECONDS)
+def session_heartbeat():
+    # Runs in this session's own thread even while the judge is away, so a session marked
+    # idle moves its case state to disk itself; it does not count as activity
+    touch_current_session(activity=False)
 
-init_session_state()
+session_heartbeat()
+
+# A reload or restart lands in a fresh session; ?case= brings back a case awaiting its analysis
+with rerun_profiler.phase("resume_case"):
+    resume_case_from_url()
 
 # --- Main Application Flow ---
 if not st.session_state.api_key_valid and st.session_state.game_stage != "welcome":
     st.session_state.game_stage = "welcome"
 
 if st.session_state.game_stage == "welcome":
-    display_welcome()
+    with rerun_profiler.phase("display_welcome"):
+        display_welcome()
 elif st.session_state.game_stage == "scenario_presented":
-    display_scenario_and_task()
+    with rerun_profiler.phase("display_scenario_and_task"):
+        display_scenario_and_task()
 elif st.session_state.game_stage == "judgment_submitted":
-    display_ai_analysis()
+    with rerun_profiler.phase("display_ai_analysis"):
+        display_ai_analysis()
 elif st.session_state.game_stage == "archives":
-    display_archives()
+    with rerun_profiler.phase("display_archives"):
+        display_archives()
+elif st.session_state.game_stage == "stats":
+    with rerun_profiler.phase("display_stats"):
+        display_stats()
+elif st.session_state.game_stage == "leaderboard":
+    with rerun_profiler.phase("display_leaderboard"):
+        display_leaderboard()
 else:
     st.error("An unexpected error occurred in the game flow. Resetting.")
     st.session_state.game_stage = "welcome"
     st.rerun()
 
 # --- Sidebar ---
-st.sidebar.markdown('<div class="sidebar-title" role="heading" aria-level="2">Game Panel</div>', unsafe_allow_html=True)
-if st.session_state.player_name:
-    st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Judge Name">Judge: <b>{st.session_state.judge_name}</b></div>', unsafe_allow_html=True)
-    st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Difficulty">Difficulty: <b>{st.session_state.difficulty}</b></div>', unsafe_allow_html=True)
-    st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Current Stage">Current Stage: <b>{st.session_state.game_stage.replace("_", " ").title()}</b></div>', unsafe_allow_html=True)
+def render_sidebar():
+    st.sidebar.markdown('<div class="sidebar-title" role="heading" aria-level="2">Game Panel</div>', unsafe_allow_html=True)
+    if st.session_state.player_name:
+        st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Judge Name">Judge: <b>{st.session_state.judge_name}</b></div>', unsafe_allow_html=True)
+        st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Difficulty">Difficulty: <b>{st.session_state.difficulty}</b></div>', unsafe_allow_html=True)
+        if st.session_state.classroom_code:
+            st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Classroom">Classroom: <b>{st.session_state.classroom_code}</b></div>', unsafe_allow_html=True)
+        st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Current Stage">Current Stage: <b>{st.session_state.game_stage.replace("_", " ").title()}</b></div>', unsafe_allow_html=True)
+        profile = load_profile(st.session_state.player_name)
+        if profile:
+            mix = ", ".join(f"{d}: {n}" for d, n in sorted(profile.difficulties.items()))
+            st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Judge Record">Your Record: <b>{profile.cases}</b> cases<br>{mix}<br>Avg. questions: <b>{profile.avg_questions:.1f}</b><br>Avg. judgment: <b>{profile.avg_judgment_length:.0f}</b> chars</div>', unsafe_allow_html=True)
     
-    if st.session_state.game_stage != "archives":
-        st.sidebar.markdown('<div class="sidebar-btn">', unsafe_allow_html=True)
-        if st.sidebar.button("📜 View Royal Archives", key="view_archives_btn", use_container_width=True):
-            st.session_state.game_stage = "archives"
-            st.rerun()
-        st.sidebar.markdown('</div>', unsafe_allow_html=True)
+        if st.session_state.game_stage != "archives":
+            st.sidebar.markdown('<div class="sidebar-btn">', unsafe_allow_html=True)
+            if st.sidebar.button("📜 View Royal Archives", key="view_archives_btn", use_container_width=True):
+                st.session_state.game_stage = "archives"
+                st.rerun()
+            st.sidebar.markdown('</div>', unsafe_allow_html=True)
+
+        if st.session_state.game_stage != "stats":
+            if st.sidebar.button("📊 Royal Statistics", key="view_stats_btn", use_container_width=True):
+                st.session_state.game_stage = "stats"
+                st.rerun()
+
+        if st.session_state.game_stage != "leaderboard":
+            if st.sidebar.button("🏆 Leaderboard", key="view_leaderboard_btn", use_container_width=True):
+                st.session_state.game_stage = "leaderboard"
+                st.rerun()
     
-    if st.sidebar.button("🔄 Reset Game", key="reset_game_btn", use_container_width=True):
-        st.session_state.game_stage = "welcome"
-        st.session_state.player_name = ""
-        st.session_state.current_scenario = None
-        st.session_state.player_judgment = ""
-        st.session_state.ai_analysis = None
-        st.session_state.current_case_id = None
-        st.rerun()
-else:
-    st.sidebar.markdown('<div class="sidebar-card" role="region" aria-label="Awaiting Judge">Awaiting Judge\'s arrival.</div>', unsafe_allow_html=True)
-
-resolved_cases_count = len([f for f in os.listdir('past_cases') if f.startswith('case_')]) if os.path.exists('past_cases') else 0
-st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Cases Resolved">Cases Resolved: <b>{resolved_cases_count}</b></div>', unsafe_allow_html=True)
-st.sidebar.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
-st.sidebar.markdown('<div class="sidebar-card" role="region" aria-label="How to Play">How to Play:<br><ul><li>Enter your name to begin.</li><li>Read the case and submit your judgment.</li><li>Review the Royal Advisor\'s analysis.</li><li>Try as many cases as you wish!</li></ul></div>', unsafe_allow_html=True)
-st.sidebar.markdown('<div class="sidebar-card" role="region" aria-label="Powered by OpenAI">Powered by <b>OpenAI</b></div>', unsafe_allow_html=True)
-if not st.session_state.api_key_valid:
-    st.sidebar.markdown('<div class="sidebar-critical" role="alert" aria-label="API Key Missing">API Key Missing!</div>', unsafe_allow_html=True)
+        if st.sidebar.button("🔄 Reset Game", key="reset_game_btn", use_container_width=True):
+            return_to_welcome()
+            st.rerun()
+    else:
+        st.sidebar.markdown('<div class="sidebar-card" role="region" aria-label="Awaiting Judge">Awaiting Judge\'s arrival.</div>', unsafe_allow_html=True)
+
+    with rerun_profiler.phase("sidebar.case_count"):
+        resolved_cases_count = get_archive_index().count
+    st.sidebar.markdown(f'<div class="sidebar-card" role="region" aria-label="Cases Resolved">Cases Resolved: <b>{resolved_cases_count}</b></div>', unsafe_allow_html=True)
+    st.sidebar.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
+    st.sidebar.markdown('<div class="sidebar-card" role="region" aria-label="How to Play">How to Play:<br><ul><li>Enter your name to begin.</li><li>Read the case and submit your judgment.</li><li>Review the Royal Advisor\'s analysis.</li><li>Try as many cases as you wish!</li></ul></div>', unsafe_allow_html=True)
+    st.sidebar.markdown('<div class="sidebar-card" role="region" aria-label="Powered by OpenAI">Powered by <b>OpenAI</b></div>', unsafe_allow_html=True)
+    if os.getenv("SHOW_SESSION_STATS"):
+        with st.sidebar.expander("Session Memory"):
+            sizes, total = state_report(st.session_state)
+            st.markdown(f"This session: **{total / 1024:.1f} KB**")
+            st.table([{"key": key, "KB": round(size / 1024, 1)} for key, size in sizes[:8]])
+            sessions = session_registry.report()
+            st.markdown(f"Tracked sessions: **{len(sessions)}**, total **{sum(r[1] for r in sessions) / 1024:.1f} KB**")
+        with st.sidebar.expander("LLM Queue"):
+            st.table([{"class": name, **{k: round(v, 1) for k, v in row.items()}} for name, row in llm_scheduler.report().items()])
+        with st.sidebar.expander("Prompt Tokens"):
+            st.table([{"task": task, **{k: round(v, 1) for k, v in row.items()}} for task, row in prompt_stats.report().items()])
+        if analysis_cache.enabled:
+            with st.sidebar.expander("Analysis Cache"):
+                report = analysis_cache.report()
+                st.markdown(f"Hit rate: **{report['hit_rate']:.0%}** ({report['hits']} of {report['lookups']})<br>"
+                            f"Tokens saved: **{report['tokens_saved']}**<br>Scenarios cached: **{report['scenarios']}**", unsafe_allow_html=True)
+    if not st.session_state.api_key_valid:
+        st.sidebar.markdown('<div class="sidebar-critical" role="alert" aria-label="API Key Missing">API Key Missing!</div>', unsafe_allow_html=True)
+
+with rerun_profiler.phase("sidebar"):
+    render_sidebar()
+
+# --- Developer Panel (RERUN_PROFILE) ---
+if rerun_profiler.enabled:
+    rerun_profiler.end()
+    with st.sidebar.expander("Rerun Profile"):
+        st.table(rerun_profiler.summary())
+        for rerun in rerun_profiler.slowest()[:3]:
+            st.markdown(f"**{1000 * rerun.total:.0f} ms** at {rerun.started_at} ({rerun.outcome})")
+            st.code(rerun.profile_text(), language=None)
+        if st.button("Dump profiles to disk", key="dump_rerun_profiles_btn"):
+            st.success(f"Written to {rerun_profiler.dump()}")
@@ -0,0 +1,225 @@
+# archive_analytics.py
+import os
+import json
+import datetime
+import threading
+from array import array
+import numpy as np
+import file_utils
+import case_view
+
+ANALYTICS_LOG = "_analytics.jsonl"
+UNKNOWN = "Unknown"
+
+def summarize_case(case_record):
+    """Reduces a CaseRecord (or CaseView) to the flat summary row stored in the analytics log."""
+    return {
+        "case_id": case_record.case_id,
+        "date": case_record.date,
+        "judge": case_record.player_name,
+        "difficulty": case_record.difficulty,
+        "judgment_len": len(case_record.judgment),
+        "questions": len(case_record.inquiry_history),
+        "characters": [entry.character for entry in case_record.inquiry_history],
+    }
+
+def record_case(case_record):
+    """Appends a case summary to the analytics log. Runs as a save hook; O(1) per case."""
+    cases_dir = file_utils.PAST_CASES_DIR
+    if not os.path.exists(os.path.join(cases_dir, ANALYTICS_LOG)):
+        # First save since analytics was introduced: summarise the whole archive, this case included.
+        rebuild_log()
+        return True
+    line = json.dumps(summarize_case(case_record), ensure_ascii=False) + "\n"
+    try:
+        # A single O_APPEND write keeps lines intact when several processes save at once.
+        with open(os.path.join(cases_dir, ANALYTICS_LOG), "a", encoding="utf-8") as f:
+            f.write(line)
+        return True
+    except (IOError, OSError) as e:
+        print(f"Error recording analytics for case {case_record.case_id}: {e}")
+        return False
+
+def _day_ordinal(date_text):
+    try:
+        return datetime.date(int(date_text[0:4]), int(date_text[5:7]), int(date_text[8:10])).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+class _Dictionary:
+    """Interns strings to dense integer codes for the categorical columns."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class ArchiveAnalytics:
+    """
+    Columnar summary of the archive. Each case is one row across typed arrays, with
+    judges, difficulties and characters dictionary-encoded. Rows are appended from the
+    analytics log incrementally; group-by queries run as numpy bincounts over the columns.
+    A re-saved case_id supersedes its earlier row.
+    """
+
+    def __init__(self, cases_dir):
+        self.cases_dir = cases_dir
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.judges = _Dictionary()
+        self.difficulties = _Dictionary()
+        self.characters = _Dictionary()
+        self.day = array("i")
+        self.judge = array("i")
+        self.difficulty = array("i")
+        self.judgment_len = array("i")
+        self.questions = array("i")
+        self.active = array("b")
+        # Inquiry table: one row per question, pointing back at its case row
+        self.inquiry_case = array("i")
+        self.inquiry_character = array("i")
+        self._rows = {}
+        self._offset = 0
+        # (device, inode) of the log the offset refers to
+        self._log_id = None
+
+    @property
+    def log_path(self):
+        return os.path.join(self.cases_dir, ANALYTICS_LOG)
+
+    def add(self, summary):
+        row = len(self.day)
+        previous = self._rows.get(summary["case_id"])
+        if previous is not None:
+            self.active[previous] = 0
+        self._rows[summary["case_id"]] = row
+        self.day.append(_day_ordinal(summary.get("date")))
+        self.judge.append(self.judges.encode(summary.get("judge") or UNKNOWN))
+        self.difficulty.append(self.difficulties.encode(summary.get("difficulty") or UNKNOWN))
+        self.judgment_len.append(int(summary.get("judgment_len", 0)))
+        self.questions.append(int(summary.get("questions", 0)))
+        self.active.append(1)
+        for character in summary.get("characters", []):
+            self.inquiry_case.append(row)
+            self.inquiry_character.append(self.characters.encode(character))
+
+    def refresh(self):
+        """
+        Reads any log lines appended since the last refresh, including those from other
+        processes. If the log was replaced (rebuild_log) or truncated, it is read again
+        from the start.
+        """
+        with self._lock:
+            try:
+                f = open(self.log_path, "rb")
+            except FileNotFoundError:
+                return
+            with f:
+                stat = os.fstat(f.fileno())
+                if (stat.st_dev, stat.st_ino) != self._log_id or stat.st_size < self._offset:
+                    self._reset()
+                    self._log_id = (stat.st_dev, stat.st_ino)
+                f.seek(self._offset)
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    self.add(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    print(f"Skipping malformed analytics row: {e}")
+            self._offset += end
+
+    @property
+    def case_count(self):
+        return len(self._rows)
+
+    def _column(self, name):
+        return np.frombuffer(getattr(self, name), dtype=np.int32) if len(getattr(self, name)) else np.zeros(0, dtype=np.int32)
+
+    def _active_mask(self):
+        return np.frombuffer(self.active, dtype=np.int8).astype(bool) if len(self.active) else np.zeros(0, dtype=bool)
+
+    def _group(self, key, dictionary, weights=None):
+        mask = self._active_mask()
+        codes = self._column(key)[mask]
+        w = None if weights is None else self._column(weights)[mask]
+        return np.bincount(codes, weights=w, minlength=len(dictionary.values))
+
+    def cases_by(self, key):
+        """Case counts grouped by "judge" or "difficulty", largest first."""
+        with self._lock:
+            dictionary = self.judges if key == "judge" else self.difficulties
+            counts = self._group(key, dictionary)
+            order = np.argsort(-counts, kind="stable")
+            return [(dictionary.values[i], int(counts[i])) for i in order if counts[i]]
+
+    def mean_by(self, key, value):
+        """Mean of a numeric column ("judgment_len" or "questions") grouped by "judge" or "difficulty"."""
+        with self._lock:
+            dictionary = self.judges if key == "judge" else self.difficulties
+            counts = self._group(key, dictionary)
+            totals = self._group(key, dictionary, weights=value)
+            return [(dictionary.values[i], float(totals[i] / counts[i])) for i in range(len(counts)) if counts[i]]
+
+    def cases_per_day(self):
+        """Case counts per calendar day, oldest first. Cases without a parseable date are skipped."""
+        with self._lock:
+            days = self._column("day")[self._active_mask()]
+            days = days[days > 0]
+            if not len(days):
+                return []
+            unique, counts = np.unique(days, return_counts=True)
+            return [(datetime.date.fromordinal(int(d)), int(c)) for d, c in zip(unique, counts)]
+
+    def average(self, value):
+        """Mean of a numeric column over all active cases."""
+        with self._lock:
+            column = self._column(value)[self._active_mask()]
+            return float(column.mean()) if len(column) else 0.0
+
+    def top_characters(self, limit=10):
+        """The characters most often interrogated across all active cases."""
+        with self._lock:
+            if not len(self.inquiry_case):
+                return []
+            rows = self._column("inquiry_case")
+            keep = self._active_mask()[rows]
+            counts = np.bincount(self._column("inquiry_character")[keep], minlength=len(self.characters.values))
+            order = np.argsort(-counts, kind="stable")[:limit]
+            return [(self.characters.values[i], int(counts[i])) for i in order if counts[i]]
+
+def rebuild_log():
+    """Regenerates the analytics log from every case file. Only needed for archives predating analytics."""
+    cases_dir = file_utils.PAST_CASES_DIR
+    lines = [json.dumps(summarize_case(view), ensure_ascii=False) + "\n" for view in case_view.iter_case_views()]
+    file_utils.atomic_write_text(os.path.join(cases_dir, ANALYTICS_LOG), "".join(lines))
+    return len(lines)
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_archive_analytics():
+    """Returns the shared, up-to-date ArchiveAnalytics for the current case directory."""
+    cases_dir = file_utils.PAST_CASES_DIR
+    with _instances_lock:
+        analytics = _instances.get(cases_dir)
+        if analytics is None:
+            if os.path.exists(cases_dir) and not os.path.exists(os.path.join(cases_dir, ANALYTICS_LOG)) and next(file_utils.iter_past_cases(), None):
+                rebuild_log()
+            analytics = _instances[cases_dir] = ArchiveAnalytics(cases_dir)
+    analytics.refresh()
+    return analytics
+
+def _on_case_saved(case_record, is_new):
+    # Re-saves are logged too; the newest row for a case_id wins
+    record_case(case_record)
+
+file_utils.register_save_hook(_on_case_saved)
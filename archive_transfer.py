@@ -0,0 +1,138 @@
+# archive_transfer.py
+"""
+Streaming export and import of the royal archives as compressed JSONL.
+
+    python archive_transfer.py export backup.jsonl.gz [--since 2026-01-01] [--until 2026-06-30] [--judge Arthur] [--difficulty Simple]
+    python archive_transfer.py import backup.jsonl.gz
+
+Files ending in .zst use zstandard (if installed), .gz uses gzip, anything else is plain JSONL.
+Cases are streamed one at a time in both directions, so memory use does not grow with the archive.
+"""
+import os
+import re
+import io
+import sys
+import gzip
+import json
+import argparse
+import file_utils
+# Imported for their save hooks (see file_utils.register_save_hook)
+import archive_analytics  # noqa: F401
+import archive_watcher  # noqa: F401
+import player_profiles  # noqa: F401
+from case_view import iter_case_views
+from models import CaseRecord
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Case IDs become file names, so imported IDs are restricted to a safe alphabet.
+SAFE_CASE_ID = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+def open_archive_stream(path, mode):
+    """Opens a (possibly compressed) JSONL file for text reading ("r") or writing ("w")."""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Install the 'zstandard' package to read or write .zst archives.")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def case_matches(view, since=None, until=None, judge=None, difficulty=None):
+    """Date bounds are inclusive YYYY-MM-DD strings, compared against the case's date prefix."""
+    day = view.date[:10]
+    if since and day < since:
+        return False
+    if until and day > until:
+        return False
+    if judge and view.player_name != judge:
+        return False
+    if difficulty and view.difficulty != difficulty:
+        return False
+    return True
+
+def iter_export_lines(since=None, until=None, judge=None, difficulty=None):
+    """Yields one JSON line per archived case that passes the filters."""
+    for view in iter_case_views():
+        if case_matches(view, since, until, judge, difficulty):
+            yield json.dumps(view.to_dict(), ensure_ascii=False) + "\n"
+
+def export_archive(path, since=None, until=None, judge=None, difficulty=None):
+    """Streams matching cases to path. Returns the number of cases exported."""
+    count = 0
+    with open_archive_stream(path, "w") as out:
+        for line in iter_export_lines(since, until, judge, difficulty):
+            out.write(line)
+            count += 1
+    return count
+
+def import_archive(path):
+    """
+    Streams cases from path into the archive. A case whose case_id is already archived
+    (including one imported earlier in the same file) is skipped.
+    Returns a dict with "imported", "skipped" and "failed" counts.
+    """
+    counts = {"imported": 0, "skipped": 0, "failed": 0}
+    written = set()
+    if not file_utils.ensure_past_cases_dir_exists():
+        counts["failed"] = 1
+        return counts
+    with open_archive_stream(path, "r") as stream:
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                case_record = CaseRecord.model_validate_json(line)
+            except ValueError as e:
+                print(f"Skipping invalid case on line {line_number}: {e}")
+                counts["failed"] += 1
+                continue
+            if not SAFE_CASE_ID.match(case_record.case_id):
+                print(f"Skipping case with unsafe ID on line {line_number}: {case_record.case_id!r}")
+                counts["failed"] += 1
+                continue
+            filename = file_utils.case_filename(case_record.case_id)
+            if file_utils.case_exists(filename):
+                counts["skipped"] += 1
+                continue
+            if file_utils.save_case(case_record, sync_dir=False):
+                counts["imported"] += 1
+                written.add(os.path.dirname(file_utils.case_path(filename)))
+            else:
+                counts["failed"] += 1
+    for directory in written:
+        file_utils.fsync_dir(directory)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import the royal archives as compressed JSONL.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write archived cases to a file.")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--since", help="Earliest case date to include (YYYY-MM-DD).")
+    export_parser.add_argument("--until", help="Latest case date to include (YYYY-MM-DD).")
+    export_parser.add_argument("--judge", help="Only include cases judged by this player name.")
+    export_parser.add_argument("--difficulty", choices=["Simple", "Moderate", "Complex", "Unknown"])
+    import_parser = commands.add_parser("import", help="Read cases from a file into the archive.")
+    import_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        count = export_archive(args.path, args.since, args.until, args.judge, args.difficulty)
+        print(f"Exported {count} cases to {args.path}")
+    else:
+        counts = import_archive(args.path)
+        print(f"Imported {counts['imported']} cases ({counts['skipped']} duplicates skipped, {counts['failed']} failed)")
+        return 1 if counts["failed"] else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
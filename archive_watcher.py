@@ -0,0 +1,229 @@
+# archive_watcher.py
+"""
+In-memory index of the archived case files, kept current by filesystem events.
+
+The index lists past_cases/ once, then applies add/modify/delete events as they arrive,
+so the sidebar count and the archive list are read from memory and never touch the
+directory, even when other processes save cases or a backup is restored into the tree.
+Events come from watchdog's native observer (inotify on Linux); where that is not
+available or fails to start, a background thread polls the tree every
+ARCHIVE_POLL_SECONDS and applies the differences instead.
+"""
+import os
+import re
+import atexit
+import threading
+import file_utils
+import case_bundles
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# "auto" uses filesystem events when possible, "poll" always polls
+ARCHIVE_WATCH_MODE = os.getenv("ARCHIVE_WATCH_MODE", "auto")
+ARCHIVE_POLL_SECONDS = float(os.getenv("ARCHIVE_POLL_SECONDS", "2"))
+# Case files as listed by file_utils.iter_past_cases: date shards, or legacy top-level files
+CASE_FILE = re.compile(r"^(\d+/\d+/\d+/)?case_[^/]+\.(json|txt)$")
+
+def scan_archive(root):
+    """{relative path: mtime} for every case file under root, in iter_past_cases' layout, cold storage included."""
+    found = {}
+    def walk(directory, prefix, depth):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    relative = prefix + entry.name
+                    if depth < 3 and entry.name.isdigit() and entry.is_dir():
+                        walk(entry.path, relative + "/", depth + 1)
+                    elif CASE_FILE.match(relative) and relative.count("/") in (0, 3) and entry.is_file():
+                        found[relative] = entry.stat().st_mtime
+                    elif entry.name == case_bundles.BUNDLE_INDEX and depth in (0, 3):
+                        index = case_bundles.read_index(entry.path) or {"records": {}}
+                        for name, (_, _, mtime) in index["records"].items():
+                            found.setdefault(prefix + name, mtime)
+        except OSError:
+            pass
+    walk(root, "", 0)
+    return found
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def on_any_event(self, event):
+        if os.path.basename(getattr(event, "dest_path", "") or event.src_path) == case_bundles.BUNDLE_INDEX:
+            # A cold storage bundle was written: its directory's cases are listed from the new index
+            self.index.rescan(os.path.dirname(event.dest_path or event.src_path))
+        elif event.event_type in ("created", "modified"):
+            if event.is_directory:
+                if event.event_type == "created":
+                    self.index.rescan(event.src_path)
+            else:
+                self.index.touch(event.src_path)
+        elif event.event_type == "deleted":
+            self.index.remove(event.src_path, event.is_directory)
+        elif event.event_type == "moved":
+            # Saves land here: atomic_write_text renames a temporary file over the case file
+            self.index.remove(event.src_path, event.is_directory)
+            if event.is_directory:
+                self.index.rescan(event.dest_path)
+            else:
+                self.index.touch(event.dest_path)
+
+_polling_reported = False
+
+def _report_polling(root, poll_seconds, reason):
+    """Says once per process that the index rescans the tree, since that costs a full scan per interval."""
+    global _polling_reported
+    if not _polling_reported:
+        _polling_reported = True
+        print(f"Archive index for {root} is rescanning it every {poll_seconds:g}s ({reason}).")
+
+class ArchiveIndex:
+    """The archive's case files with their mtimes, newest first, maintained from events."""
+
+    def __init__(self, cases_dir, mode=ARCHIVE_WATCH_MODE, poll_seconds=ARCHIVE_POLL_SECONDS):
+        self.root = os.path.abspath(cases_dir)
+        self.poll_seconds = poll_seconds
+        self._mtimes = {}
+        self._sorted = None
+        self._lock = threading.Lock()
+        self._observer = None
+        self._stop = threading.Event()
+        os.makedirs(self.root, exist_ok=True)
+        if mode == "poll":
+            reason = "ARCHIVE_WATCH_MODE=poll"
+        elif Observer is None:
+            reason = "the watchdog package is not installed"
+        with self._lock:
+            # Watch first, then list under the lock: events raised meanwhile wait and apply on top
+            if mode != "poll" and Observer is not None:
+                try:
+                    self._observer = Observer()
+                    self._observer.schedule(_EventHandler(self), self.root, recursive=True)
+                    self._observer.daemon = True
+                    self._observer.start()
+                except Exception as e:
+                    reason = f"filesystem events are unavailable: {e}"
+                    self._observer = None
+            self._mtimes = scan_archive(self.root)
+        if self._observer is None:
+            _report_polling(self.root, poll_seconds, reason)
+            threading.Thread(target=self._poll, name="archive-poll", daemon=True).start()
+
+    @property
+    def mode(self):
+        return "events" if self._observer is not None else "poll"
+
+    def _relative(self, path):
+        relative = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+        return None if relative.startswith("..") else relative
+
+    def _changed(self):
+        self._sorted = None
+
+    def touch(self, path):
+        """Records a case file as added or modified."""
+        relative = self._relative(path)
+        if relative is None or not CASE_FILE.match(relative):
+            return
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        with self._lock:
+            if relative not in self._mtimes:
+                self._changed()
+            self._mtimes[relative] = mtime
+
+    def remove(self, path, is_directory=False):
+        """Forgets a deleted case file, or every case file under a deleted directory."""
+        relative = self._relative(path)
+        if relative is None:
+            return
+        with self._lock:
+            if is_directory:
+                prefix = "" if relative == "." else relative + "/"
+                gone = [name for name in self._mtimes if name.startswith(prefix)]
+            else:
+                # A case file deleted after it was moved to cold storage is still archived
+                gone = [relative] if relative in self._mtimes and not case_bundles.contains(self.root, relative) else []
+            for name in gone:
+                del self._mtimes[name]
+            if gone:
+                self._changed()
+
+    def rescan(self, directory):
+        """Adds the case files under a directory that appeared in one piece (a restore, a move)."""
+        relative = self._relative(directory)
+        if relative is None:
+            return
+        prefix = "" if relative == "." else relative + "/"
+        found = {prefix + name: mtime for name, mtime in scan_archive(directory).items()}
+        with self._lock:
+            for name, mtime in found.items():
+                if CASE_FILE.match(name):
+                    if name not in self._mtimes:
+                        self._changed()
+                    self._mtimes[name] = mtime
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            current = scan_archive(self.root)
+            with self._lock:
+                if current.keys() != self._mtimes.keys():
+                    self._changed()
+                self._mtimes = current
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    @property
+    def count(self):
+        with self._lock:
+            return len(self._mtimes)
+
+    def cases(self):
+        """Case files relative to the archive root, newest first (the order of iter_past_cases)."""
+        with self._lock:
+            if self._sorted is None:
+                sharded = sorted((name for name in self._mtimes if "/" in name), reverse=True)
+                legacy = sorted((name for name in self._mtimes if "/" not in name), reverse=True)
+                self._sorted = sharded + legacy
+            return self._sorted
+
+    def mtime(self, filename):
+        with self._lock:
+            return self._mtimes.get(filename)
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_archive_index():
+    """Returns the shared ArchiveIndex for the current case directory, starting its watcher on first use."""
+    cases_dir = file_utils.PAST_CASES_DIR
+    with _instances_lock:
+        index = _instances.get(cases_dir)
+        if index is None:
+            index = _instances[cases_dir] = ArchiveIndex(cases_dir)
+        return index
+
+def notify_saved(case_record, is_new=True):
+    """Save hook, so this process sees its own saves at once, ahead of the event."""
+    index = _instances.get(file_utils.PAST_CASES_DIR)
+    if index is not None:
+        index.touch(file_utils.case_path(file_utils.case_filename(case_record.case_id)))
+
+file_utils.register_save_hook(notify_saved)
+
+@atexit.register
+def _stop_all():
+    for index in list(_instances.values()):
+        index.stop()
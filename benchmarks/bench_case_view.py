@@ -0,0 +1,63 @@
+# benchmarks/bench_case_view.py
+"""
+Compares memory use and load throughput of CaseView against pydantic CaseRecord.
+
+    python benchmarks/bench_case_view.py [num_cases]
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import CaseRecord, InquiryEntry
+from case_view import CaseView
+
+JUDGES = [f"Judge{i}" for i in range(200)]
+CHARACTERS = ["The Farmer", "The Merchant", "The Royal Guard", "The Miller", "The Widow"]
+
+def make_payloads(n):
+    payloads = []
+    for i in range(n):
+        record = CaseRecord(
+            case_id=f"20261017_120000_{i:06d}",
+            player_name=random.choice(JUDGES),
+            difficulty=random.choice(["Simple", "Moderate", "Complex"]),
+            scenario="A dispute over a **golden goose** between neighbours. " * 8,
+            inquiry_history=[
+                InquiryEntry(character=random.choice(CHARACTERS), question="What did you see?", response="I saw nothing, Sire!")
+                for _ in range(random.randint(0, 3))
+            ],
+            judgment="The goose is returned to the farmer. " * 5,
+            analysis="A wise and balanced ruling. " * 20,
+        )
+        # Kept as bytes so every decode yields fresh string objects, as if read from disk.
+        payloads.append(record.model_dump_json(indent=4).encode())
+    return payloads
+
+def measure(label, build, payloads):
+    texts = [p.decode() for p in payloads]
+    start = time.perf_counter()
+    items = [build(t) for t in texts]
+    elapsed = time.perf_counter() - start
+    del items
+    # Memory is measured on a second pass so tracemalloc overhead does not skew the timing.
+    texts = [p.decode() for p in payloads]
+    tracemalloc.start()
+    items = [build(t) for t in texts]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {len(items) / elapsed:>12,.0f} cases/s {current / len(items):>10,.0f} bytes/case")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    payloads = make_payloads(n)
+    print(f"Loading {n:,} cases")
+    measure("CaseRecord", CaseRecord.model_validate_json, payloads)
+    measure("CaseView", CaseView.from_json, payloads)
+    measure("View+Record", lambda text: CaseView.from_json(text).to_record(), payloads)
+
+if __name__ == "__main__":
+    main()
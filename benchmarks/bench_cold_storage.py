@@ -0,0 +1,106 @@
+# benchmarks/bench_cold_storage.py
+"""
+Disk savings versus read latency of cold storage.
+
+Builds an archive of synthetic cases dated two months back, then for plain JSON files and
+each cold storage variant (zlib without and with a trained dictionary, and zstd with one
+if the zstandard package is installed) reports the bytes on disk (apparent and allocated
+blocks) and the latency of load_case on randomly chosen cases.
+
+    python benchmarks/bench_cold_storage.py [num_cases]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import file_utils
+import cold_storage
+import case_bundles
+from models import CaseRecord, InquiryEntry
+
+WORDS = ("the king farmer merchant goose cow river mill bread debt promise harvest widow guard oath land well "
+         "sheep honest neighbour village fair value duty mercy law custom need labour coin gift claim dispute").split()
+CHARACTERS = ["The Farmer", "The Merchant", "The Royal Guard", "The Miller", "The Widow"]
+READS = 500
+
+# LLM prose reuses stock phrases; sentences are built from a fixed bank of them
+_bank = random.Random(0)
+PHRASES = [" ".join(_bank.choice(WORDS) for _ in range(_bank.randint(3, 6))) for _ in range(400)]
+
+def _prose(rng, sentences):
+    return " ".join(", ".join(rng.choice(PHRASES) for _ in range(rng.randint(2, 3))).capitalize() + "." for _ in range(sentences))
+
+def build_archive(n, rng):
+    start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=60)
+    filenames = []
+    for i in range(n):
+        created = start + datetime.timedelta(minutes=10 * i)
+        case_id = file_utils._encode(int(created.timestamp() * 1000), 10) + file_utils._encode(1, 4) + file_utils._encode(i, 12)
+        record = CaseRecord(
+            case_id=case_id,
+            date=created.strftime("%Y-%m-%d %H:%M:%S"),
+            player_name=f"Judge{rng.randint(1, 200)}",
+            difficulty=rng.choice(["Simple", "Moderate", "Complex"]),
+            scenario=_prose(rng, 8),
+            inquiry_history=[InquiryEntry(character=rng.choice(CHARACTERS), question=_prose(rng, 1), response=_prose(rng, 3))
+                             for _ in range(rng.randint(0, 3))],
+            judgment=_prose(rng, 4),
+            analysis="Thought Process: The Royal Advisor weighs the facts. " + _prose(rng, 10),
+        )
+        file_utils.save_case(record, sync_dir=False)
+        filenames.append(file_utils.case_filename(case_id))
+    return filenames
+
+def disk_usage(root):
+    apparent = allocated = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            st = os.stat(os.path.join(directory, name))
+            apparent += st.st_size
+            allocated += st.st_blocks * 512
+    return apparent, allocated
+
+def read_latency(filenames, rng):
+    sample = [rng.choice(filenames) for _ in range(READS)]
+    timings = []
+    for filename in sample:
+        start = time.perf_counter()
+        assert file_utils.load_case(filename) is not None
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(0.95 * len(timings))]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    variants = [("plain JSON", None, None), ("zlib, no dictionary", "zlib", 0), ("zlib + dictionary", "zlib", None)]
+    if case_bundles.zstandard is not None:
+        variants.append(("zstd + dictionary", "zstd", None))
+    original_dir, original_samples = file_utils.PAST_CASES_DIR, cold_storage.COLD_DICTIONARY_SAMPLES
+    print(f"{n} cases")
+    print(f"{'':<22}{'apparent KB':>12}{'on disk KB':>12}{'ratio':>7}{'p50 us':>8}{'p95 us':>8}")
+    baseline = None
+    try:
+        for label, codec, samples in variants:
+            root = tempfile.mkdtemp(prefix="kgj_cold_")
+            file_utils.PAST_CASES_DIR = root
+            cold_storage.COLD_DICTIONARY_SAMPLES = original_samples if samples is None else samples
+            filenames = build_archive(n, random.Random(1))
+            if codec is not None:
+                cold_storage.tier_archive(days=30, codec=codec)
+            apparent, allocated = disk_usage(root)
+            baseline = baseline or allocated
+            p50, p95 = read_latency(filenames, random.Random(2))
+            print(f"{label:<22}{apparent / 1024:>12.0f}{allocated / 1024:>12.0f}{baseline / allocated:>6.1f}x{p50 * 1e6:>8.0f}{p95 * 1e6:>8.0f}")
+            shutil.rmtree(root, ignore_errors=True)
+    finally:
+        file_utils.PAST_CASES_DIR = original_dir
+        cold_storage.COLD_DICTIONARY_SAMPLES = original_samples
+
+if __name__ == "__main__":
+    main()
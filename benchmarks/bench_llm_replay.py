@@ -0,0 +1,108 @@
+# benchmarks/bench_llm_replay.py
+"""
+End-to-end benchmark of the three LLM functions against a recorded cassette.
+
+Record once (live API if OPENAI_API_KEY is set, otherwise the fake backend in fake_llm.py):
+
+    python benchmarks/bench_llm_replay.py --record --cases 20 --cassette cassettes/bench.jsonl
+
+Then replay offline, at zero or recorded latency:
+
+    python benchmarks/bench_llm_replay.py --cassette cassettes/bench.jsonl [--latency recorded]
+
+Each case generates a scenario, asks every character one question and analyses a fixed
+judgment, with the same inputs in the same order on every run so replays line up.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import llm_integration
+import model_policy
+from llm_cassette import CassetteClient
+from scenario_library import ScenarioLibrary
+from scenario_similarity import ScenarioIndex
+
+DIFFICULTIES = ["Simple", "Moderate", "Complex"]
+QUESTION = "What did you see on the day of the dispute?"
+JUDGMENT = "The disputed property is split fairly, and the guilty party repays the other in kind."
+
+def run_cases(n, timings):
+    for i in range(n):
+        difficulty = DIFFICULTIES[i % len(DIFFICULTIES)]
+        start = time.perf_counter()
+        scenario = llm_integration.generate_scenario_with_llm("Benchmark", difficulty)
+        timings["scenario"].append(time.perf_counter() - start)
+        if isinstance(scenario, dict):
+            raise RuntimeError(f"Scenario generation failed: {scenario['error']}")
+        for character in scenario.characters:
+            start = time.perf_counter()
+            llm_integration.get_witness_response_with_llm(scenario.scenario, character, QUESTION, difficulty=difficulty)
+            timings["witness"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        llm_integration.analyze_judgment_with_llm(JUDGMENT, scenario.scenario, "Benchmark", difficulty=difficulty)
+        timings["analysis"].append(time.perf_counter() - start)
+
+def _counting(client, usage):
+    """Wraps client.chat.completions.create to total token usage."""
+    create = client.chat.completions.create
+
+    def counted(**request):
+        response = create(**request)
+        if getattr(response, "usage", None) is not None:
+            usage["prompt"] += response.usage.prompt_tokens or 0
+            usage["completion"] += response.usage.completion_tokens or 0
+        return response
+    client.chat.completions.create = counted
+    return client
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LLM functions against a recorded cassette.")
+    parser.add_argument("--cassette", default=os.path.join("cassettes", "bench.jsonl"))
+    parser.add_argument("--cases", type=int, default=20)
+    parser.add_argument("--record", action="store_true", help="Record a new cassette instead of replaying.")
+    parser.add_argument("--latency", choices=["zero", "recorded"], default="zero", help="Replay latency.")
+    args = parser.parse_args(argv)
+
+    # Freeze the model policy so recording and replay pick the same model tiers.
+    for task in model_policy.LLM_P95_TARGETS:
+        model_policy.LLM_P95_TARGETS[task] = float("inf")
+    model_policy.LLM_OVERLOAD_INFLIGHT = float("inf")
+    llm_integration.scenario_index = ScenarioIndex(threshold=llm_integration.SCENARIO_SIMILARITY_THRESHOLD)
+    llm_integration.scenario_library = ScenarioLibrary(os.path.join(tempfile.mkdtemp(prefix="kgj_bench_"), "library.jsonl"))
+
+    if args.record:
+        if os.path.exists(args.cassette):
+            os.remove(args.cassette)
+        inner = llm_integration.client.inner if isinstance(llm_integration.client, CassetteClient) else llm_integration.client
+        if inner is None:
+            from fake_llm import FakeOpenAIClient
+            print("OPENAI_API_KEY is not set; recording the fake backend.")
+            inner = FakeOpenAIClient()
+        cassette = CassetteClient(inner, path=args.cassette, mode="record")
+    else:
+        cassette = CassetteClient(None, path=args.cassette, mode="replay", latency=args.latency)
+        print(f"Replaying {cassette.recorded_count} recorded responses from {args.cassette} at {args.latency} latency")
+
+    usage = {"prompt": 0, "completion": 0}
+    llm_integration.client = _counting(cassette, usage)
+    timings = {"scenario": [], "witness": [], "analysis": []}
+    wall_start = time.perf_counter()
+    run_cases(args.cases, timings)
+    wall = time.perf_counter() - wall_start
+
+    print(f"{args.cases} cases in {wall:.2f}s ({args.cases / wall:.1f} cases/s)")
+    print(f"{'call':>9} {'count':>6} {'mean ms':>8} {'max ms':>8}")
+    for task, values in timings.items():
+        print(f"{task:>9} {len(values):>6} {1000 * statistics.mean(values):>8.2f} {1000 * max(values):>8.2f}")
+    print(f"tokens: {usage['prompt']:,} prompt, {usage['completion']:,} completion")
+
+if __name__ == "__main__":
+    main()
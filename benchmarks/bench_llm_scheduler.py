@@ -0,0 +1,79 @@
+# benchmarks/bench_llm_scheduler.py
+"""
+Interactive latency under background load, with and without llm_scheduler.
+
+A fake backend serves at most --quota calls at once, each taking --latency seconds.
+--background threads issue background calls back to back while --judges sessions each ask
+a witness question every half second. Without the scheduler every call queues for the
+backend in arrival order; with it, judges are admitted first and background work is held
+to the background ceiling.
+
+    python benchmarks/bench_llm_scheduler.py --background 64 --judges 8
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_scheduler import LLMScheduler, INTERACTIVE, BACKGROUND
+
+def run(args, scheduler):
+    backend = threading.Semaphore(args.quota)
+    stop = threading.Event()
+    latencies, background_calls = [], [0]
+
+    def call(priority, session):
+        if scheduler is not None:
+            scheduler.acquire(priority, session)
+        try:
+            with backend:
+                time.sleep(args.latency)
+        finally:
+            if scheduler is not None:
+                scheduler.release(priority)
+
+    def background_worker(i):
+        while not stop.is_set():
+            call(BACKGROUND, f"background-{i}")
+            background_calls[0] += 1
+
+    def judge(i):
+        while not stop.is_set():
+            start = time.monotonic()
+            call(INTERACTIVE, f"judge-{i}")
+            latencies.append(time.monotonic() - start)
+            stop.wait(0.5)
+
+    threads = [threading.Thread(target=background_worker, args=(i,), daemon=True) for i in range(args.background)]
+    threads += [threading.Thread(target=judge, args=(i,), daemon=True) for i in range(args.judges)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return statistics.median(latencies), p95, background_calls[0] / args.seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quota", type=int, default=8, help="Calls the backend serves at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per backend call")
+    parser.add_argument("--background", type=int, default=64, help="Background threads calling back to back")
+    parser.add_argument("--judges", type=int, default=8, help="Sessions asking a question every 0.5 s")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'':<18}{'p50 ms':>8}{'p95 ms':>8}{'background/s':>14}")
+    for label, scheduler in [("no scheduler", None),
+                             ("llm_scheduler", LLMScheduler(max_concurrency=args.quota, interactive_reserve=2, background_ceiling=4))]:
+        p50, p95, throughput = run(args, scheduler)
+        print(f"{label:<18}{1000 * p50:>8.0f}{1000 * p95:>8.0f}{throughput:>14.1f}")
+
+if __name__ == "__main__":
+    main()
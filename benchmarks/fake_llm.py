@@ -0,0 +1,104 @@
+# benchmarks/fake_llm.py
+"""
+A stand-in for openai.OpenAI that answers the game's three prompts with canned JSON
+after a configurable delay (streamed calls get their first chunk after a third of it and
+the rest spread over the remainder). load_test.py installs it with `install_fake_llm()`
+in the process that runs a real Streamlit server, so the full flow can be driven
+offline by simulated browser sessions.
+"""
+import json
+import time
+import random
+import threading
+from types import SimpleNamespace
+
+# Scenarios are put together at random from these, so they share few word triples: about
+# 98% pass the near-duplicate filter (scenario_similarity) first time, as varied real ones
+# would, and the load numbers are not inflated by forced regenerations
+NAMES = ["Alden", "Brisa", "Cedric", "Dunstan", "Elowen", "Fenwick", "Gwendolyn", "Hollis", "Isolde", "Jory",
+         "Kestrel", "Linnet", "Merrick", "Nessa", "Osric", "Perrin", "Quenby", "Rowena", "Sabin", "Tamsin"]
+TRADES = ["farmer", "merchant", "miller", "weaver", "blacksmith", "shepherd", "brewer", "fisherwoman",
+          "tanner", "innkeeper", "cooper", "herbalist", "chandler", "mason", "falconer", "potter"]
+OBJECTS = ["a golden goose", "a watermill", "an orchard of pear trees", "a pedigree hound", "a silver chalice",
+           "a flock of black sheep", "a ferry barge", "a beehive of rare honey", "a stained-glass window",
+           "a chest of old coins", "a plough horse", "a fishing weir", "a bolt of crimson silk", "a lute"]
+PLACES = ["on the village green", "beside the old well", "in the flooded meadow", "behind the chapel",
+          "at the crossroads market", "under the north bridge", "in the ruined watchtower", "near the salt marsh"]
+CLAUSES = [
+    "{a} says the bargain was sealed with a handshake {n} winters ago.",
+    "{b} produces a scrap of parchment signed by a long-dead reeve.",
+    "A travelling friar swears he saw {a} tending it every Sunday.",
+    "The neighbours whisper that {b} owes {n} silver pennies to the tavern.",
+    "{a}'s youngest child fell ill, and the family cannot pay for physic.",
+    "The village elders are split, {n} for one claimant and the rest undecided.",
+    "Last harvest failed, and {b} fed half the hamlet from their own stores.",
+    "A storm moved the boundary stones, so neither field's edge is certain.",
+    "{a} has already promised it as a dowry for a niece in the next valley.",
+    "The guild threatens to expel {b} if the dispute is not settled by midsummer.",
+    "Witnesses disagree on whether the gate was locked that night.",
+    "{b} offered {n} bushels of barley in compensation, which was refused.",
+    "The old lord's will mentions it only as 'the thing by the water'.",
+    "A quarrel at the last fair ended with {a} and {b} not speaking.",
+    "Tax collectors counted it among {a}'s goods at the spring assessment.",
+    "Rumour says a noble from the capital wishes to buy it outright.",
+]
+
+def _scenario():
+    first, second = random.sample(NAMES, 2)
+    trade_a, trade_b = random.sample(TRADES, 2)
+    a, b = f"{trade_a.capitalize()} {first}", f"{trade_b.capitalize()} {second}"
+    text = f"{a} and {b} both lay claim to {random.choice(OBJECTS)} {random.choice(PLACES)}. "
+    text += " ".join(clause.format(a=a, b=b, n=random.randint(2, 40)) for clause in random.sample(CLAUSES, 3))
+    return text, [a, b]
+
+class FakeCompletions:
+    def __init__(self, latency, jitter):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        content = json.dumps(self._content(messages))
+        if stream:
+            return self._stream(content, model, delay)
+        time.sleep(delay)
+        usage = SimpleNamespace(prompt_tokens=len(messages[-1]["content"]) // 4, completion_tokens=60, total_tokens=0)
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage, model=model)
+
+    def _stream(self, text, model, delay, size=8):
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        time.sleep(delay / 3)
+        for piece in pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None, model=model)
+            time.sleep(delay * 2 / 3 / len(pieces))
+
+    def _content(self, messages):
+        system = messages[0]["content"]
+        if "storyteller" in system:
+            text, characters = _scenario()
+            content = {"scenario": text, "highlighted_scenario": text, "characters": characters}
+        elif "Royal Advisor" in system:
+            content = {"thought_process": "Weighing fairness against mercy.",
+                       "analysis": "A balanced ruling that honours both parties.",
+                       "highlighted_analysis": "A **balanced** ruling that honours both parties."}
+        else:
+            content = {"response": "I saw nothing of the sort, Sire!"}
+        return content
+
+class FakeOpenAIClient:
+    def __init__(self, latency=0.2, jitter=0.05):
+        self.chat = SimpleNamespace(completions=FakeCompletions(latency, jitter))
+
+def install_fake_llm(latency=0.2, jitter=0.05):
+    """Points llm_integration at a FakeOpenAIClient and marks the API key as configured."""
+    import llm_integration
+    fake = FakeOpenAIClient(latency, jitter)
+    llm_integration.client = fake
+    llm_integration.OPENAI_API_KEY = "fake-key"
+    return fake
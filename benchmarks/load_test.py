@@ -0,0 +1,298 @@
+# benchmarks/load_test.py
+"""
+Headless load generator for the Streamlit app.
+
+Starts `app.py` on a real Streamlit server wired to the fake LLM backend in
+benchmarks/fake_llm.py, then opens many concurrent websocket sessions that each
+walk welcome -> scenario -> witness question -> judgment -> analysis -> archives,
+the same way a browser does (protobuf BackMsg/ForwardMsg over /_stcore/stream).
+For each concurrency level it reports server CPU (overall and per rerun), server memory per session,
+rerun latency, bytes received per rerun and error rate.
+
+    python benchmarks/load_test.py --levels 1,10,50,200 --llm-latency 0.5
+
+Server CPU and memory are read from /proc, so those columns need Linux.
+"""
+import os
+import sys
+import time
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+APP_PATH = os.path.join(ROOT, "app.py")
+WIDGET_ID_PREFIX = "$$WIDGET_ID"
+
+# --- Server side ---
+
+def serve(port, llm_latency, cases_dir):
+    """Runs app.py on a Streamlit server in this process, with the fake LLM installed."""
+    from fake_llm import install_fake_llm
+    import file_utils
+    import job_queue
+    from streamlit.web import bootstrap
+
+    import llm_integration
+    from scenario_library import ScenarioLibrary
+
+    install_fake_llm(latency=llm_latency)
+    file_utils.PAST_CASES_DIR = cases_dir
+    job_queue.JOB_QUEUE_PATH = os.path.join(cases_dir, "_jobs.sqlite3")
+    llm_integration.scenario_library = ScenarioLibrary(os.path.join(cases_dir, "_scenario_library.jsonl"))
+    os.chdir(ROOT)
+    flag_options = {
+        "server_port": port,
+        "server_headless": True,
+        "server_enableCORS": False,
+        "server_enableXsrfProtection": False,
+        "server_fileWatcherType": "none",
+        "browser_gatherUsageStats": False,
+        # Send every message in full so the client never has to resolve cached references
+        "global_minCachedMessageSize": 10**9,
+    }
+    bootstrap.load_config_options(flag_options)
+    bootstrap.run(APP_PATH, False, [], flag_options)
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _proc_stats(pid):
+    """Returns (cpu_seconds, rss_mb) for a process, or (None, None) off Linux."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        return cpu, rss_kb / 1024
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None, None
+
+# --- Client side ---
+
+class SimulatedSession:
+    """
+    A minimal Streamlit browser client: tracks widget ids by key and replays widget state on
+    each rerun. Like the browser, a widget inside a fragment reruns only that fragment, and
+    fragments with run_every are rerun on their interval while the client waits (wait_for).
+    """
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.widgets = {}
+        self.fragments = {}
+        # fragment_id -> seconds between the reruns the server asked for (st.fragment run_every)
+        self.auto_reruns = {}
+        self.values = {}
+        self.latencies = []
+        self.bytes_received = 0
+        self.connection = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+        self.connection = await websocket_connect(self.url)
+        await self.rerun()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def has(self, key):
+        return key in self.widgets
+
+    def set_text(self, key, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id = self.widgets[key]
+        self.values[widget_id] = WidgetState(id=widget_id, string_value=value)
+
+    async def click(self, key):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id = self.widgets[key]
+        await self.rerun(WidgetState(id=widget_id, trigger_value=True), self.fragments.get(key))
+
+    async def wait_for(self, key):
+        """Reruns auto-rerunning fragments on their interval until a widget appears or the timeout passes."""
+        deadline = time.monotonic() + self.timeout
+        while key not in self.widgets and self.auto_reruns and time.monotonic() < deadline:
+            # The most frequent one is the fragment being waited on, not the session heartbeat
+            fragment_id, interval = min(self.auto_reruns.items(), key=lambda item: item[1])
+            await asyncio.sleep(interval)
+            await self.rerun(fragment_id=fragment_id)
+        return key in self.widgets
+
+    async def rerun(self, trigger=None, fragment_id=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        states = msg.rerun_script.widget_states.widgets
+        states.extend(self.values.values())
+        if trigger is not None:
+            states.append(trigger)
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+        start = time.perf_counter()
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+
+        widgets, fragments, auto_reruns = {}, {}, {}
+        while True:
+            raw = await asyncio.wait_for(self.connection.read_message(), self.timeout)
+            if raw is None:
+                raise RuntimeError("Server closed the connection")
+            self.bytes_received += len(raw)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    raise RuntimeError(f"App exception: {element.exception.message}")
+                proto = getattr(element, element_type)
+                widget_id = getattr(proto, "id", "")
+                if isinstance(widget_id, str) and widget_id.startswith(WIDGET_ID_PREFIX):
+                    key = widget_id.split("-", 2)[2]
+                    widgets[key] = widget_id
+                    if fwd.delta.fragment_id:
+                        fragments[key] = fwd.delta.fragment_id
+            elif kind == "auto_rerun":
+                auto_reruns[fwd.auto_rerun.fragment_id] = fwd.auto_rerun.interval
+            elif kind == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # st.rerun() inside the app: the server starts the next pass by itself
+                    widgets, fragments, auto_reruns, fragment_id = {}, {}, {}, None
+                    continue
+                if fwd.script_finished == ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY:
+                    # Only the fragment was redrawn; the rest of the page stays as it was
+                    kept = {k: v for k, v in self.widgets.items() if self.fragments.get(k) != fragment_id}
+                    widgets = {**kept, **widgets}
+                    fragments = {**{k: f for k, f in self.fragments.items() if k in kept}, **fragments}
+                    auto_reruns = {**self.auto_reruns, **auto_reruns}
+                break
+        self.latencies.append(time.perf_counter() - start)
+        self.widgets = widgets
+        self.fragments = fragments
+        self.auto_reruns = auto_reruns
+        # Values of widgets that are no longer on the page are dropped, as the browser does
+        self.values = {wid: state for wid, state in self.values.items() if wid in widgets.values()}
+
+async def walk_session(url, index, timeout):
+    """Plays one full case. Returns (latencies, bytes_received, error)."""
+    session = SimulatedSession(url, timeout)
+    try:
+        await session.connect()
+        session.set_text("player_name_input_key", f"Loadtester{index}")
+        await session.click("begin_judge_btn")
+        if not session.has("char_0"):
+            raise RuntimeError("Scenario was not presented")
+        await session.click("char_0")
+        session.set_text("witness_q_input", "What did you see?")
+        await session.click("ask_q_btn")
+        session.set_text("judgment_input_key", "Split the matter fairly between both parties.")
+        await session.click("submit_judgment_btn")
+        # The analysis runs as a queued job; the page polls it like the browser would
+        if not await session.wait_for("hear_another_case_btn"):
+            raise RuntimeError("Analysis was not shown")
+        await session.click("view_archives_btn")
+        if not session.has("back_to_kingdom_btn"):
+            raise RuntimeError("Archives were not shown")
+        return session.latencies, session.bytes_received, None
+    except Exception as e:
+        return session.latencies, session.bytes_received, f"{type(e).__name__}: {e}"
+    finally:
+        session.close()
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run_level(url, server_pid, concurrency, timeout):
+    cpu_before, rss_before = _proc_stats(server_pid)
+    wall_start = time.perf_counter()
+    results = await asyncio.gather(*(walk_session(url, i, timeout) for i in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    cpu_after, rss_after = _proc_stats(server_pid)
+
+    latencies = [lat for lats, _, _ in results for lat in lats]
+    errors = [err for _, _, err in results if err]
+    total_bytes = sum(b for _, b, _ in results)
+    return {
+        "sessions": concurrency,
+        "wall_s": wall,
+        "cpu_pct": 100 * (cpu_after - cpu_before) / wall if cpu_before is not None else float("nan"),
+        "rss_mb": rss_after if rss_after is not None else float("nan"),
+        "mb_per_session": (rss_after - rss_before) / concurrency if rss_before is not None else float("nan"),
+        "p50_ms": 1000 * statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": 1000 * _percentile(latencies, 95),
+        "kb_per_rerun": total_bytes / len(latencies) / 1024 if latencies else 0.0,
+        "cpu_ms_per_rerun": 1000 * (cpu_after - cpu_before) / len(latencies) if cpu_before is not None and latencies else float("nan"),
+        "error_rate": len(errors) / concurrency,
+        "first_error": errors[0] if errors else "",
+    }
+
+async def _wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Streamlit server did not start on port {port}")
+
+async def drive(args, port, server_pid):
+    await _wait_for_server(port)
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    # One unreported session first, so lazy imports and caches do not count against level one
+    await walk_session(url, -1, args.timeout)
+    print(f"{'sessions':>8} {'wall s':>7} {'cpu %':>6} {'RSS MB':>7} {'MB/sess':>8} {'p50 ms':>7} {'p95 ms':>7} {'KB/rerun':>9} {'CPU ms/rerun':>13} {'errors':>7}")
+    for level in [int(x) for x in args.levels.split(",")]:
+        row = await run_level(url, server_pid, level, args.timeout)
+        print(f"{row['sessions']:>8} {row['wall_s']:>7.1f} {row['cpu_pct']:>6.0f} {row['rss_mb']:>7.0f} {row['mb_per_session']:>8.2f} "
+              f"{row['p50_ms']:>7.0f} {row['p95_ms']:>7.0f} {row['kb_per_rerun']:>9.1f} {row['cpu_ms_per_rerun']:>13.1f} {row['error_rate']:>7.1%}")
+        if row["first_error"]:
+            print(f"{'':>9}first error: {row['first_error']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent player sessions against a local app.py server.")
+    parser.add_argument("--levels", default="1,10,50", help="Comma-separated concurrency levels to run.")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Mean fake LLM latency in seconds.")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-rerun timeout in seconds.")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--cases-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.llm_latency, args.cases_dir)
+        return
+
+    port = _free_port()
+    cases_dir = tempfile.mkdtemp(prefix="kgj_load_")
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port),
+         "--llm-latency", str(args.llm_latency), "--cases-dir", cases_dir],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(drive(args, port, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(cases_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# case_bundles.py
+"""
+On-disk format of cold storage bundles (written by cold_storage.py), and reads from them.
+
+A directory of the archive may hold one bundle of compressed case records, described by
+its cold_index.json: {"bundle", "codec", "dictionary", "records": {name: [offset, length,
+mtime]}}. Dictionaries live in <archive>/_dictionaries/, named by their hash. Functions
+here take the archive's root directory and do not depend on the rest of the archive code,
+so file_utils can read bundles without importing the tiering code.
+"""
+import os
+import json
+import zlib
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BUNDLE_INDEX = "cold_index.json"
+DICTIONARY_DIR = "_dictionaries"
+
+class Codec:
+    def __init__(self, name, dictionary):
+        self.name = name
+        self.dictionary = dictionary
+        if name == "zstd":
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._compressor = zstandard.ZstdCompressor(level=19, dict_data=dict_data)
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+        elif name != "zlib":
+            raise ValueError(f"Unknown cold storage codec: {name}")
+
+    def compress(self, data):
+        if self.name == "zstd":
+            return self._compressor.compress(data)
+        compressor = zlib.compressobj(9, zdict=self.dictionary) if self.dictionary else zlib.compressobj(9)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        if self.name == "zstd":
+            return self._decompressor.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self.dictionary) if self.dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+
+def dictionary_dir(root):
+    return os.path.join(root, DICTIONARY_DIR)
+
+# Parsed bundle indexes by path, checked against the index file's mtime; codecs by dictionary
+_indexes = {}
+_codecs = {}
+_cache_lock = threading.Lock()
+
+def index_path(root, directory):
+    """The index file of a directory (relative to root, "" for the top level)."""
+    return os.path.join(root, *[part for part in directory.split("/") if part], BUNDLE_INDEX)
+
+def read_index(path):
+    """The parsed bundle index at path ({"bundle", "codec", "dictionary", "records"}), or None."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _indexes.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading cold storage index {path}: {e}")
+        return None
+    with _cache_lock:
+        _indexes[path] = (mtime, index)
+    return index
+
+def codec(root, name, dictionary_id):
+    """The codec for records compressed with a dictionary from root's dictionary directory."""
+    key = (root, name, dictionary_id)
+    with _cache_lock:
+        cached = _codecs.get(key)
+    if cached is None:
+        dictionary = b""
+        if dictionary_id:
+            with open(os.path.join(dictionary_dir(root), dictionary_id), "rb") as f:
+                dictionary = f.read()
+        cached = Codec(name, dictionary)
+        with _cache_lock:
+            _codecs[key] = cached
+    return cached
+
+def split(filename):
+    directory, _, name = filename.rpartition("/")
+    return directory, name
+
+def record_mtime(root, filename):
+    """The original modification time of a case file held in cold storage, or None."""
+    directory, name = split(filename)
+    index = read_index(index_path(root, directory))
+    record = index["records"].get(name) if index else None
+    return record[2] if record else None
+
+def contains(root, filename):
+    return record_mtime(root, filename) is not None
+
+def list_names(root, directory):
+    """Names of the case files held in a directory's bundle."""
+    index = read_index(index_path(root, directory))
+    return list(index["records"]) if index else []
+
+def read(root, filename):
+    """The text of a case file held in cold storage, read from its bundle by offset, or None."""
+    directory, name = split(filename)
+    path = index_path(root, directory)
+    index = read_index(path)
+    record = index["records"].get(name) if index else None
+    if record is None:
+        return None
+    offset, length, _ = record
+    try:
+        with open(os.path.join(os.path.dirname(path), index["bundle"]), "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        return codec(root, index["codec"], index["dictionary"]).decompress(data).decode("utf-8")
+    except (OSError, zlib.error, ValueError) as e:
+        print(f"Error reading {filename} from cold storage: {e}")
+        return None
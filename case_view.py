@@ -0,0 +1,82 @@
+# case_view.py
+import sys
+import json
+from typing import NamedTuple, Tuple
+import file_utils
+from models import CaseRecord, InquiryEntry
+
+class InquiryView(NamedTuple):
+    """Read-only counterpart of InquiryEntry. Character names are interned."""
+    character: str
+    question: str
+    response: str
+
+    def to_entry(self):
+        return InquiryEntry(character=self.character, question=self.question, response=self.response)
+
+class CaseView(NamedTuple):
+    """
+    Lightweight read-only view of a saved case for bulk work (exports, analytics, migration).
+    A slot-free tuple built straight from the on-disk JSON without pydantic validation; judge,
+    difficulty and character names are interned so repeated values share one string.
+    Use to_record() to get a validated CaseRecord when a single case is actually needed.
+    """
+    case_id: str
+    date: str
+    player_name: str
+    difficulty: str
+    scenario: str
+    inquiry_history: Tuple[InquiryView, ...]
+    judgment: str
+    analysis: str
+
+    @classmethod
+    def from_dict(cls, data, _new=tuple.__new__):
+        # tuple.__new__ skips the generated __new__'s argument handling; this is the hot path for bulk loads.
+        get = data.get
+        return _new(cls, (
+            data["case_id"],
+            get("date", "Unknown"),
+            sys.intern(get("player_name", "Unknown")),
+            sys.intern(get("difficulty", "Unknown")),
+            get("scenario", ""),
+            tuple([_new(InquiryView, (sys.intern(h["character"]), h["question"], h["response"])) for h in get("inquiry_history", ())]),
+            get("judgment", ""),
+            get("analysis", ""),
+        ))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    @classmethod
+    def from_record(cls, case_record: CaseRecord):
+        return cls.from_dict(case_record.model_dump())
+
+    def to_dict(self):
+        data = self._asdict()
+        data["inquiry_history"] = [h._asdict() for h in self.inquiry_history]
+        return data
+
+    def to_record(self):
+        """Validates and converts the view into a full CaseRecord."""
+        return CaseRecord.model_validate(self.to_dict())
+
+def load_case_view(filename):
+    """Loads a case file as a CaseView. Legacy TXT files go through load_case's parser."""
+    if not filename.endswith(".json"):
+        case_record = file_utils.load_case(filename)
+        return CaseView.from_record(case_record) if case_record else None
+    try:
+        text = file_utils.read_case_text(filename)
+        return CaseView.from_json(text) if text is not None else None
+    except (IOError, OSError, ValueError, KeyError) as e:
+        print(f"Error loading case view {filename}: {e}")
+        return None
+
+def iter_case_views():
+    """Yields a CaseView for every archived case, newest first, one file at a time."""
+    for filename in file_utils.iter_past_cases():
+        view = load_case_view(filename)
+        if view is not None:
+            yield view
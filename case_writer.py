@@ -0,0 +1,114 @@
+# case_writer.py
+import os
+import atexit
+import queue
+import threading
+import file_utils
+# Imported for their save hooks (see file_utils.register_save_hook)
+import archive_analytics  # noqa: F401
+import archive_watcher  # noqa: F401
+import player_profiles  # noqa: F401
+from models import CaseRecord
+
+PENDING = "pending"
+SAVED = "saved"
+FAILED = "failed"
+
+class CaseWriter:
+    """
+    Persists CaseRecords on a background thread so page renders never wait on disk I/O.
+    Each case_id is accepted exactly once; repeated submissions (e.g. from Streamlit reruns) are ignored.
+    Writes are drained in batches with a single directory fsync per batch.
+    """
+
+    def __init__(self, batch_size=32):
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._status = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, case_record: CaseRecord):
+        """Queues a case for saving. Returns False if this case_id is already pending or saved."""
+        with self._lock:
+            if self._closed or self._status.get(case_record.case_id) in (PENDING, SAVED):
+                return False
+            self._status[case_record.case_id] = PENDING
+            self._ensure_thread()
+        self._queue.put(case_record)
+        return True
+
+    def status(self, case_id):
+        """Returns PENDING, SAVED, FAILED or None if the case was never submitted."""
+        with self._lock:
+            return self._status.get(case_id)
+
+    def flush(self, timeout=None):
+        """Blocks until every queued case has been written (or the timeout elapses)."""
+        done = threading.Event()
+        self._queue.put(done)
+        with self._lock:
+            self._ensure_thread()
+        return done.wait(timeout)
+
+    def shutdown(self, timeout=10):
+        """Flushes outstanding writes and stops accepting new cases. Registered with atexit."""
+        with self._lock:
+            self._closed = True
+            running = self._thread is not None and self._thread.is_alive()
+        if running:
+            self.flush(timeout)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="case-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        written = set()
+        try:
+            for item in batch:
+                if isinstance(item, CaseRecord):
+                    try:
+                        ok = file_utils.save_case(item, sync_dir=False)
+                    except Exception as e:
+                        # One bad case must not take the writer thread (and every later case) with it
+                        print(f"Error saving case {item.case_id}: {e}")
+                        ok = False
+                    if ok:
+                        written.add(os.path.dirname(file_utils.case_path(file_utils.case_filename(item.case_id))))
+                    with self._lock:
+                        self._status[item.case_id] = SAVED if ok else FAILED
+            # One fsync per shard directory written to, for the whole batch
+            for directory in written:
+                try:
+                    file_utils.fsync_dir(directory)
+                except OSError as e:
+                    print(f"Error syncing {directory}: {e}")
+        finally:
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_case_writer():
+    """Returns the process-wide CaseWriter, creating it (and its shutdown hook) on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = CaseWriter()
+            atexit.register(_writer.shutdown)
+        return _writer
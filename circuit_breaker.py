@@ -0,0 +1,76 @@
+# circuit_breaker.py
+import time
+import threading
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Trips after `failure_threshold` consecutive failed or slow calls and then rejects calls
+    for `reset_timeout` seconds. After that a single trial call is let through (half-open):
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, slow_call_seconds=20.0, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Returns True if a call may proceed now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: only one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._state = HALF_OPEN
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self, elapsed):
+        """Records a completed call; one slower than slow_call_seconds counts as a failure."""
+        if elapsed > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def release_trial(self):
+        """
+        Ends a call that says nothing about the backend's health (a bad request, an
+        unparseable reply): neither the failure count nor the state changes, but a
+        half-open breaker may let its next trial through.
+        """
+        with self._lock:
+            self._trial_in_flight = False
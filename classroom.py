@@ -0,0 +1,112 @@
+# classroom.py
+"""
+Classroom cases: one scenario, generated once, judged by many players.
+
+A classroom is created for a difficulty and gets a short code that players enter to join.
+Every member judges the same scenario. The Royal Advisor's brief of the scenario (values in
+conflict, key facts, ambiguities) is prepared once, in the background as soon as the
+classroom is created, and every judgment is then analyzed against it.
+
+Classrooms are kept as JSON files in CLASSROOMS_DIR, so every server process sees them.
+"""
+import os
+import re
+import secrets
+import threading
+import file_utils
+import llm_integration
+from models import Classroom, AdvisorBrief
+
+CLASSROOMS_DIR = os.getenv("CLASSROOMS_DIR", "classrooms")
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 6
+SAFE_CODE = re.compile(rf"^[{CODE_ALPHABET}]{{{CODE_LENGTH}}}$")
+
+def normalize_code(code):
+    """The code as stored (upper case, no spaces), or None if it cannot be a classroom code."""
+    code = (code or "").strip().replace(" ", "").upper()
+    return code if SAFE_CODE.match(code) else None
+
+class ClassroomStore:
+    def __init__(self, directory=CLASSROOMS_DIR):
+        self.directory = directory
+        self._cache = {}
+        self._brief_locks = {}
+        self._lock = threading.Lock()
+
+    def _path(self, code):
+        return os.path.join(self.directory, f"{code}.json")
+
+    def _save(self, classroom):
+        os.makedirs(self.directory, exist_ok=True)
+        file_utils.atomic_write_text(self._path(classroom.code), classroom.model_dump_json(indent=4), fsync=False)
+        with self._lock:
+            self._cache[classroom.code] = classroom
+
+    def get(self, code):
+        """The classroom for a code, or None."""
+        code = normalize_code(code)
+        if code is None:
+            return None
+        with self._lock:
+            classroom = self._cache.get(code)
+        # Another process may have added the brief since this one cached the classroom
+        if classroom is not None and classroom.brief is not None:
+            return classroom
+        try:
+            with open(self._path(code), "r", encoding="utf-8") as f:
+                classroom = Classroom.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"Error loading classroom {code}: {e}")
+            return None
+        with self._lock:
+            self._cache[code] = classroom
+        return classroom
+
+    def create(self, difficulty="Moderate"):
+        """
+        Generates the classroom's scenario and starts preparing its brief in the background.
+        Returns the Classroom, or the LLM's {"error": ...} dict.
+        """
+        scenario = llm_integration.generate_scenario_with_llm(None, difficulty, add_to_library=False)
+        if isinstance(scenario, dict):
+            return scenario
+        while True:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if not os.path.exists(self._path(code)):
+                break
+        classroom = Classroom(code=code, difficulty=difficulty, scenario=scenario)
+        self._save(classroom)
+        threading.Thread(target=self.brief, args=(code,), name=f"classroom-brief-{code}", daemon=True).start()
+        return classroom
+
+    def join(self, code, player_name):
+        """The classroom for a player joining with a code, or None. Its scenario never enters the shared library."""
+        return self.get(code)
+
+    def brief(self, code):
+        """
+        The Advisor's brief for a classroom's scenario, generated on first use and kept with
+        the classroom. Concurrent callers wait for a single generation. None if it cannot be had.
+        """
+        classroom = self.get(code)
+        if classroom is None:
+            return None
+        if classroom.brief is not None:
+            return classroom.brief
+        with self._lock:
+            lock = self._brief_locks.setdefault(classroom.code, threading.Lock())
+        with lock:
+            classroom = self.get(code)
+            if classroom.brief is not None:
+                return classroom.brief
+            brief = llm_integration.generate_advisor_brief_with_llm(classroom.scenario.scenario, classroom.difficulty)
+            if not isinstance(brief, AdvisorBrief):
+                return None
+            classroom = classroom.model_copy(update={"brief": brief})
+            self._save(classroom)
+            return brief
+
+classrooms = ClassroomStore()
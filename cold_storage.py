@@ -0,0 +1,307 @@
+# cold_storage.py
+"""
+Compressed cold storage for old archived cases.
+
+    python cold_storage.py [--days 30] [--codec auto|zstd|zlib] [--retrain]
+
+Cases older than COLD_STORAGE_DAYS are moved out of their individual JSON files into one
+bundle per directory (a date shard, or the top level for legacy cases). Each record is
+compressed on its own against a dictionary trained on the archive itself, so any single
+case can be read back by seeking to its offset and decompressing just that record.
+Dictionaries are kept in past_cases/_dictionaries/ and named by their hash; each bundle's
+index (cold_index.json) lists its records and the dictionary they need. The format, and
+reading from it, is in case_bundles.py.
+
+The dictionary is trained once per codec, on a sample of the whole archive (bundled cases
+included), and recorded in _dictionaries/current.json; later runs reuse it until run with
+--retrain. Dictionaries that neither a bundle nor current.json refers to are deleted.
+
+zstandard is used when installed (its dictionaries are trained with zstd's own trainer).
+Otherwise zlib is used with a preset dictionary of the lines and phrases most shared
+between cases.
+file_utils.load_case, iter_past_cases and the archive index read bundles transparently.
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+from collections import Counter
+import file_utils
+import case_bundles
+from case_bundles import zstandard
+
+# Cases older than this many days are moved to cold storage
+COLD_STORAGE_DAYS = float(os.getenv("COLD_STORAGE_DAYS", "30"))
+# "auto" uses zstd if the zstandard package is installed, zlib otherwise
+COLD_STORAGE_CODEC = os.getenv("COLD_STORAGE_CODEC", "auto")
+COLD_DICTIONARY_SAMPLES = 2000
+# Names the dictionary, per codec, that new bundles are written with
+CURRENT_DICTIONARIES = "current.json"
+# zlib can only refer back 32 KB, so its preset dictionaries are capped there
+DICTIONARY_BYTES = {"zstd": 64 * 1024, "zlib": 32 * 1024}
+
+def _codec_name(codec=COLD_STORAGE_CODEC):
+    if codec == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if codec == "zstd" and zstandard is None:
+        raise ImportError("Install the 'zstandard' package to use zstd cold storage.")
+    return codec
+
+def _zlib_dictionary(samples, size):
+    # Whole lines (the JSON layout) and word 4-grams (stock phrases) found in more than one
+    # case, the most bytes saved first; laid out most common last, where zlib reaches cheapest
+    shared = Counter()
+    for sample in samples:
+        words = sample.split(b" ")
+        pieces = set(sample.splitlines(keepends=True))
+        pieces.update(b" ".join(words[i:i + 4]) + b" " for i in range(len(words) - 3))
+        shared.update(pieces)
+    candidates = sorted(((count, piece) for piece, count in shared.items() if count > 1 and len(piece) > 8),
+                        key=lambda item: item[0] * len(item[1]), reverse=True)
+    chosen, total = [], 0
+    for count, piece in candidates:
+        if total + len(piece) > size:
+            continue
+        chosen.append((count, piece))
+        total += len(piece)
+    return b"".join(piece for _, piece in sorted(chosen))
+
+def train_dictionary(codec, samples):
+    """A compression dictionary for records like the samples (bytes), or b"" if too few to train on."""
+    if len(samples) < 2:
+        return b""
+    size = DICTIONARY_BYTES[codec]
+    if codec == "zstd":
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            print(f"Could not train a zstd dictionary ({e}); compressing without one.")
+            return b""
+    return _zlib_dictionary(samples, size)
+
+def _save_dictionary(codec, dictionary):
+    if not dictionary:
+        return None
+    dictionary_id = f"{hashlib.sha1(dictionary).hexdigest()[:16]}.{codec}"
+    directory = case_bundles.dictionary_dir(file_utils.PAST_CASES_DIR)
+    path = os.path.join(directory, dictionary_id)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(dictionary)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        file_utils.fsync_dir(directory)
+    return dictionary_id
+
+def _current_path():
+    return os.path.join(case_bundles.dictionary_dir(file_utils.PAST_CASES_DIR), CURRENT_DICTIONARIES)
+
+def _current_dictionaries():
+    try:
+        with open(_current_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error reading {_current_path()}: {e}")
+        return {}
+
+def current_dictionary(codec):
+    """The dictionary new bundles of a codec are written with, or None if none has been trained."""
+    dictionary_id = _current_dictionaries().get(codec)
+    if dictionary_id and os.path.exists(os.path.join(case_bundles.dictionary_dir(file_utils.PAST_CASES_DIR), dictionary_id)):
+        return dictionary_id
+    return None
+
+def _set_current_dictionary(codec, dictionary_id):
+    current = _current_dictionaries()
+    current[codec] = dictionary_id
+    file_utils.atomic_write_text(_current_path(), json.dumps(current))
+    file_utils.fsync_dir(os.path.dirname(_current_path()))
+
+def _archive_samples():
+    """Up to COLD_DICTIONARY_SAMPLES case records (bytes) drawn at random from the whole archive, bundled ones included."""
+    limit = COLD_DICTIONARY_SAMPLES
+    rng = random.Random(0)
+    chosen = []
+    for i, filename in enumerate(file_utils.iter_past_cases()):
+        if len(chosen) < limit:
+            chosen.append(filename)
+        else:
+            j = rng.randrange(i + 1)
+            if j < limit:
+                chosen[j] = filename
+    samples = []
+    for filename in chosen:
+        try:
+            text = file_utils.read_case_text(filename)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {filename} as a dictionary sample: {e}")
+            continue
+        if text is not None:
+            samples.append(text.encode("utf-8"))
+    return samples
+
+def collect_dictionaries():
+    """Deletes dictionaries that no bundle index, nor current.json, refers to. Returns their names."""
+    root = file_utils.PAST_CASES_DIR
+    directory = case_bundles.dictionary_dir(root)
+    keep = set(_current_dictionaries().values())
+    for folder, subdirectories, files in os.walk(root):
+        subdirectories[:] = [d for d in subdirectories if d != case_bundles.DICTIONARY_DIR]
+        if case_bundles.BUNDLE_INDEX in files:
+            index = case_bundles.read_index(os.path.join(folder, case_bundles.BUNDLE_INDEX))
+            if index is None:
+                # Cannot tell what an unreadable index needs; keep everything
+                return []
+            keep.add(index["dictionary"])
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    removed = []
+    for name in names:
+        if name == CURRENT_DICTIONARIES or name in keep:
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+            removed.append(name)
+        except FileNotFoundError:
+            pass
+    if removed:
+        file_utils.fsync_dir(directory)
+    return removed
+
+def _index_path(directory):
+    return case_bundles.index_path(file_utils.PAST_CASES_DIR, directory)
+
+def _codec(name, dictionary_id):
+    return case_bundles.codec(file_utils.PAST_CASES_DIR, name, dictionary_id)
+
+def _case_age_days(filename, now):
+    case_id = case_bundles.split(filename)[1].replace("case_", "").rsplit(".", 1)[0]
+    created = file_utils.case_id_time(case_id)
+    created = created.timestamp() if created is not None else file_utils.case_mtime(filename)
+    return (now - created) / 86400 if created is not None else 0.0
+
+def _write_bundle(directory, records, codec, dictionary_id):
+    """Writes {name: (bytes, mtime)} as a directory's bundle and index, replacing any earlier bundle."""
+    index_path = _index_path(directory)
+    folder = os.path.dirname(index_path)
+    previous = case_bundles.read_index(index_path)
+    bundle = f"cold_{int(time.time() * 1000)}_{os.getpid()}.bundle"
+    entries, offset = {}, 0
+    with open(os.path.join(folder, bundle), "wb") as f:
+        for name in sorted(records, reverse=True):
+            data, mtime = records[name]
+            compressed = codec.compress(data)
+            f.write(compressed)
+            entries[name] = [offset, len(compressed), mtime]
+            offset += len(compressed)
+        f.flush()
+        os.fsync(f.fileno())
+    index = {"bundle": bundle, "codec": codec.name, "dictionary": dictionary_id, "records": entries}
+    file_utils.atomic_write_text(index_path, json.dumps(index))
+    file_utils.fsync_dir(folder)
+    if previous is not None and previous["bundle"] != bundle:
+        try:
+            os.remove(os.path.join(folder, previous["bundle"]))
+        except OSError:
+            pass
+    return offset
+
+def tier_archive(days=COLD_STORAGE_DAYS, codec=COLD_STORAGE_CODEC, now=None, retrain=False):
+    """
+    Moves plain case files older than `days` into their directory's bundle. A bundle that
+    already exists is rewritten with its old records and the new ones under the current
+    dictionary, which is trained first if there is none or `retrain` is given. Unreferenced
+    dictionaries are deleted afterwards. Returns counts: "moved", "bundles", "bytes_before"
+    (the moved files), "bytes_after" (the bundles written, old records included), the
+    "dictionary" used, whether it was "trained" by this run, and dictionaries "collected".
+    """
+    now = time.time() if now is None else now
+    name = _codec_name(codec)
+    by_directory = {}
+    for filename in file_utils.iter_past_cases():
+        if os.path.exists(file_utils.case_path(filename)) and _case_age_days(filename, now) >= days:
+            by_directory.setdefault(case_bundles.split(filename)[0], []).append(filename)
+    counts = {"moved": 0, "bundles": 0, "bytes_before": 0, "bytes_after": 0, "dictionary": None, "trained": False, "collected": 0}
+    if not by_directory and not retrain:
+        counts["collected"] = len(collect_dictionaries())
+        return counts
+
+    dictionary_id = None if retrain else current_dictionary(name)
+    if dictionary_id is None:
+        dictionary_id = _save_dictionary(name, train_dictionary(name, _archive_samples()))
+        counts["trained"] = True
+        if dictionary_id is not None:
+            _set_current_dictionary(name, dictionary_id)
+    codec = _codec(name, dictionary_id)
+    counts["dictionary"] = dictionary_id
+
+    for directory, filenames in by_directory.items():
+        records, complete = {}, True
+        previous = case_bundles.read_index(_index_path(directory))
+        if previous is not None:
+            for record_name, (_, _, mtime) in previous["records"].items():
+                text = case_bundles.read(file_utils.PAST_CASES_DIR, f"{directory}/{record_name}" if directory else record_name)
+                if text is None:
+                    complete = False
+                    break
+                records[record_name] = (text.encode("utf-8"), mtime)
+        if not complete:
+            # Rewriting the bundle now would drop the records that could not be read
+            print(f"Skipping {directory or 'the top level'}: its bundle could not be read back in full.")
+            continue
+        moved = []
+        for filename in filenames:
+            path = file_utils.case_path(filename)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                mtime = os.path.getmtime(path)
+            except FileNotFoundError:
+                # Removed since it was listed; there is nothing left to move
+                continue
+            records[case_bundles.split(filename)[1]] = (data, mtime)
+            counts["bytes_before"] += len(data)
+            moved.append(filename)
+        if not moved:
+            continue
+        counts["bytes_after"] += _write_bundle(directory, records, codec, dictionary_id)
+        # The originals go only once the index that replaces them is on disk
+        for filename in moved:
+            try:
+                os.remove(file_utils.case_path(filename))
+            except FileNotFoundError:
+                pass
+        file_utils.fsync_dir(os.path.dirname(_index_path(directory)))
+        counts["moved"] += len(moved)
+        counts["bundles"] += 1
+    counts["collected"] = len(collect_dictionaries())
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old archived cases into compressed cold storage bundles.")
+    parser.add_argument("--days", type=float, default=COLD_STORAGE_DAYS, help="Minimum case age in days.")
+    parser.add_argument("--codec", choices=["auto", "zstd", "zlib"], default=COLD_STORAGE_CODEC)
+    parser.add_argument("--retrain", action="store_true", help="Train a new dictionary instead of reusing the current one.")
+    args = parser.parse_args(argv)
+    counts = tier_archive(args.days, args.codec, retrain=args.retrain)
+    ratio = counts["bytes_before"] / counts["bytes_after"] if counts["bytes_after"] else 0.0
+    print(f"Moved {counts['moved']} cases into {counts['bundles']} bundles "
+          f"({counts['bytes_before'] / 1024:.0f} KB -> {counts['bytes_after'] / 1024:.0f} KB, {ratio:.1f}x)")
+    if counts["trained"]:
+        print(f"Trained dictionary {counts['dictionary']}")
+    if counts["collected"]:
+        print(f"Deleted {counts['collected']} unused dictionaries")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,33 @@ import os
 import datetime
 import re
 import json
+import socket
+import secrets
+import hashlib
+import tempfile
+import threading
+import case_bundles
 from models import CaseRecord, InquiryEntry
 
 PAST_CASES_DIR = "past_cases"
+# Crockford base32, as used by ULIDs: sorts in the same order as the values it encodes
+CASE_ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# 10 characters of millisecond timestamp, 4 of node (host and process), 12 of sequence
+CASE_ID_PATTERN = re.compile(rf"^[{CASE_ID_ALPHABET}]{{26}}$")
+
+# Run after every successful save_case as hook(case_record, is_new); see register_save_hook
+_save_hooks = []
+
+def register_save_hook(hook):
+    """
+    Runs hook(case_record, is_new) after every successful save_case, where is_new is True
+    on the first save of a case_id. A hook that raises is logged and skipped; the save
+    still succeeds. Modules that keep data derived from the archive
+    (analytics, player profiles, the archive index) register themselves when imported;
+    code that saves cases imports them so their data stays current.
+    """
+    if hook not in _save_hooks:
+        _save_hooks.append(hook)
 
 def ensure_past_cases_dir_exists():
     """Ensures the directory for past cases exists."""
@@ -17,36 +41,131 @@ def ensure_past_cases_dir_exists():
             return False
     return True
 
-def save_case(case_record: CaseRecord):
-    """Saves a completed case to a JSON file."""
+def fsync_dir(path):
+    """Flushes a directory entry to disk so a completed rename survives a crash."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write_text(path, text, fsync=True):
+    """
+    Writes text to path via a temporary file in the same directory and an atomic rename,
+    so readers never see a partially written file. Callers fsync the directory afterwards.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_case(case_record: CaseRecord, sync_dir=True):
+    """
+    Saves a completed case to a JSON file atomically, in its date shard (see case_filename).
+    Pass sync_dir=False when the caller batches the directory fsync itself (see case_writer).
+    Registered save hooks are told whether this was the first save of the case_id.
+    """
     if not ensure_past_cases_dir_exists():
         return False
 
-    filename = os.path.join(PAST_CASES_DIR, f"case_{case_record.case_id}.json")
+    filename = case_path(case_filename(case_record.case_id))
+    if not ensure_case_dir(os.path.dirname(filename)):
+        return False
+    is_new = not case_exists(case_filename(case_record.case_id))
 
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(case_record.model_dump_json(indent=4))
-        return True
-    except IOError as e:
+        atomic_write_text(filename, case_record.model_dump_json(indent=4))
+        if sync_dir:
+            fsync_dir(os.path.dirname(filename))
+    except (IOError, OSError) as e:
         print(f"Error saving case {case_record.case_id} to {filename}: {e}")
         return False
+    for hook in _save_hooks:
+        try:
+            hook(case_record, is_new)
+        except Exception as e:
+            # The case is on disk: a failing hook must not fail the save, nor skip the hooks after it
+            print(f"Error in save hook {getattr(hook, '__qualname__', hook)} for case {case_record.case_id}: {e}")
+    return True
 
-def load_case(filename):
-    """Loads and parses a case file (JSON or legacy TXT) from the past_cases directory."""
-    path = os.path.join(PAST_CASES_DIR, filename)
-    if not os.path.exists(path):
+def ensure_case_dir(directory):
+    """Creates a case directory and any missing parents, flushing each new directory entry to disk."""
+    if os.path.isdir(directory):
+        return True
+    parent = os.path.dirname(directory)
+    if parent and not ensure_case_dir(parent):
+        return False
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fsync_dir(parent or ".")
+    except OSError as e:
+        print(f"Error creating directory {directory}: {e}")
+        return False
+    return True
+
+def case_id_time(case_id):
+    """The UTC creation time encoded in a case ID from generate_case_id, or None for other IDs."""
+    if not CASE_ID_PATTERN.match(case_id):
         return None
+    millis = 0
+    for char in case_id[:10]:
+        millis = millis * 32 + CASE_ID_ALPHABET.index(char)
+    return datetime.datetime.fromtimestamp(millis / 1000, tz=datetime.timezone.utc)
+
+def case_filename(case_id):
+    """
+    The path of a case's file relative to PAST_CASES_DIR. Cases with IDs from generate_case_id
+    live in a shard for their UTC date ("2026/10/17/case_<id>.json"); any other ID (legacy
+    timestamps, imports) stays in the top-level directory.
+    """
+    created = case_id_time(case_id)
+    if created is None:
+        return f"case_{case_id}.json"
+    return created.strftime("%Y/%m/%d/") + f"case_{case_id}.json"
+
+def case_path(filename):
+    """Returns the on-disk path of a case file listed by list_past_cases."""
+    return os.path.join(PAST_CASES_DIR, *filename.split("/"))
 
+def case_mtime(filename):
+    """Returns the modification time of a case file (also one in cold storage), or None if it does not exist."""
     try:
+        return os.path.getmtime(case_path(filename))
+    except OSError:
+        return case_bundles.record_mtime(PAST_CASES_DIR, filename)
+
+def case_exists(filename):
+    return os.path.exists(case_path(filename)) or case_bundles.contains(PAST_CASES_DIR, filename)
+
+def read_case_text(filename):
+    """The raw text of a case file, from its own file or, once tiered, from its cold storage bundle."""
+    try:
+        with open(case_path(filename), "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return case_bundles.read(PAST_CASES_DIR, filename)
+
+def load_case(filename):
+    """Loads and parses a case file (JSON or legacy TXT) from the past_cases directory or its cold storage."""
+    try:
+        content = read_case_text(filename)
+        if content is None:
+            return None
         if filename.endswith(".json"):
-            with open(path, "r", encoding="utf-8") as f:
-                return CaseRecord.model_validate_json(f.read())
+            return CaseRecord.model_validate_json(content)
         else:
             # Legacy TXT parsing
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-
             # Extract Case ID and Date
             case_id_match = re.search(r"Case ID: (.*)\n", content)
             date_match = re.search(r"Date: (.*)\n", content)
@@ -97,13 +216,86 @@ def load_case(filename):
         print(f"Error loading case {filename}: {e}")
         return None
 
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(CASE_ID_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+class _CaseIdGenerator:
+    """
+    ULID-style IDs: a millisecond timestamp, a 20-bit node component hashed from the host,
+    process and a random salt, and a sequence that starts at random each millisecond and
+    counts up within it. IDs from one process are strictly increasing even if the clock
+    steps back. Processes are not coordinated: two of them produce the same ID only if
+    their nodes collide and they draw overlapping sequences in the same millisecond, which
+    is vanishingly unlikely but not impossible, and nothing checks for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._node = None
+        self._last_millis = -1
+        self._sequence = 0
+
+    def __call__(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Also after a fork: the child must not reuse the parent's node
+                self._pid = os.getpid()
+                digest = hashlib.sha1(f"{socket.gethostname()}:{self._pid}:{secrets.token_hex(4)}".encode()).digest()
+                self._node = int.from_bytes(digest[:3], "big") >> 4
+                self._last_millis = -1
+            millis = int(datetime.datetime.now(datetime.timezone.utc).timestamp() * 1000)
+            if millis > self._last_millis:
+                self._last_millis = millis
+                # Random start, leaving plenty of room to count up within the millisecond
+                self._sequence = secrets.randbits(59)
+            else:
+                self._sequence += 1
+            return _encode(self._last_millis, 10) + _encode(self._node, 4) + _encode(self._sequence, 12)
+
+_next_case_id = _CaseIdGenerator()
+
 def generate_case_id():
-    """Generates a unique case ID based on timestamp."""
-    return datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    """Generates a time-sortable case ID, unique within the process and almost surely across processes (see _CaseIdGenerator)."""
+    return _next_case_id()
 
-def list_past_cases():
-    if not os.path.exists(PAST_CASES_DIR):
+def _sorted_entries(path, directories):
+    """Names of the shard directories (or case files, including those in cold storage) in path, newest first."""
+    try:
+        with os.scandir(path) as entries:
+            if directories:
+                names = [e.name for e in entries if e.name.isdigit() and e.is_dir()]
+            else:
+                names = set()
+                for e in entries:
+                    if e.name.startswith("case_") and (e.name.endswith(".txt") or e.name.endswith(".json")):
+                        names.add(e.name)
+                    elif e.name == case_bundles.BUNDLE_INDEX:
+                        relative = os.path.relpath(path, PAST_CASES_DIR).replace(os.sep, "/")
+                        names.update(case_bundles.list_names(PAST_CASES_DIR, "" if relative == "." else relative))
+    except OSError:
         return []
-    # Sort files by date (newest first) based on their filename timestamp
-    files = [f for f in os.listdir(PAST_CASES_DIR) if f.startswith("case_") and (f.endswith(".txt") or f.endswith(".json"))]
-    return sorted(files, reverse=True)
+    return sorted(names, reverse=True)
+
+def iter_past_cases():
+    """
+    Yields archived case files, newest first, as paths relative to PAST_CASES_DIR.
+    Date shards are read one directory at a time as the caller advances; legacy cases in
+    the top-level directory come last.
+    """
+    for year in _sorted_entries(PAST_CASES_DIR, directories=True):
+        year_dir = os.path.join(PAST_CASES_DIR, year)
+        for month in _sorted_entries(year_dir, directories=True):
+            month_dir = os.path.join(year_dir, month)
+            for day in _sorted_entries(month_dir, directories=True):
+                for filename in _sorted_entries(os.path.join(month_dir, day), directories=False):
+                    yield f"{year}/{month}/{day}/{filename}"
+    yield from _sorted_entries(PAST_CASES_DIR, directories=False)
+
+def list_past_cases():
+    """All archived case files, newest first (see iter_past_cases)."""
+    return list(iter_past_cases())
@@ -0,0 +1,270 @@
+# job_queue.py
+"""
+Durable queue for LLM work, kept in SQLite.
+
+A job is keyed by (case_id, stage) and holds the inputs for one LLM call; its result is
+stored with it. Submitting the same key again returns the existing job, so Streamlit
+reruns, reloads and server restarts pick up the job already queued, running or done
+instead of paying for the call twice. Workers claim jobs under a lease: a job whose
+worker died is claimed again once its lease runs out.
+
+By default (JOB_WORKER_MODE=embedded) the app runs worker threads itself. With
+JOB_WORKER_MODE=external the app only queues jobs, and a separate pool of worker
+processes runs them, so analyses in flight survive an app restart:
+
+    python job_queue.py --processes 2
+
+Each worker process has its own llm_scheduler, so the app's caps do not cover the pool:
+the pool's threads, across all its processes, are capped at the scheduler's ANALYSIS
+ceiling (LLM_MAX_CONCURRENCY - LLM_INTERACTIVE_RESERVE) instead.
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from collections import namedtuple
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "llm_jobs.sqlite3")
+# "embedded" runs workers inside the app process, "external" leaves jobs to `python job_queue.py`
+JOB_WORKER_MODE = os.getenv("JOB_WORKER_MODE", "embedded")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+# Longer than an LLM call can take, including its wait for a scheduler slot
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "180"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+Job = namedtuple("Job", ["case_id", "stage", "status", "payload", "result", "error", "attempts"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    case_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (case_id, stage)
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, created);
+"""
+
+def _run_analysis(payload):
+    import llm_integration
+    from classroom import classrooms
+    brief = classrooms.brief(payload["classroom_code"]) if payload.get("classroom_code") else None
+    analysis = llm_integration.analyze_judgment_with_llm(
+        payload["player_judgment"], payload["scenario_details"], payload["player_name"],
+        difficulty=payload["difficulty"], advisor_brief=brief
+    )
+    return analysis if isinstance(analysis, dict) else analysis.model_dump()
+
+# stage -> function of the job payload returning a JSON-able result, or {"error": ...}
+HANDLERS = {"analysis": _run_analysis}
+
+def _job(row):
+    if row is None:
+        return None
+    case_id, stage, status, payload, result, error, attempts = row
+    return Job(case_id, stage, status, json.loads(payload), json.loads(result) if result else None, error, attempts)
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT around a block, so a claim cannot race another worker's."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+class JobQueue:
+    """SQLite-backed jobs keyed by (case_id, stage); safe to share between threads and processes."""
+
+    def __init__(self, path=JOB_QUEUE_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._wake = threading.Condition()
+        self._workers = []
+        self._stop = threading.Event()
+        self._db().executescript(SCHEMA)
+
+    def _db(self):
+        # One connection per thread, in autocommit mode; writes go through _transaction
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = self._local.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._db())
+
+    def submit(self, case_id, stage, payload):
+        """Queues a job unless one exists for (case_id, stage); returns the job either way."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("INSERT OR IGNORE INTO jobs (case_id, stage, status, payload, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                       (case_id, stage, QUEUED, json.dumps(payload), now, now))
+            job = self._get(db, case_id, stage)
+        if job.status == QUEUED:
+            with self._wake:
+                self._wake.notify()
+        return job
+
+    def _get(self, db, case_id, stage):
+        return _job(db.execute("SELECT case_id, stage, status, payload, result, error, attempts FROM jobs WHERE case_id = ? AND stage = ?",
+                               (case_id, stage)).fetchone())
+
+    def get(self, case_id, stage):
+        return self._get(self._db(), case_id, stage)
+
+    def retry(self, case_id, stage):
+        """Queues a failed job again, with a fresh allowance of attempts."""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = ?, error = NULL, attempts = 0, updated = ? WHERE case_id = ? AND stage = ? AND status = ?",
+                       (QUEUED, time.time(), case_id, stage, FAILED))
+        with self._wake:
+            self._wake.notify()
+
+    def claim(self):
+        """Takes the oldest queued job, or one whose worker's lease ran out, for this worker."""
+        now = time.time()
+        with self._transaction() as db:
+            while True:
+                row = db.execute("SELECT case_id, stage, attempts FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                                 "ORDER BY created LIMIT 1", (QUEUED, RUNNING, now)).fetchone()
+                if row is None:
+                    return None
+                case_id, stage, attempts = row
+                if attempts < self.max_attempts:
+                    break
+                db.execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE case_id = ? AND stage = ?",
+                           (FAILED, "The job was abandoned by its workers too many times.", now, case_id, stage))
+            db.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated = ? WHERE case_id = ? AND stage = ?",
+                       (RUNNING, self.worker_id, now + self.lease_seconds, now, case_id, stage))
+            return self._get(db, case_id, stage)
+
+    def finish(self, job, result):
+        """
+        Stores a job's result; a result of the form {"error": ...} marks the job failed.
+        Only the current claim may finish a job: returns False, storing nothing, for the late
+        result of a worker whose lease ran out and whose job was claimed again.
+        """
+        failed = isinstance(result, dict) and "error" in result
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = ?, result = ?, error = ?, worker = NULL, lease_until = NULL, updated = ? "
+                                "WHERE case_id = ? AND stage = ? AND status = ? AND worker = ? AND attempts = ?",
+                                (FAILED if failed else DONE, None if failed else json.dumps(result), result["error"] if failed else None,
+                                 time.time(), job.case_id, job.stage, RUNNING, self.worker_id, job.attempts))
+            return cursor.rowcount == 1
+
+    def run_one(self):
+        """Claims and runs one job; returns False if there was none."""
+        job = self.claim()
+        if job is None:
+            return False
+        from llm_scheduler import bind_session
+        try:
+            # The case is the session for the scheduler's fair sharing
+            with bind_session(job.case_id):
+                result = HANDLERS[job.stage](job.payload)
+        except Exception as e:
+            print(f"Error running {job.stage} job for case {job.case_id}: {e}")
+            result = {"error": str(e)}
+        if not self.finish(job, result):
+            print(f"Discarded the late result of the {job.stage} job for case {job.case_id}: it was claimed again.")
+        return True
+
+    def work(self):
+        """Runs jobs until stopped, waiting up to JOB_POLL_SECONDS (or a local submit) between empty polls."""
+        while not self._stop.is_set():
+            try:
+                if self.run_one():
+                    continue
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+            with self._wake:
+                self._wake.wait(JOB_POLL_SECONDS)
+
+    def start_workers(self, count=JOB_WORKERS):
+        """Starts worker threads in this process (the embedded mode)."""
+        for i in range(count):
+            thread = threading.Thread(target=self.work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+def get_job_queue():
+    """Returns the process-wide JobQueue, starting embedded workers on first use unless JOB_WORKER_MODE=external."""
+    with _queues_lock:
+        job_queue = _queues.get(JOB_QUEUE_PATH)
+        if job_queue is None:
+            job_queue = _queues[JOB_QUEUE_PATH] = JobQueue(JOB_QUEUE_PATH)
+            if JOB_WORKER_MODE != "external":
+                job_queue.start_workers()
+        return job_queue
+
+def _worker_process(path, threads):
+    job_queue = JobQueue(path)
+    job_queue.start_workers(threads)
+    for worker in job_queue._workers:
+        worker.join()
+
+def main():
+    from llm_scheduler import LLMScheduler, ANALYSIS
+    # The pool's share of the backend: what one app process would allow for analyses
+    ceiling = LLMScheduler().ceilings[ANALYSIS]
+    parser = argparse.ArgumentParser(description="Runs LLM jobs from the durable job queue.")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes")
+    parser.add_argument("--threads", type=int, default=None,
+                        help=f"Worker threads per process (default and maximum: {ceiling} in total, split across processes)")
+    parser.add_argument("--path", default=JOB_QUEUE_PATH, help="Job queue database")
+    args = parser.parse_args()
+    per_process = max(1, ceiling // max(1, args.processes))
+    if args.threads is None:
+        args.threads = per_process
+    elif args.threads > per_process:
+        print(f"Capping --threads at {per_process}: the pool may run at most {ceiling} analyses at once (LLM_MAX_CONCURRENCY - LLM_INTERACTIVE_RESERVE).")
+        args.threads = per_process
+    processes = [multiprocessing.Process(target=_worker_process, args=(args.path, args.threads), daemon=True)
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    print(f"{args.processes} worker process(es) with {args.threads} thread(s) each on {args.path}")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
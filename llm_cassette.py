@@ -0,0 +1,151 @@
+# llm_cassette.py
+import os
+import json
+import time
+import hashlib
+import threading
+from types import SimpleNamespace
+
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")  # off, record or replay
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", os.path.join("cassettes", "llm.jsonl"))
+LLM_CASSETTE_LATENCY = os.getenv("LLM_CASSETTE_LATENCY", "zero")  # zero or recorded
+
+# Per-call transport settings that do not change what the model is asked
+IGNORED_REQUEST_KEYS = ("timeout",)
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when a request has no recorded response."""
+
+def request_key(request):
+    """Stable hash of a chat completion request, ignoring transport-only settings."""
+    canonical = {k: v for k, v in request.items() if k not in IGNORED_REQUEST_KEYS}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:24]
+
+def _usage_dict(usage):
+    if usage is None:
+        return None
+    return {name: getattr(usage, name, None) for name in ("prompt_tokens", "completion_tokens", "total_tokens")}
+
+def _response_from_entry(entry):
+    message = SimpleNamespace(content=entry["content"])
+    usage = SimpleNamespace(**entry["usage"]) if entry.get("usage") else None
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage, model=entry.get("model"))
+
+def _chunks_from_entry(entry, size=16):
+    """Replays a recorded streamed reply as chunks of its content."""
+    content = entry["content"]
+    for i in range(0, len(content), size):
+        delta = SimpleNamespace(content=content[i:i + size])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None, model=entry.get("model"))
+
+class _Completions:
+    def __init__(self, cassette):
+        self._cassette = cassette
+
+    def create(self, **request):
+        return self._cassette.create(**request)
+
+class CassetteClient:
+    """
+    Wraps an OpenAI-compatible client at the chat.completions.create boundary.
+
+    In "record" mode every call goes to the inner client and its response, latency and
+    token usage are appended to a JSONL cassette. In "replay" mode calls are answered from
+    the cassette without touching the network, at zero or the recorded latency. Repeated
+    identical requests (e.g. scenario prompts) replay their recordings in order, cycling.
+    Streamed calls (stream=True) are recorded once complete and replayed as chunks.
+    """
+
+    def __init__(self, inner, path=LLM_CASSETTE_PATH, mode=LLM_CASSETTE_MODE, latency=LLM_CASSETTE_LATENCY):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.inner = inner
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self._entries = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+                    except (ValueError, KeyError) as e:
+                        print(f"Skipping malformed cassette entry in {self.path}: {e}")
+        except FileNotFoundError:
+            print(f"Cassette {self.path} does not exist; every replayed request will miss.")
+
+    @property
+    def recorded_count(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def create(self, **request):
+        key = request_key(request)
+        if self.mode == "replay":
+            with self._lock:
+                entries = self._entries.get(key)
+                if not entries:
+                    raise CassetteMissError(f"No recorded response for request {key} in {self.path}")
+                cursor = self._cursors.get(key, 0)
+                self._cursors[key] = cursor + 1
+                entry = entries[cursor % len(entries)]
+            if self.latency == "recorded":
+                time.sleep(entry.get("latency", 0.0))
+            if request.get("stream"):
+                return _chunks_from_entry(entry)
+            return _response_from_entry(entry)
+
+        start = time.monotonic()
+        response = self.inner.chat.completions.create(**request)
+        if request.get("stream"):
+            return self._record_stream(key, request, response, start)
+        self._append(key, {
+            "key": key,
+            "model": request.get("model"),
+            "latency": round(time.monotonic() - start, 4),
+            "usage": _usage_dict(getattr(response, "usage", None)),
+            "content": response.choices[0].message.content,
+        })
+        return response
+
+    def _record_stream(self, key, request, stream, start):
+        # Only a stream read to the end is recorded
+        content, usage = [], None
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content.append(chunk.choices[0].delta.content)
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+        self._append(key, {
+            "key": key,
+            "model": request.get("model"),
+            "latency": round(time.monotonic() - start, 4),
+            "usage": _usage_dict(usage),
+            "content": "".join(content),
+        })
+
+    def _append(self, key, entry):
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def wrap_client(client, mode=LLM_CASSETTE_MODE, path=LLM_CASSETTE_PATH, latency=LLM_CASSETTE_LATENCY):
+    """Returns client wrapped in a CassetteClient unless the cassette mode is "off"."""
+    if mode == "off":
+        return client
+    return CassetteClient(client, path=path, mode=mode, latency=latency)
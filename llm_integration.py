@@ -1,9 +1,20 @@
 # llm_integration.py
 import os
+import re
+import time
+import threading
 import openai
 import json
 from dotenv import load_dotenv
-from models import Scenario, Analysis, WitnessResponse
+from models import Scenario, Analysis, WitnessResponse, AdvisorBrief
+from scenario_similarity import ScenarioIndex
+from model_policy import ModelPolicy, Tier
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED
+from llm_scheduler import LLMScheduler, QueueTimeoutError, background_priority
+from scenario_library import ScenarioLibrary
+from llm_cassette import wrap_client, LLM_CASSETTE_MODE
+from token_budget import build_prompt
+from analysis_cache import AnalysisCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,12 +22,63 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_TO_USE = os.getenv("OPENAI_MODEL", "gpt-5.4")
 CHEAP_MODEL_TO_USE = os.getenv("OPENAI_CHEAP_MODEL", "gpt-5.4-mini")
+# Generated scenarios this similar (estimated Jaccard over word shingles) to a recent one are regenerated
+SCENARIO_SIMILARITY_THRESHOLD = float(os.getenv("SCENARIO_SIMILARITY_THRESHOLD", "0.5"))
+SCENARIO_MAX_ATTEMPTS = int(os.getenv("SCENARIO_MAX_ATTEMPTS", "3"))
+
+# Per-call deadlines (seconds) so a degraded backend cannot hold a server thread for long
+LLM_TIMEOUTS = {
+    "scenario": float(os.getenv("LLM_TIMEOUT_SCENARIO", "30")),
+    "witness": float(os.getenv("LLM_TIMEOUT_WITNESS", "20")),
+    "analysis": float(os.getenv("LLM_TIMEOUT_ANALYSIS", "60")),
+}
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# Consecutive failed (or slower than LLM_SLOW_CALL_SECONDS) calls that open the breaker,
+# and how long it stays open before a trial call is let through
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "25"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Errors that say the backend is unhealthy; bad requests and unparseable replies do not count
+BACKEND_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+BACKEND_UNAVAILABLE_MESSAGE = "The royal messengers cannot reach the Oracle right now. Please try again shortly."
+BACKEND_BUSY_MESSAGE = "All the royal messengers are out on errands. Please try again shortly."
+
+scenario_index = ScenarioIndex(threshold=SCENARIO_SIMILARITY_THRESHOLD)
+circuit_breaker = CircuitBreaker(
+    failure_threshold=LLM_BREAKER_FAILURES,
+    slow_call_seconds=LLM_SLOW_CALL_SECONDS,
+    reset_timeout=LLM_BREAKER_RESET_SECONDS,
+)
+# Orders every call by priority (witness > analysis > background) and shares slots fairly
+# between sessions; see llm_scheduler.py.
+llm_scheduler = LLMScheduler()
+# Generated scenarios kept across restarts: new cases start from them, and they are
+# served while the breaker is open. The library is kept stocked with this many unused
+# scenarios per difficulty.
+scenario_library = ScenarioLibrary()
+SCENARIO_LIBRARY_MIN_UNUSED = int(os.getenv("SCENARIO_LIBRARY_MIN_UNUSED", "2"))
+# Reuses analyses of near-identical judgments of the same scenario when ANALYSIS_CACHE is set
+analysis_cache = AnalysisCache()
+
+# Model tiers per task, best first. The policy starts Simple cases one tier down and
+# steps down further under load; see model_policy.py.
+model_policy = ModelPolicy({
+    "scenario": [Tier(CHEAP_MODEL_TO_USE, None), Tier(CHEAP_MODEL_TO_USE, "low")],
+    "witness": [Tier(CHEAP_MODEL_TO_USE, None), Tier(CHEAP_MODEL_TO_USE, "low")],
+    "analysis": [Tier(MODEL_TO_USE, "medium"), Tier(MODEL_TO_USE, "low"), Tier(CHEAP_MODEL_TO_USE, "low")],
+})
 
 # Initialize OpenAI client globally if API key is available
 if OPENAI_API_KEY:
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    client = openai.OpenAI(api_key=OPENAI_API_KEY, max_retries=LLM_MAX_RETRIES)
 else:
     client = None # Will be checked in functions
+# Record or replay LLM traffic through a cassette (LLM_CASSETTE_MODE); replay needs no API key,
+# but recording does, so without one the client stays None
+if client is not None or LLM_CASSETTE_MODE == "replay":
+    client = wrap_client(client)
+if LLM_CASSETTE_MODE == "replay":
+    OPENAI_API_KEY = OPENAI_API_KEY or "cassette-replay"
 
 # --- LLM PROMPT DESIGNS ---
 
@@ -96,74 +158,319 @@ Return your response as a JSON object with the following keys:
 - "highlighted_analysis": The analysis text with key parts bolded using Markdown.
 """
 
+# Prompt for the per-scenario Advisor's Brief (JSON), computed once per classroom case
+ADVISOR_BRIEF_PROMPT_TEMPLATE = """
+You are the Royal Advisor in "The King's Game of Judgement." Many judges will rule on the case below, and you will review each of their judgments.
+Before any judgment arrives, prepare a brief of the case for your own later use.
+
+Scenario: {scenario_details}
+
+Return your response as a JSON object with the following keys:
+- "values_in_conflict": The values or principles in tension (e.g., "mercy vs. the letter of the law"), each in one short phrase.
+- "key_facts": The facts a fair ruling must account for, each in one short sentence.
+- "ambiguities": Facts that are unclear or open to interpretation, and assumptions a judge might make, each in one short sentence.
+"""
+
+# Prompt for Judgment Analysis given an Advisor's Brief (JSON). Everything before the judge's
+# name is identical for every judge of a classroom case, so the provider can cache that prefix.
+JUDGMENT_ANALYSIS_WITH_BRIEF_PROMPT_TEMPLATE = """
+You are an insightful and highly supportive Royal Advisor in "The King's Game of Judgement."
+Provide thoughtful, constructive feedback on a Judge's decision.
+
+Analysis Guidelines:
+1. Acknowledge and praise the effort.
+2. Summarize the core components of the decision.
+3. Analyze prioritized values (fairness, compassion, etc.).
+4. Evaluate consideration of human elements and norms.
+5. Comment on interpretation of facts and assumptions.
+6. Provide gentle alternative perspectives if applicable.
+7. Reinforce strengths and maintain a kingly, supportive tone.
+
+You have already studied this case; your brief lists the values in conflict, the key facts and the ambiguities. Rely on it rather than re-deriving them, and measure the judgment against it.
+
+Return your response as a JSON object with the following keys:
+- "thought_process": A few sentences of internal reasoning on how the judgment relates to your brief. This part will be hidden from the player.
+- "analysis": The raw text of the advisor's analysis.
+- "highlighted_analysis": The analysis text with key parts bolded using Markdown (**like this**).
+
+Scenario: {scenario_details}
+
+Your brief:
+{advisor_brief}
+
+Judge {player_name}'s judgment: {player_judgment}
+"""
+
 # --- LLM API FUNCTIONS ---
 
-def generate_scenario_with_llm(player_name, difficulty="Moderate", model=CHEAP_MODEL_TO_USE):
+def _create_completion(task, difficulty, model, step_down=0, **kwargs):
+    """
+    Sends one chat completion for a task. Unless a model is given explicitly, the model
+    and reasoning effort come from model_policy (started step_down tiers lower). The call
+    first waits for a slot from llm_scheduler (QueueTimeoutError after LLM_TIMEOUTS), then
+    has the same deadline itself, and raises CircuitOpenError without calling the backend
+    while circuit_breaker is open.
+    """
+    try:
+        with llm_scheduler.slot(task, timeout=LLM_TIMEOUTS[task]):
+            return _send_completion(task, difficulty, model, step_down, **kwargs)
+    except QueueTimeoutError:
+        raise QueueTimeoutError(BACKEND_BUSY_MESSAGE) from None
+
+def _prepare_call(task, difficulty, model, step_down, kwargs):
+    if not circuit_breaker.allow():
+        raise CircuitOpenError(BACKEND_UNAVAILABLE_MESSAGE)
+    reasoning_effort = None
+    if model is None:
+        decision = model_policy.choose(task, difficulty, step_down=step_down)
+        model, reasoning_effort = decision.model, decision.reasoning_effort
+    if reasoning_effort is not None:
+        kwargs["reasoning_effort"] = reasoning_effort
+    return model
+
+def _send_completion(task, difficulty, model, step_down, **kwargs):
+    model = _prepare_call(task, difficulty, model, step_down, kwargs)
+    start = time.monotonic()
+    try:
+        with model_policy.track(task):
+            response = client.chat.completions.create(model=model, timeout=LLM_TIMEOUTS[task], **kwargs)
+    except BACKEND_ERRORS:
+        circuit_breaker.record_failure()
+        raise
+    except Exception:
+        # Not the backend's fault; release a half-open trial without judging its health
+        circuit_breaker.release_trial()
+        raise
+    circuit_breaker.record_success(time.monotonic() - start)
+    return response
+
+def _stream_completion(task, difficulty, model, step_down=0, **kwargs):
+    """
+    Like _create_completion, but yields the reply's content piece by piece as the backend
+    streams it. The scheduler slot is held, and the breaker's verdict deferred, until the
+    stream ends or is closed.
+    """
+    try:
+        with llm_scheduler.slot(task, timeout=LLM_TIMEOUTS[task]):
+            yield from _send_streaming(task, difficulty, model, step_down, **kwargs)
+    except QueueTimeoutError:
+        raise QueueTimeoutError(BACKEND_BUSY_MESSAGE) from None
+
+def _send_streaming(task, difficulty, model, step_down, **kwargs):
+    model = _prepare_call(task, difficulty, model, step_down, kwargs)
+    start = time.monotonic()
+    stream = None
+    try:
+        with model_policy.track(task):
+            stream = client.chat.completions.create(model=model, timeout=LLM_TIMEOUTS[task], stream=True, **kwargs)
+            if hasattr(stream, "choices"):
+                # A client that cannot stream (a stub, a cassette without the call) answers in one piece
+                yield stream.choices[0].message.content
+            else:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+    except BACKEND_ERRORS:
+        circuit_breaker.record_failure()
+        raise
+    except BaseException:
+        # Not the backend's fault, or a stream closed before its end (the reader went away):
+        # either way it says nothing about the backend's health, so only the trial is released
+        circuit_breaker.release_trial()
+        raise
+    finally:
+        if stream is not None and hasattr(stream, "close"):
+            stream.close()
+    # Only a stream read to its end counts as a success
+    circuit_breaker.record_success(time.monotonic() - start)
+
+def generate_scenario_with_llm(player_name, difficulty="Moderate", model=None, add_to_library=True):
     """
     Generates a structured scenario (raw and highlighted) in a single LLM call.
-    Uses a cheaper model by default to save costs.
+    Uses a cheaper model tier (chosen by model_policy unless given) to save costs.
+    The scenario is stored in scenario_library as served to player_name; pass player_name=None
+    to stock the library instead, or add_to_library=False to keep it out (classroom scenarios
+    are private to their classroom). While the backend is unavailable, a previously generated
+    scenario the player has not seen is served instead; if there is none, an error, so no
+    player is served the same scenario twice.
+    """
+    if not client:
+        return {"error": "OpenAI API key not configured."}
+
+    prompt, _ = build_prompt("scenario", SCENARIO_GENERATION_JSON_PROMPT_TEMPLATE, fixed={"difficulty": difficulty})
+    try:
+        for attempt in range(1, SCENARIO_MAX_ATTEMPTS + 1):
+            response = _create_completion(
+                "scenario", difficulty, model,
+                messages=[
+                    {"role": "system", "content": "You are a master storyteller. Respond ONLY with a JSON object matching the requested schema."},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.8,
+                max_completion_tokens=1000
+            )
+            scenario = Scenario.model_validate_json(response.choices[0].message.content)
+            # Regenerate near-duplicates of recent cases; the last attempt is kept regardless.
+            if scenario_index.admit(difficulty, scenario.scenario, force=attempt == SCENARIO_MAX_ATTEMPTS):
+                if add_to_library:
+                    scenario_library.add(difficulty, scenario, served_to=player_name)
+                return scenario
+            print(f"Scenario attempt {attempt} for {difficulty} was a near-duplicate of a recent case; regenerating.")
+    except (CircuitOpenError, QueueTimeoutError) + BACKEND_ERRORS as e:
+        if not player_name:
+            return {"error": BACKEND_UNAVAILABLE_MESSAGE}
+        print(f"Scenario backend unavailable ({e}); serving from the scenario library.")
+        fallback = scenario_library.take(difficulty, player_name)
+        if fallback is not None:
+            return fallback
+        return {"error": BACKEND_UNAVAILABLE_MESSAGE}
+    except Exception as e:
+        print(f"Error during scenario generation: {e}")
+        return {"error": str(e)}
+
+
+_refilling = set()
+_refilling_lock = threading.Lock()
+
+def _refill_library(difficulty, count):
+    try:
+        with background_priority():
+            for _ in range(count):
+                # Give way between scenarios when judges are waiting on the backend
+                if llm_scheduler.under_pressure() or isinstance(generate_scenario_with_llm(None, difficulty), dict):
+                    break
+    finally:
+        with _refilling_lock:
+            _refilling.discard(difficulty)
+
+def refill_scenario_library(difficulty):
+    """
+    Tops up the library's unused scenarios for a difficulty to SCENARIO_LIBRARY_MIN_UNUSED
+    in a background thread at background priority. Does nothing while a refill is running,
+    the backend is down or llm_scheduler has foreground calls to serve first.
+    """
+    if not client or circuit_breaker.state != CLOSED or llm_scheduler.under_pressure():
+        return False
+    missing = SCENARIO_LIBRARY_MIN_UNUSED - scenario_library.unused_count(difficulty)
+    if missing <= 0:
+        return False
+    with _refilling_lock:
+        if difficulty in _refilling:
+            return False
+        _refilling.add(difficulty)
+    threading.Thread(target=_refill_library, args=(difficulty, missing), name=f"scenario-refill-{difficulty}", daemon=True).start()
+    return True
+
+def start_case_scenario(player_name, difficulty="Moderate"):
+    """
+    The scenario for a player's new case. A stored scenario the player has not seen is
+    served immediately when there is one; otherwise one is generated live. Either way the
+    library is topped up in the background for the players who come next.
+    """
+    scenario = scenario_library.take(difficulty, player_name)
+    refill_scenario_library(difficulty)
+    if scenario is not None:
+        return scenario
+    return generate_scenario_with_llm(player_name, difficulty)
+
+
+def format_advisor_brief(brief: AdvisorBrief):
+    """The brief as compact prompt text."""
+    return "\n".join([
+        "Values in conflict: " + "; ".join(brief.values_in_conflict),
+        "Key facts: " + " ".join(brief.key_facts),
+        "Ambiguities: " + " ".join(brief.ambiguities),
+    ])
+
+def generate_advisor_brief_with_llm(scenario_details, difficulty="Moderate", model=None):
+    """
+    Prepares the Royal Advisor's brief of a scenario (values in conflict, key facts,
+    ambiguities) in a single LLM call, so that many judgments of the same case can be
+    analyzed against it without re-deriving the case each time.
     """
     if not client:
         return {"error": "OpenAI API key not configured."}
 
-    prompt = SCENARIO_GENERATION_JSON_PROMPT_TEMPLATE.format(difficulty=difficulty)
+    prompt, _ = build_prompt("analysis", ADVISOR_BRIEF_PROMPT_TEMPLATE,
+                             trimmable=[("scenario_details", scenario_details, "start")])
     try:
-        response = client.chat.completions.create(
-            model=model,
+        response = _create_completion(
+            "analysis", difficulty, model,
             messages=[
-                {"role": "system", "content": "You are a master storyteller. Respond ONLY with a JSON object matching the requested schema."},
+                {"role": "system", "content": "You are a supportive Royal Advisor. Respond ONLY with a JSON object matching the requested schema."},
                 {"role": "user", "content": prompt}
             ],
             response_format={"type": "json_object"},
-            temperature=0.8,
-            max_completion_tokens=1000
+            temperature=0.3,
+            max_completion_tokens=1500
         )
-        return Scenario.model_validate_json(response.choices[0].message.content)
+        return AdvisorBrief.model_validate_json(response.choices[0].message.content)
     except Exception as e:
-        print(f"Error during scenario generation: {e}")
+        print(f"Error during advisor brief: {e}")
         return {"error": str(e)}
 
-
-def analyze_judgment_with_llm(player_judgment, scenario_details, player_name):
+def analyze_judgment_with_llm(player_judgment, scenario_details, player_name, difficulty="Moderate", model=None, advisor_brief=None):
     """
     Analyzes the player's judgment (raw and highlighted) in a single LLM call.
-    Uses the flagship model with reasoning effort for high-quality feedback.
+    Uses the flagship model with reasoning effort for high-quality feedback; model_policy
+    lowers the effort for Simple cases and steps down tiers under load.
+    With an advisor_brief (see generate_advisor_brief_with_llm) the case analysis is already
+    done: the brief and scenario form a prompt prefix shared by every judge of the case,
+    and the call starts one tier lower with a shorter output allowance.
+    A near-identical judgment of the same scenario, brief and starting model is answered
+    from analysis_cache.
     """
     if not client:
         return {"error": "OpenAI API key not configured."}
 
-    prompt = JUDGMENT_ANALYSIS_JSON_PROMPT_TEMPLATE.format(
-        player_name=player_name,
-        scenario_details=scenario_details,
-        player_judgment=player_judgment
-    )
+    brief_text = format_advisor_brief(advisor_brief) if advisor_brief is not None else None
+    step_down = 1 if advisor_brief is not None else 0
+    # Keyed on the tier the call starts from: steps down for load are transient
+    cache_model = model or "{}/{}".format(*model_policy.start_tier("analysis", difficulty, step_down))
+    cached = analysis_cache.get(scenario_details, player_judgment, player_name, brief=brief_text, model=cache_model)
+    if cached is not None:
+        return cached
+
+    if advisor_brief is not None:
+        prompt, prompt_tokens = build_prompt(
+            "analysis", JUDGMENT_ANALYSIS_WITH_BRIEF_PROMPT_TEMPLATE,
+            fixed={"player_name": player_name, "advisor_brief": brief_text},
+            trimmable=[("scenario_details", scenario_details, "start"), ("player_judgment", player_judgment, "start")]
+        )
+        max_completion_tokens = 1000
+    else:
+        # Markup is stripped and, if the prompt is over budget, the scenario is trimmed before the judgment.
+        prompt, prompt_tokens = build_prompt(
+            "analysis", JUDGMENT_ANALYSIS_JSON_PROMPT_TEMPLATE,
+            fixed={"player_name": player_name},
+            trimmable=[("scenario_details", scenario_details, "start"), ("player_judgment", player_judgment, "start")]
+        )
+        max_completion_tokens = 1500
 
     try:
-        response = client.chat.completions.create(
-            model=MODEL_TO_USE,
+        response = _create_completion(
+            "analysis", difficulty, model, step_down=step_down,
             messages=[
                 {"role": "system", "content": "You are a supportive Royal Advisor. Respond ONLY with a JSON object matching the requested schema."},
                 {"role": "user", "content": prompt}
             ],
             response_format={"type": "json_object"},
             temperature=0.7,
-            max_completion_tokens=1500,
-            reasoning_effort="medium" # New for GPT-5.4
+            max_completion_tokens=max_completion_tokens
         )
-        return Analysis.model_validate_json(response.choices[0].message.content)
+        analysis = Analysis.model_validate_json(response.choices[0].message.content)
+        completion_tokens = getattr(getattr(response, "usage", None), "completion_tokens", None)
+        tokens = prompt_tokens + (completion_tokens if isinstance(completion_tokens, int) else 0)
+        analysis_cache.put(scenario_details, player_judgment, player_name, analysis, tokens=tokens,
+                           brief=brief_text, model=cache_model)
+        return analysis
     except Exception as e:
         print(f"Error during judgment analysis: {e}")
         return {"error": str(e)}
 
 
-def get_witness_response_with_llm(scenario, character, question, history=None, model=CHEAP_MODEL_TO_USE):
-    """
-    Simulates a witness or character response based on the scenario and a player's question.
-    Incorporates previous conversation history with the same character if provided.
-    """
-    if not client:
-        return {"error": "OpenAI API key not configured."}
-
+def _witness_messages(scenario, character, question, history):
     history_text = ""
     if history:
         # Filter history to only include previous interactions with this specific character
@@ -176,20 +483,29 @@ def get_witness_response_with_llm(scenario, character, question, history=None, m
                 r = h.response if hasattr(h, 'response') else h.get('response', '')
                 history_text += f"- The King asked: {q}\n- Your previous response: {r}\n"
 
-    prompt = WITNESS_ROLEPLAY_PROMPT_TEMPLATE.format(
-        scenario_details=scenario,
-        character_name=character,
-        question=question,
-        history=history_text
+    # Older history is dropped first, then the scenario is trimmed, to keep the prompt in budget.
+    prompt, _ = build_prompt(
+        "witness", WITNESS_ROLEPLAY_PROMPT_TEMPLATE,
+        fixed={"character_name": character, "question": question},
+        trimmable=[("history", history_text, "end"), ("scenario_details", scenario, "start")]
     )
+    return [
+        {"role": "system", "content": "You are a character in a medieval kingdom. Respond ONLY with a JSON object matching the requested schema."},
+        {"role": "user", "content": prompt}
+    ]
+
+def get_witness_response_with_llm(scenario, character, question, history=None, model=None, difficulty="Moderate"):
+    """
+    Simulates a witness or character response based on the scenario and a player's question.
+    Incorporates previous conversation history with the same character if provided.
+    """
+    if not client:
+        return {"error": "OpenAI API key not configured."}
 
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a character in a medieval kingdom. Respond ONLY with a JSON object matching the requested schema."},
-                {"role": "user", "content": prompt}
-            ],
+        response = _create_completion(
+            "witness", difficulty, model,
+            messages=_witness_messages(scenario, character, question, history),
             response_format={"type": "json_object"},
             temperature=0.7,
             max_completion_tokens=500
@@ -199,6 +515,107 @@ def get_witness_response_with_llm(scenario, character, question, history=None, m
         print(f"Error during witness response: {e}")
         return {"error": str(e)}
 
+class JsonFieldStream:
+    """
+    Decodes one string field of a JSON object while the object is still arriving. feed()
+    takes the next piece of raw JSON and returns the newly decoded text of the field (""
+    until its value starts); escapes split across pieces are held back until complete.
+    """
+    ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field):
+        # An escaped look-alike inside another string cannot match: its quotes follow backslashes
+        self._start = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._pos = None
+        self.done = False
+
+    def feed(self, piece):
+        self._buffer += piece
+        if self.done:
+            return ""
+        if self._pos is None:
+            match = self._start.search(self._buffer)
+            if match is None:
+                return ""
+            self._pos = match.end()
+        buffer, i, out = self._buffer, self._pos, []
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                out.append(char)
+                i += 1
+                continue
+            if i + 1 >= len(buffer):
+                break
+            if buffer[i + 1] != "u":
+                out.append(self.ESCAPES.get(buffer[i + 1], buffer[i + 1]))
+                i += 2
+                continue
+            if i + 6 > len(buffer):
+                break
+            code = int(buffer[i + 2:i + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # A high surrogate is decoded together with the low one that follows it
+                if i + 12 > len(buffer):
+                    break
+                if buffer[i + 6:i + 8] == "\\u":
+                    low = int(buffer[i + 8:i + 12], 16)
+                    out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    i += 12
+                    continue
+            out.append(chr(code))
+            i += 6
+        self._pos = i
+        return "".join(out)
+
+class WitnessStream:
+    """
+    Iterating yields a witness's answer as it is generated. Once the iteration ends,
+    `result` holds the WitnessResponse parsed from the complete reply, or {"error": ...}
+    if the call failed (the text yielded so far is then incomplete). Stopping early
+    closes the underlying call, freeing its scheduler slot.
+    """
+
+    def __init__(self, pieces):
+        self._pieces = pieces
+        self.result = None
+
+    def __iter__(self):
+        field = JsonFieldStream("response")
+        content = []
+        try:
+            for piece in self._pieces:
+                content.append(piece)
+                text = field.feed(piece)
+                if text:
+                    yield text
+            self.result = WitnessResponse.model_validate_json("".join(content))
+        except Exception as e:
+            print(f"Error during witness response: {e}")
+            self.result = {"error": str(e)}
+        finally:
+            if hasattr(self._pieces, "close"):
+                self._pieces.close()
+
+def stream_witness_response_with_llm(scenario, character, question, history=None, model=None, difficulty="Moderate"):
+    """
+    Like get_witness_response_with_llm, but returns a WitnessStream that yields the answer
+    as the backend streams it. Nothing is sent until the stream is iterated.
+    """
+    if not client:
+        return {"error": "OpenAI API key not configured."}
+    return WitnessStream(_stream_completion(
+        "witness", difficulty, model,
+        messages=_witness_messages(scenario, character, question, history),
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        max_completion_tokens=500
+    ))
+
 
 # Deprecated functions kept for compatibility if needed, but updated to use new logic internally or return errors.
 def highlight_important_parts_with_llm(scenario_text):
@@ -0,0 +1,174 @@
+# llm_scheduler.py
+"""
+Admission control for outbound LLM calls.
+
+Every call made by llm_integration takes a slot here before it reaches the backend. Calls
+belong to one of three priority classes: INTERACTIVE (a judge waiting on a witness or on a
+new case), ANALYSIS (the Advisor's verdict at the end of a case) and BACKGROUND (library
+restocking and other work nobody is waiting on). When slots are short, waiting calls are
+admitted highest class first and, within a class, round-robin across sessions, so one
+session's burst cannot hold back everyone else's next call.
+
+Each class may only start a call while the number in flight is below its ceiling: the
+last LLM_INTERACTIVE_RESERVE slots are kept for interactive calls, and background calls
+only start while fewer than LLM_BACKGROUND_CEILING calls are in flight. A request already
+sent cannot be taken back, so background work is preempted between calls instead: loops
+such as the library refill check under_pressure() and stop while foreground calls wait.
+"""
+import os
+import sys
+import time
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+INTERACTIVE, ANALYSIS, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = ("interactive", "analysis", "background")
+# A judge is waiting on the screen for witnesses and new cases
+TASK_PRIORITY = {"witness": INTERACTIVE, "scenario": INTERACTIVE, "analysis": ANALYSIS}
+
+# LLM calls in flight at once across the process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+# Slots only interactive calls may take
+LLM_INTERACTIVE_RESERVE = int(os.getenv("LLM_INTERACTIVE_RESERVE", "4"))
+# Background calls start only while fewer calls than this are in flight
+LLM_BACKGROUND_CEILING = int(os.getenv("LLM_BACKGROUND_CEILING", "4"))
+WAIT_WINDOW = 200
+
+_session = contextvars.ContextVar("llm_session", default=None)
+_background = contextvars.ContextVar("llm_background", default=False)
+
+class QueueTimeoutError(Exception):
+    """Raised when a call waits longer than its deadline for a slot."""
+
+@contextmanager
+def bind_session(key):
+    """Attributes the calls made inside to a session, for callers outside Streamlit (the API)."""
+    token = _session.set(key)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+@contextmanager
+def background_priority():
+    """Runs the calls made inside at BACKGROUND priority, whatever their task."""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+def current_session():
+    """The session the current call belongs to: the bound one, the Streamlit session, or the thread."""
+    key = _session.get()
+    if key is not None:
+        return key
+    # Looked up only when the app has loaded Streamlit, so the API never imports it
+    scriptrunner = sys.modules.get("streamlit.runtime.scriptrunner")
+    if scriptrunner is not None:
+        ctx = scriptrunner.get_script_run_ctx(suppress_warning=True)
+        if ctx is not None:
+            return ctx.session_id
+    return threading.current_thread().name
+
+def priority_for(task):
+    return BACKGROUND if _background.get() else TASK_PRIORITY.get(task, ANALYSIS)
+
+class _Waiter:
+    __slots__ = ("event", "granted", "enqueued")
+
+    def __init__(self, enqueued):
+        self.event = threading.Event()
+        self.granted = False
+        self.enqueued = enqueued
+
+class LLMScheduler:
+    """
+    Priority classes with per-session round-robin inside each class. A class may start a
+    call while the calls in flight (of every class) are below its ceiling; ceilings fall
+    with priority, so a lower class never overtakes a waiting higher one.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, interactive_reserve=LLM_INTERACTIVE_RESERVE,
+                 background_ceiling=LLM_BACKGROUND_CEILING, clock=time.monotonic):
+        foreground = max(1, max_concurrency - interactive_reserve)
+        self.ceilings = (max(1, max_concurrency), foreground, max(1, min(background_ceiling, foreground)))
+        self._clock = clock
+        # Per class: session -> its waiting calls, sessions in round-robin order
+        self._queues = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._running = [0 for _ in PRIORITY_NAMES]
+        self._waits = [deque(maxlen=WAIT_WINDOW) for _ in PRIORITY_NAMES]
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        # Caller holds the lock
+        while True:
+            in_flight = sum(self._running)
+            for priority, queue in enumerate(self._queues):
+                if queue and in_flight < self.ceilings[priority]:
+                    break
+            else:
+                return
+            session, waiters = next(iter(queue.items()))
+            waiter = waiters.popleft()
+            # The session goes to the back of the round, if it has more calls waiting
+            del queue[session]
+            if waiters:
+                queue[session] = waiters
+            waiter.granted = True
+            self._running[priority] += 1
+            self._waits[priority].append(self._clock() - waiter.enqueued)
+            waiter.event.set()
+
+    def acquire(self, priority, session, timeout=None):
+        """Waits for a slot; raises QueueTimeoutError if none is given within timeout seconds."""
+        waiter = _Waiter(self._clock())
+        with self._lock:
+            self._queues[priority].setdefault(session, deque()).append(waiter)
+            self._admit()
+        if waiter.event.wait(timeout):
+            return
+        with self._lock:
+            if waiter.granted:
+                return
+            waiters = self._queues[priority][session]
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[priority][session]
+        raise QueueTimeoutError(f"No {PRIORITY_NAMES[priority]} LLM slot free within {timeout:.0f}s.")
+
+    def release(self, priority):
+        with self._lock:
+            self._running[priority] -= 1
+            self._admit()
+
+    @contextmanager
+    def slot(self, task, timeout=None):
+        """Holds a slot for one call of a task, at the task's priority (or BACKGROUND, see background_priority)."""
+        priority = priority_for(task)
+        self.acquire(priority, current_session(), timeout)
+        try:
+            yield priority
+        finally:
+            self.release(priority)
+
+    def under_pressure(self):
+        """True while foreground calls are waiting, or too many calls are in flight to start background ones."""
+        with self._lock:
+            return bool(self._queues[INTERACTIVE] or self._queues[ANALYSIS]) or sum(self._running) >= self.ceilings[BACKGROUND]
+
+    def report(self):
+        """Per class: calls in flight, calls waiting, and p95 of recent waits for a slot in ms."""
+        with self._lock:
+            rows = {}
+            for priority, name in enumerate(PRIORITY_NAMES):
+                waits = sorted(self._waits[priority])
+                p95 = waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0
+                rows[name] = {
+                    "in_flight": self._running[priority],
+                    "waiting": sum(len(w) for w in self._queues[priority].values()),
+                    "wait_p95_ms": 1000 * p95,
+                }
+            return rows
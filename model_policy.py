@@ -0,0 +1,85 @@
+# model_policy.py
+import os
+import time
+import logging
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Concurrent calls of one task beyond which the policy steps down a tier
+LLM_OVERLOAD_INFLIGHT = int(os.getenv("LLM_OVERLOAD_INFLIGHT", "8"))
+# Observed p95 latency (seconds) per task beyond which the policy steps down a tier
+LLM_P95_TARGETS = {
+    "scenario": float(os.getenv("LLM_P95_TARGET_SCENARIO", "10")),
+    "witness": float(os.getenv("LLM_P95_TARGET_WITNESS", "5")),
+    "analysis": float(os.getenv("LLM_P95_TARGET_ANALYSIS", "20")),
+}
+LATENCY_WINDOW = 50
+# Simple cases start one tier down: they do not need the extra reasoning
+DIFFICULTY_START_TIER = {"Simple": 1, "Moderate": 0, "Complex": 0}
+
+Tier = namedtuple("Tier", ["model", "reasoning_effort"])
+Decision = namedtuple("Decision", ["task", "model", "reasoning_effort", "tier", "reason"])
+
+class ModelPolicy:
+    """
+    Picks the model and reasoning effort for each LLM call. Every task has an ordered list
+    of tiers, best first. The starting tier comes from the case difficulty; the policy then
+    steps down one tier when the task has too many calls in flight and another when its
+    observed p95 latency is over target. Every decision is logged.
+    """
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+        self._inflight = {task: 0 for task in tiers}
+        self._latencies = {task: deque(maxlen=LATENCY_WINDOW) for task in tiers}
+        self._lock = threading.Lock()
+
+    def p95(self, task):
+        with self._lock:
+            samples = sorted(self._latencies[task])
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def start_tier(self, task, difficulty="Moderate", step_down=0):
+        """The tier a call starts from, before any step down for load."""
+        return self.tiers[task][min(DIFFICULTY_START_TIER.get(difficulty, 0) + step_down, len(self.tiers[task]) - 1)]
+
+    def choose(self, task, difficulty="Moderate", step_down=0):
+        """The tier for a call. step_down starts it further down, for calls given part of the work up front."""
+        tiers = self.tiers[task]
+        tier = DIFFICULTY_START_TIER.get(difficulty, 0) + step_down
+        reasons = [f"difficulty={difficulty}"]
+        if step_down:
+            reasons.append(f"step_down={step_down}")
+        with self._lock:
+            inflight = self._inflight[task]
+        if inflight >= LLM_OVERLOAD_INFLIGHT:
+            tier += 1
+            reasons.append(f"inflight={inflight}")
+        p95 = self.p95(task)
+        if p95 > LLM_P95_TARGETS.get(task, float("inf")):
+            tier += 1
+            reasons.append(f"p95={p95:.1f}s")
+        tier = min(tier, len(tiers) - 1)
+        decision = Decision(task, tiers[tier].model, tiers[tier].reasoning_effort, tier, ", ".join(reasons))
+        logger.info("model_policy task=%s model=%s effort=%s tier=%d reason=%s",
+                    task, decision.model, decision.reasoning_effort, tier, decision.reason)
+        return decision
+
+    @contextmanager
+    def track(self, task):
+        """Counts a call as in flight and records its latency when it completes."""
+        with self._lock:
+            self._inflight[task] += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._inflight[task] -= 1
+                self._latencies[task].append(elapsed)
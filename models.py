@@ -1,6 +1,6 @@
 # models.py
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 class InquiryEntry(BaseModel):
@@ -21,6 +21,11 @@ class Analysis(BaseModel):
     analysis: str
     highlighted_analysis: str
 
+class AdvisorBrief(BaseModel):
+    values_in_conflict: List[str]
+    key_facts: List[str]
+    ambiguities: List[str]
+
 class CaseRecord(BaseModel):
     case_id: str
     date: str = Field(default_factory=lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
@@ -30,3 +35,59 @@ class CaseRecord(BaseModel):
     inquiry_history: List[InquiryEntry] = []
     judgment: str
     analysis: str
+
+class PlayerProfile(BaseModel):
+    name: str
+    cases: int = 0
+    difficulties: Dict[str, int] = {}
+    questions: int = 0
+    judgment_chars: int = 0
+    first_case: Optional[str] = None
+    last_case: Optional[str] = None
+
+    @property
+    def avg_questions(self):
+        return self.questions / self.cases if self.cases else 0.0
+
+    @property
+    def avg_judgment_length(self):
+        return self.judgment_chars / self.cases if self.cases else 0.0
+
+class Classroom(BaseModel):
+    code: str
+    difficulty: str
+    scenario: Scenario
+    brief: Optional[AdvisorBrief] = None
+    created: str = Field(default_factory=lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+# --- Headless API (api.py) ---
+
+class NewCaseRequest(BaseModel):
+    player_name: str = Field(min_length=1, max_length=32)
+    difficulty: Literal["Simple", "Moderate", "Complex"] = "Moderate"
+    classroom_code: Optional[str] = None
+
+class NewClassroomRequest(BaseModel):
+    difficulty: Literal["Simple", "Moderate", "Complex"] = "Moderate"
+
+class CaseState(BaseModel):
+    case_id: str
+    player_name: str
+    difficulty: str
+    scenario: Scenario
+    inquiry_history: List[InquiryEntry] = []
+    questions_remaining: int = 3
+    classroom_code: Optional[str] = None
+
+class WitnessQuestion(BaseModel):
+    character: str
+    question: str = Field(min_length=1, max_length=500)
+
+class JudgmentRequest(BaseModel):
+    judgment: str = Field(min_length=1, max_length=1000)
+
+class JudgmentResult(BaseModel):
+    case_id: str
+    analysis: str
+    highlighted_analysis: str
+    saved: bool
@@ -0,0 +1,7 @@
+# player_names.py
+import re
+
+def profile_key(player_name):
+    """Sanitized profile key: case-insensitive, whitespace collapsed, safe as a file name."""
+    key = re.sub(r"[^a-z0-9]+", "_", " ".join(player_name.split()).lower()).strip("_")
+    return key or "unknown"
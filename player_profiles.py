@@ -0,0 +1,156 @@
+# player_profiles.py
+import os
+import threading
+import contextlib
+import file_utils
+import case_view
+from player_names import profile_key
+from models import PlayerProfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+PROFILES_DIR = "_profiles"
+
+def _profiles_dir():
+    return os.path.join(file_utils.PAST_CASES_DIR, PROFILES_DIR)
+
+def _profile_path(key):
+    return os.path.join(_profiles_dir(), f"{key}.json")
+
+def apply_case(profile, case_record):
+    """Folds one case (CaseRecord or CaseView) into a profile's running aggregates."""
+    profile.name = case_record.player_name
+    profile.cases += 1
+    profile.difficulties[case_record.difficulty] = profile.difficulties.get(case_record.difficulty, 0) + 1
+    profile.questions += len(case_record.inquiry_history)
+    profile.judgment_chars += len(case_record.judgment)
+    if profile.first_case is None or case_record.date < profile.first_case:
+        profile.first_case = case_record.date
+    if profile.last_case is None or case_record.date > profile.last_case:
+        profile.last_case = case_record.date
+    return profile
+
+def load_profile(player_name):
+    """Returns the stored PlayerProfile for a name, or None if the player has no resolved cases."""
+    path = _profile_path(profile_key(player_name))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return PlayerProfile.model_validate_json(f.read())
+    except FileNotFoundError:
+        return None
+    except (IOError, OSError, ValueError) as e:
+        print(f"Error loading profile {path}: {e}")
+        return None
+
+_update_lock = threading.Lock()
+
+@contextlib.contextmanager
+def _profile_lock(key):
+    """
+    Serializes updates of one profile across threads and, where fcntl is available, across
+    processes (several API workers, or the app and the API, saving cases at once).
+    """
+    with _update_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(_profiles_dir(), exist_ok=True)
+        with open(os.path.join(_profiles_dir(), f".{key}.lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def record_case(case_record):
+    """Adds a newly saved case to its player's profile. Runs as a save hook for new cases; O(1) per case."""
+    if not os.path.exists(_profiles_dir()):
+        # First save since profiles were introduced: build them from the whole archive, this case included.
+        rebuild_profiles()
+        return True
+    with _profile_lock(profile_key(case_record.player_name)):
+        profile = load_profile(case_record.player_name) or PlayerProfile(name=case_record.player_name)
+        apply_case(profile, case_record)
+        try:
+            file_utils.atomic_write_text(_profile_path(profile_key(case_record.player_name)), profile.model_dump_json())
+        except (IOError, OSError) as e:
+            print(f"Error updating profile for {case_record.player_name}: {e}")
+            return False
+    return True
+
+def rebuild_profiles():
+    """Regenerates every profile from the case files. Only needed for archives predating profiles."""
+    profiles = {}
+    for view in case_view.iter_case_views():
+        key = profile_key(view.player_name)
+        apply_case(profiles.setdefault(key, PlayerProfile(name=view.player_name)), view)
+    os.makedirs(_profiles_dir(), exist_ok=True)
+    for key, profile in profiles.items():
+        file_utils.atomic_write_text(_profile_path(key), profile.model_dump_json(), fsync=False)
+    return len(profiles)
+
+class Leaderboard:
+    """
+    In-memory view of every profile for the leaderboard page. Refreshing stats the
+    profile files and re-reads only those changed since the last refresh.
+    """
+
+    def __init__(self, profiles_dir):
+        self.profiles_dir = profiles_dir
+        self._profiles = {}
+        self._mtimes = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            try:
+                entries = [e for e in os.scandir(self.profiles_dir) if e.name.endswith(".json") and not e.name.startswith(".")]
+            except FileNotFoundError:
+                entries = []
+            seen = set()
+            for entry in entries:
+                key = entry.name[:-len(".json")]
+                seen.add(key)
+                mtime = entry.stat().st_mtime_ns
+                if self._mtimes.get(key) == mtime:
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        self._profiles[key] = PlayerProfile.model_validate_json(f.read())
+                    self._mtimes[key] = mtime
+                except (IOError, OSError, ValueError) as e:
+                    print(f"Error loading profile {entry.path}: {e}")
+            for key in set(self._profiles) - seen:
+                self._profiles.pop(key, None)
+                self._mtimes.pop(key, None)
+
+    def top(self, limit=None, by="cases"):
+        """Profiles ordered by an attribute ("cases", "avg_questions", ...), highest first."""
+        with self._lock:
+            ranked = sorted(self._profiles.values(), key=lambda p: (-getattr(p, by), p.name.lower()))
+        return ranked if limit is None else ranked[:limit]
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_leaderboard():
+    """Returns the shared, up-to-date Leaderboard for the current case directory."""
+    cases_dir = file_utils.PAST_CASES_DIR
+    with _instances_lock:
+        leaderboard = _instances.get(cases_dir)
+        if leaderboard is None:
+            if os.path.exists(cases_dir) and not os.path.exists(_profiles_dir()) and next(file_utils.iter_past_cases(), None):
+                rebuild_profiles()
+            leaderboard = _instances[cases_dir] = Leaderboard(_profiles_dir())
+    leaderboard.refresh()
+    return leaderboard
+
+def _on_case_saved(case_record, is_new):
+    # A re-saved case was already counted
+    if is_new:
+        record_case(case_record)
+
+file_utils.register_save_hook(_on_case_saved)
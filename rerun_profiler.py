@@ -0,0 +1,185 @@
+# rerun_profiler.py
+"""
+Opt-in timing of Streamlit reruns, phase by phase.
+
+Set RERUN_PROFILE=timing to time each phase of every rerun of app.py, or
+RERUN_PROFILE=cprofile / RERUN_PROFILE=pyinstrument to also profile every rerun and
+keep the RERUN_PROFILE_KEEP slowest. Results show in a developer panel in the sidebar
+and can be dumped to RERUN_PROFILE_DIR. With RERUN_PROFILE unset every hook is a no-op.
+"""
+import io
+import os
+import json
+import time
+import heapq
+import pstats
+import cProfile
+import datetime
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+RERUN_PROFILE = os.getenv("RERUN_PROFILE", "")
+RERUN_PROFILE_KEEP = int(os.getenv("RERUN_PROFILE_KEEP", "5"))
+RERUN_PROFILE_DIR = os.getenv("RERUN_PROFILE_DIR", "rerun_profiles")
+HISTORY_SIZE = 500
+
+class Rerun:
+    """One run of the script: its phases in order, how it ended, and its profile if captured."""
+
+    def __init__(self, capture):
+        self.started_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.start = time.perf_counter()
+        self.phases = []
+        self.total = 0.0
+        self.outcome = None
+        self.capture = capture
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at,
+            "total_ms": round(1000 * self.total, 3),
+            "outcome": self.outcome,
+            "phases": [{"phase": name, "ms": round(1000 * seconds, 3)} for name, seconds in self.phases],
+        }
+
+    def profile_text(self, limit=15):
+        """The captured profile as text: top functions by cumulative time, or pyinstrument's tree."""
+        if isinstance(self.capture, cProfile.Profile):
+            out = io.StringIO()
+            pstats.Stats(self.capture, stream=out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        if self.capture is not None:
+            return self.capture.output_text()
+        return ""
+
+class RerunProfiler:
+    """Collects phase timings for every rerun in the process; shared by all sessions."""
+
+    def __init__(self, mode=RERUN_PROFILE, keep=RERUN_PROFILE_KEEP):
+        if mode == "pyinstrument" and pyinstrument is None:
+            print("pyinstrument is not installed; RERUN_PROFILE falls back to cprofile.")
+            mode = "cprofile"
+        self.mode = mode
+        self.keep = keep
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self._slowest = []
+        self._sequence = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.mode)
+
+    def _start_capture(self):
+        if self.mode == "cprofile":
+            capture = cProfile.Profile()
+            capture.enable()
+            return capture
+        if self.mode == "pyinstrument":
+            capture = pyinstrument.Profiler()
+            capture.start()
+            return capture
+        return None
+
+    def begin(self):
+        """Starts timing a rerun on this script thread."""
+        if not self.enabled:
+            return
+        if getattr(self._local, "current", None) is not None:
+            self.end("abandoned")
+        self._local.current = Rerun(self._start_capture())
+
+    def end(self, outcome="completed"):
+        """Finishes the current rerun, recording how it ended."""
+        rerun = getattr(self._local, "current", None)
+        if rerun is None:
+            return
+        self._local.current = None
+        if isinstance(rerun.capture, cProfile.Profile):
+            rerun.capture.disable()
+        elif rerun.capture is not None:
+            rerun.capture.stop()
+        rerun.total = time.perf_counter() - rerun.start
+        rerun.outcome = outcome
+        with self._lock:
+            self.history.append(rerun)
+            if rerun.capture is not None:
+                # Only the slowest reruns keep their (large) profile data
+                self._sequence += 1
+                entry = (rerun.total, self._sequence, rerun)
+                if len(self._slowest) < self.keep:
+                    heapq.heappush(self._slowest, entry)
+                elif rerun.total > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)[2].capture = None
+                else:
+                    rerun.capture = None
+
+    @contextmanager
+    def _timed_phase(self, name, rerun):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            # st.rerun() and st.stop() end the script by raising; the rerun ends here too
+            rerun.phases.append((name, time.perf_counter() - start))
+            self.end(type(e).__name__)
+            raise
+        rerun.phases.append((name, time.perf_counter() - start))
+
+    def phase(self, name):
+        """Context manager timing one phase of the current rerun."""
+        rerun = getattr(self._local, "current", None) if self.enabled else None
+        return nullcontext() if rerun is None else self._timed_phase(name, rerun)
+
+    def summary(self):
+        """Per-phase (phase, reruns, mean_ms, p95_ms, max_ms) over recent reruns, slowest mean first."""
+        with self._lock:
+            reruns = list(self.history)
+        samples = {"total": [r.total for r in reruns]}
+        for rerun in reruns:
+            for name, seconds in rerun.phases:
+                samples.setdefault(name, []).append(seconds)
+        rows = []
+        for name, values in samples.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            rows.append({
+                "phase": name,
+                "reruns": len(values),
+                "mean_ms": round(1000 * sum(values) / len(values), 2),
+                "p95_ms": round(1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2),
+                "max_ms": round(1000 * ordered[-1], 2),
+            })
+        return sorted(rows, key=lambda row: -row["mean_ms"])
+
+    def slowest(self):
+        """The captured reruns, slowest first."""
+        with self._lock:
+            return [rerun for _, _, rerun in sorted(self._slowest, key=lambda entry: -entry[0])]
+
+    def dump(self, directory=RERUN_PROFILE_DIR):
+        """Writes the summary, recent reruns and captured profiles to a new timestamped directory."""
+        path = os.path.join(directory, datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f"))
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            recent = [rerun.to_dict() for rerun in self.history]
+        with open(os.path.join(path, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "phases": self.summary(), "reruns": recent}, f, indent=2)
+        for rank, rerun in enumerate(self.slowest(), start=1):
+            name = f"slowest_{rank}_{int(1000 * rerun.total)}ms"
+            if isinstance(rerun.capture, cProfile.Profile):
+                rerun.capture.dump_stats(os.path.join(path, name + ".prof"))
+            elif rerun.capture is not None:
+                with open(os.path.join(path, name + ".html"), "w", encoding="utf-8") as f:
+                    f.write(rerun.capture.output_html())
+        return path
+
+rerun_profiler = RerunProfiler()
@@ -0,0 +1,178 @@
+# scenario_library.py
+import os
+import json
+import hashlib
+import threading
+import contextlib
+from models import Scenario
+from player_names import profile_key
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SCENARIO_LIBRARY_PATH = os.getenv("SCENARIO_LIBRARY_PATH", "scenario_library.jsonl")
+
+def scenario_id(scenario: Scenario):
+    return hashlib.sha1(scenario.scenario.encode("utf-8")).hexdigest()[:16]
+
+class ScenarioLibrary:
+    """
+    Local store of generated scenarios that survives restarts and is shared by processes.
+
+    Scenarios are appended to a JSONL file, one object per line, and every time one is
+    served a (scenario, player) line is appended to a usage log next to it. Each process
+    reads what other processes appended since its last look before every operation, and
+    choosing a scenario and logging its use happen under a file lock (where fcntl is
+    available), so with several API workers or the app and the API side by side no player
+    is served the same scenario twice. New cases start from stored scenarios, least used
+    first. It also backs the fallback content served while the LLM backend is unavailable.
+    """
+
+    def __init__(self, path=SCENARIO_LIBRARY_PATH):
+        self.path = path
+        self.usage_path = os.path.splitext(path)[0] + "_usage.jsonl"
+        self.lock_path = os.path.splitext(path)[0] + ".lock"
+        self._reset()
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        self._scenarios = {}
+        self._by_difficulty = {}
+        self._uses = {}
+        self._served = {}
+        # Bytes of each file read so far; only complete lines are consumed
+        self._offsets = {self.path: 0, self.usage_path: 0}
+
+    def _read_new_lines(self, path):
+        try:
+            with open(path, "rb") as f:
+                f.seek(self._offsets[path])
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        complete = data.rfind(b"\n") + 1
+        self._offsets[path] += complete
+        records = []
+        for line in data[:complete].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                print(f"Skipping malformed line in {path}: {e}")
+        return records
+
+    def _refresh(self):
+        """Takes in the lines appended to both files since the last call (by any process)."""
+        for path in (self.path, self.usage_path):
+            try:
+                if os.path.getsize(path) < self._offsets[path]:
+                    # Truncated or replaced: start over
+                    self._reset()
+                    break
+            except OSError:
+                continue
+        for record in self._read_new_lines(self.path):
+            try:
+                scenario = Scenario.model_validate(record)
+            except ValueError as e:
+                print(f"Skipping malformed scenario library entry: {e}")
+                continue
+            self._insert(record.get("id") or scenario_id(scenario), record.get("difficulty", "Moderate"), scenario)
+        for record in self._read_new_lines(self.usage_path):
+            self._note_use(record.get("id"), record.get("player"))
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """
+        Holds the library across threads and, where fcntl is available, across processes,
+        caught up with every line written so far.
+        """
+        with self._lock:
+            if fcntl is None:
+                self._refresh()
+                yield
+                return
+            try:
+                f = open(self.lock_path, "a")
+            except OSError as e:
+                print(f"Error opening scenario library lock {self.lock_path}: {e}")
+                self._refresh()
+                yield
+                return
+            with f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _insert(self, sid, difficulty, scenario):
+        if sid in self._scenarios:
+            return False
+        self._scenarios[sid] = scenario
+        self._by_difficulty.setdefault(difficulty, []).append(sid)
+        self._uses.setdefault(sid, 0)
+        return True
+
+    def _note_use(self, sid, player_key):
+        self._uses[sid] = self._uses.get(sid, 0) + 1
+        if player_key:
+            self._served.setdefault(player_key, set()).add(sid)
+
+    def _append(self, path, record):
+        """Appends one line, then reads it back in with anything else new (callers hold _exclusive)."""
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except (IOError, OSError) as e:
+            print(f"Error writing to scenario library {path}: {e}")
+            return False
+        self._refresh()
+        return True
+
+    def _record_use(self, sid, player_name):
+        self._append(self.usage_path, {"id": sid, "player": profile_key(player_name) if player_name else None})
+
+    def add(self, difficulty, scenario: Scenario, served_to=None):
+        """Stores a scenario; pass served_to when it is being handed to a player right away."""
+        sid = scenario_id(scenario)
+        record = dict(scenario.model_dump(), id=sid, difficulty=difficulty)
+        with self._exclusive():
+            if sid not in self._scenarios and not self._append(self.path, record):
+                return False
+            if served_to:
+                self._record_use(sid, served_to)
+        return True
+
+    def take(self, difficulty, player_name):
+        """The least used stored scenario for the difficulty that this player has not seen, or None."""
+        with self._exclusive():
+            seen = self._served.get(profile_key(player_name), set())
+            best = None
+            for sid in self._by_difficulty.get(difficulty, []):
+                if sid not in seen and (best is None or self._uses[sid] < self._uses[best]):
+                    best = sid
+            if best is None:
+                return None
+            self._record_use(best, player_name)
+            return self._scenarios[best]
+
+    def unused_count(self, difficulty):
+        """Stored scenarios for the difficulty that have never been served."""
+        with self._lock:
+            self._refresh()
+            return sum(1 for sid in self._by_difficulty.get(difficulty, []) if not self._uses[sid])
+
+    def uses(self, scenario: Scenario):
+        with self._lock:
+            self._refresh()
+            return self._uses.get(scenario_id(scenario), 0)
+
+    def count(self, difficulty=None):
+        with self._lock:
+            self._refresh()
+            if difficulty is None:
+                return len(self._scenarios)
+            return len(self._by_difficulty.get(difficulty, []))
@@ -0,0 +1,133 @@
+# scenario_similarity.py
+import re
+import hashlib
+import threading
+from collections import deque
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed so signatures are comparable across processes and restarts.
+_rng = np.random.RandomState(1105)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Overlapping word n-grams of the lower-cased text, with Markdown markup ignored."""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def minhash_signature(text, size=SHINGLE_SIZE):
+    """A NUM_PERM-slot MinHash signature of the text's word `size`-gram shingles."""
+    tokens = shingles(text, size)
+    if not tokens:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), "little") for t in tokens],
+        dtype=np.uint64,
+    )
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0)
+
+def estimated_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+def _band_keys(signature):
+    return [(band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()) for band in range(BANDS)]
+
+class SimilarityIndex:
+    """
+    Locality-sensitive index over the most recent `capacity` texts. Lookups only compare
+    against texts sharing an LSH band, so their cost stays flat as the index fills.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self._entries = deque()
+        self._signatures = {}
+        self._buckets = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entry_id):
+        return entry_id in self._signatures
+
+    def most_similar(self, text, signature=None):
+        """Returns (similarity, entry_id) of the closest indexed text, or (0.0, None)."""
+        signature = minhash_signature(text) if signature is None else signature
+        best = (0.0, None)
+        with self._lock:
+            candidates = set()
+            for key in _band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            for entry_id in candidates:
+                score = estimated_similarity(signature, self._signatures[entry_id])
+                if score > best[0]:
+                    best = (score, entry_id)
+        return best
+
+    def add(self, text, signature=None):
+        """Indexes a text, evicting the oldest entry once at capacity. Returns the new entry_id."""
+        signature = minhash_signature(text) if signature is None else signature
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries.append(entry_id)
+            self._signatures[entry_id] = signature
+            for key in _band_keys(signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.capacity:
+                self._evict(self._entries.popleft())
+        return entry_id
+
+    def _evict(self, entry_id):
+        signature = self._signatures.pop(entry_id)
+        for key in _band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+class ScenarioIndex:
+    """Per-difficulty similarity indexes over recently generated scenarios."""
+
+    def __init__(self, threshold=0.5, capacity=500):
+        self.threshold = threshold
+        self.capacity = capacity
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _index(self, difficulty):
+        with self._lock:
+            if difficulty not in self._indexes:
+                self._indexes[difficulty] = SimilarityIndex(self.capacity)
+            return self._indexes[difficulty]
+
+    def is_near_duplicate(self, difficulty, scenario_text):
+        score, _ = self._index(difficulty).most_similar(scenario_text)
+        return score >= self.threshold
+
+    def admit(self, difficulty, scenario_text, force=False):
+        """
+        Indexes the scenario unless it is a near-duplicate of a recent one for this difficulty.
+        With force=True it is indexed regardless. Returns whether the scenario was admitted.
+        """
+        index = self._index(difficulty)
+        signature = minhash_signature(scenario_text)
+        score, _ = index.most_similar(scenario_text, signature)
+        if score >= self.threshold and not force:
+            return False
+        index.add(scenario_text, signature)
+        return True
@@ -0,0 +1,201 @@
+# session_budget.py
+import os
+import sys
+import json
+import time
+import threading
+from pydantic import BaseModel
+from file_utils import atomic_write_text
+from models import InquiryEntry
+
+SESSION_MAX_INQUIRY_HISTORY = int(os.getenv("SESSION_MAX_INQUIRY_HISTORY", "20"))
+SESSION_MAX_TEXT_CHARS = int(os.getenv("SESSION_MAX_TEXT_CHARS", "20000"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+SESSION_DRAFTS_DIR = os.getenv("SESSION_DRAFTS_DIR", "session_drafts")
+SWEEP_INTERVAL_SECONDS = 30
+
+# The per-case state that is capped, and moved to disk when a session goes idle
+CASE_STATE_DEFAULTS = {
+    "current_scenario": None,
+    "characters": [],
+    "inquiry_history": [],
+    "ai_analysis": None,
+    "player_judgment": "",
+}
+TEXT_KEYS = ("current_scenario", "ai_analysis", "player_judgment")
+
+def deep_sizeof(value, _seen=None):
+    """Approximate bytes held by a value, following containers and pydantic models."""
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, _seen) for v in value)
+    elif isinstance(value, BaseModel):
+        size += deep_sizeof(value.__dict__, _seen)
+    return size
+
+# Helpers below accept a plain dict, st.session_state, or another session's SafeSessionState
+# (which only supports `in`, [] and filtered_state).
+def _get(state, key, default=None):
+    return state[key] if key in state else default
+
+def _keys(state):
+    return list(state.filtered_state.keys()) if hasattr(state, "filtered_state") else list(state.keys())
+
+def state_report(state):
+    """Bytes per session-state key, largest first, plus the total."""
+    sizes = {key: deep_sizeof(state[key]) for key in _keys(state)}
+    return sorted(sizes.items(), key=lambda item: -item[1]), sum(sizes.values())
+
+def enforce_caps(state):
+    """Trims inquiry history and oversized text fields in place. Returns True if anything was trimmed."""
+    trimmed = False
+    history = _get(state, "inquiry_history") or []
+    if len(history) > SESSION_MAX_INQUIRY_HISTORY:
+        state["inquiry_history"] = history[-SESSION_MAX_INQUIRY_HISTORY:]
+        trimmed = True
+    for key in TEXT_KEYS:
+        text = _get(state, key)
+        if isinstance(text, str) and len(text) > SESSION_MAX_TEXT_CHARS:
+            state[key] = text[:SESSION_MAX_TEXT_CHARS - 1] + "…"
+            trimmed = True
+    return trimmed
+
+def _draft_path(session_id):
+    return os.path.join(SESSION_DRAFTS_DIR, f"{session_id}.json")
+
+def evict_case_state(session_id, state):
+    """Moves a session's case state to a draft file and resets it. Returns True if the draft was written."""
+    draft = {}
+    for key in CASE_STATE_DEFAULTS:
+        value = _get(state, key, CASE_STATE_DEFAULTS[key])
+        if key == "inquiry_history":
+            value = [entry.model_dump() if isinstance(entry, BaseModel) else entry for entry in value]
+        draft[key] = value
+    try:
+        os.makedirs(SESSION_DRAFTS_DIR, exist_ok=True)
+        atomic_write_text(_draft_path(session_id), json.dumps(draft))
+    except (IOError, OSError) as e:
+        print(f"Error evicting session {session_id}: {e}")
+        return False
+    for key, default in CASE_STATE_DEFAULTS.items():
+        state[key] = type(default)() if isinstance(default, list) else default
+    state["case_evicted"] = True
+    return True
+
+def rehydrate_case_state(session_id, state):
+    """
+    Restores case state evicted by evict_case_state. Returns True if a draft was restored.
+    A draft that cannot be read is given up on (case_evicted is cleared either way), so a
+    failed restore is not retried on every rerun.
+    """
+    path = _draft_path(session_id)
+    state["case_evicted"] = False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            draft = json.load(f)
+        draft["inquiry_history"] = [InquiryEntry(**entry) for entry in draft.get("inquiry_history", [])]
+    except (IOError, OSError, ValueError, TypeError) as e:
+        print(f"Error restoring session {session_id}: {e}")
+        return False
+    for key, value in draft.items():
+        state[key] = value
+    os.remove(path)
+    return True
+
+class SessionRegistry:
+    """
+    Tracks live sessions and when each last reran. The sweep marks sessions idle for
+    longer than SESSION_IDLE_SECONDS; each marked session then moves its own case state
+    to SESSION_DRAFTS_DIR on its next touch without activity (the heartbeat in app.py),
+    so a session's state is only ever changed from its own script thread. The state is
+    restored on the session's next rerun.
+    """
+
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._sessions = {}
+        self._marked = set()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def touch(self, session_id, state, is_active=None, activity=True):
+        """
+        Called on every rerun (activity=True): rehydrates this session if needed, then
+        occasionally sweeps the others. Called with activity=False by the heartbeat, which
+        neither counts as use nor restores state, but evicts the session if it was marked.
+        Returns False if evicted state could not be restored.
+        """
+        now = time.monotonic()
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            last_seen = now if activity or previous is None else previous[1]
+            self._sessions[session_id] = (state, last_seen)
+            evict = not activity and session_id in self._marked
+            self._marked.discard(session_id)
+            due = now - self._last_sweep >= SWEEP_INTERVAL_SECONDS
+            if due:
+                self._last_sweep = now
+        restored = True
+        if evict:
+            if _get(state, "current_scenario") and not _get(state, "case_evicted"):
+                evict_case_state(session_id, state)
+        elif activity and _get(state, "case_evicted"):
+            restored = rehydrate_case_state(session_id, state)
+        enforce_caps(state)
+        if due:
+            self.sweep(now, is_active)
+        return restored
+
+    def sweep(self, now=None, is_active=None):
+        """Marks idle sessions for eviction and forgets sessions the runtime has closed."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for session_id, (state, last_seen) in sessions:
+            if is_active is not None and not is_active(session_id):
+                with self._lock:
+                    self._sessions.pop(session_id, None)
+                    self._marked.discard(session_id)
+                if os.path.exists(_draft_path(session_id)):
+                    os.remove(_draft_path(session_id))
+                continue
+            if now - last_seen >= self.idle_seconds and _get(state, "current_scenario") and not _get(state, "case_evicted"):
+                with self._lock:
+                    self._marked.add(session_id)
+
+    def report(self):
+        """(session_id, total_bytes, idle_seconds) for every tracked session, largest first."""
+        now = time.monotonic()
+        with self._lock:
+            sessions = list(self._sessions.items())
+        rows = [(session_id, state_report(state)[1], now - last_seen) for session_id, (state, last_seen) in sessions]
+        return sorted(rows, key=lambda row: -row[1])
+
+session_registry = SessionRegistry()
+
+def touch_current_session(activity=True):
+    """
+    Registers the session of the current script run with session_registry. Called at the
+    top of app.py, and by fragments, whose reruns do not execute app.py; the heartbeat
+    fragment passes activity=False. Shows an error if an evicted case could not be restored.
+    """
+    import streamlit as st
+    from streamlit import runtime
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    restored = session_registry.touch(
+        ctx.session_id,
+        ctx.session_state,
+        is_active=runtime.get_instance().is_active_session if runtime.exists() else None,
+        activity=activity
+    )
+    if not restored:
+        st.error("Your case could not be restored after this session sat idle. Please begin a new case.")
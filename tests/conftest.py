@@ -0,0 +1,25 @@
+# tests/conftest.py
+import pytest
+import file_utils
+from models import CaseRecord, InquiryEntry
+
+@pytest.fixture
+def temp_case_dir(tmp_path):
+    """Fixture to use a temporary directory for past cases during tests."""
+    original_dir = file_utils.PAST_CASES_DIR
+    temp_dir = tmp_path / "test_past_cases"
+    file_utils.PAST_CASES_DIR = str(temp_dir)
+    yield temp_dir
+    file_utils.PAST_CASES_DIR = original_dir
+
+def _make_record(case_id, player_name="Judge", difficulty="Simple", judgment="A ruling.", characters=(), **fields):
+    """A CaseRecord with placeholder text; each of `characters` is asked one question. Any other field can be given."""
+    fields.setdefault("scenario", "A scenario.")
+    fields.setdefault("analysis", "An analysis.")
+    fields.setdefault("inquiry_history", [InquiryEntry(character=c, question="Why?", response="Because.") for c in characters])
+    return CaseRecord(case_id=case_id, player_name=player_name, difficulty=difficulty, judgment=judgment, **fields)
+
+@pytest.fixture
+def make_record():
+    """Factory for test case records (see _make_record)."""
+    return _make_record
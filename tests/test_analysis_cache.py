@@ -0,0 +1,67 @@
+import json
+from unittest.mock import MagicMock, patch
+from analysis_cache import AnalysisCache, personalize
+from models import Analysis
+
+GOOSE = "A dispute over a golden goose between Farmer Alden and the merchant Brisa."
+MILL = "Two brothers inherited their late father's watermill."
+ANALYSIS = Analysis(thought_process="Arthur weighed need.", analysis="Judge Arthur, splitting the eggs is fair.",
+                    highlighted_analysis="**Judge Arthur**, splitting the eggs is fair.")
+
+def test_near_identical_judgments_reuse_a_personalized_analysis():
+    cache = AnalysisCache(enabled=True, threshold=0.6)
+    cache.put(GOOSE, "Split the golden eggs evenly between the farmer and the merchant.", "Arthur", ANALYSIS, tokens=900)
+
+    hit = cache.get(GOOSE, "split the golden eggs evenly between the farmer and the merchant", "Guinevere")
+    assert hit.highlighted_analysis == "**Judge Guinevere**, splitting the eggs is fair."
+    assert hit.thought_process == "Guinevere weighed need."
+    # A different ruling, or the same ruling on another scenario, is not a hit
+    assert cache.get(GOOSE, "Give the goose to the merchant, she has the receipt.", "Guinevere") is None
+    assert cache.get(MILL, "Split the golden eggs evenly between the farmer and the merchant.", "Guinevere") is None
+
+    report = cache.report()
+    assert report["hits"] == 1 and report["lookups"] == 3
+    assert report["tokens_saved"] == 900
+
+def test_disabled_cache_and_capacity():
+    assert AnalysisCache(enabled=False).get(GOOSE, "Split it.", "Arthur") is None
+    cache = AnalysisCache(enabled=True, max_scenarios=1, per_scenario=2)
+    for i in range(4):
+        cache.put(GOOSE, f"Judgment number {i} of many.", "Arthur", ANALYSIS)
+    assert len(cache._entries(GOOSE, create=False).entries) == 2
+    cache.put(MILL, "Sell the mill.", "Arthur", ANALYSIS)
+    assert cache.report()["scenarios"] == 1
+    assert personalize("Arthurian Arthur", "Arthur", "Kay") == "Arthurian Kay"
+
+def test_analyze_judgment_uses_the_cache():
+    response = MagicMock()
+    response.choices[0].message.content = ANALYSIS.model_dump_json()
+    response.usage.completion_tokens = 700
+    with patch("llm_integration.client") as client, \
+            patch("llm_integration.analysis_cache", AnalysisCache(enabled=True)) as cache:
+        client.chat.completions.create.return_value = response
+        from llm_integration import analyze_judgment_with_llm
+        analyze_judgment_with_llm("Split the eggs evenly between them.", GOOSE, "Arthur")
+        result = analyze_judgment_with_llm("Split the eggs evenly between them!", GOOSE, "Guinevere")
+    assert client.chat.completions.create.call_count == 1
+    assert result.analysis == "Judge Guinevere, splitting the eggs is fair."
+    assert cache.report()["tokens_saved"] > 700
+
+def test_analyses_are_not_shared_across_briefs_or_models():
+    from llm_integration import analyze_judgment_with_llm
+    from models import AdvisorBrief
+    brief = AdvisorBrief(values_in_conflict=["property vs. need"], key_facts=[], ambiguities=[])
+    other_brief = AdvisorBrief(values_in_conflict=["mercy vs. law"], key_facts=[], ambiguities=[])
+    response = MagicMock()
+    response.choices[0].message.content = ANALYSIS.model_dump_json()
+    judgment = "Split the eggs evenly between them."
+    with patch("llm_integration.client") as client, \
+            patch("llm_integration.analysis_cache", AnalysisCache(enabled=True)):
+        client.chat.completions.create.return_value = response
+        analyze_judgment_with_llm(judgment, GOOSE, "Arthur", advisor_brief=brief)
+        analyze_judgment_with_llm(judgment, GOOSE, "Kay", advisor_brief=brief)
+        assert client.chat.completions.create.call_count == 1
+        analyze_judgment_with_llm(judgment, GOOSE, "Guinevere", advisor_brief=other_brief)
+        analyze_judgment_with_llm(judgment, GOOSE, "Lancelot")
+        analyze_judgment_with_llm(judgment, GOOSE, "Gawain", model="gpt-other")
+        assert client.chat.completions.create.call_count == 4
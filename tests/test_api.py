@@ -0,0 +1,115 @@
+import pytest
+from unittest.mock import patch
+from models import Scenario, WitnessResponse, Analysis
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+from starlette.testclient import TestClient
+
+SCENARIO = Scenario(scenario="A dispute over a golden goose.", highlighted_scenario="A dispute over a **golden goose**.",
+                    characters=["The Farmer", "The Merchant"])
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    import api
+    import file_utils
+    monkeypatch.setattr(file_utils, "PAST_CASES_DIR", str(tmp_path / "past_cases"))
+    monkeypatch.setattr(api, "API_CASES_DIR", str(tmp_path / "api_cases"))
+    with patch("llm_integration.start_case_scenario", return_value=SCENARIO), \
+            patch("llm_integration.get_witness_response_with_llm", return_value=WitnessResponse(response="I saw nothing, Sire!")), \
+            patch("llm_integration.analyze_judgment_with_llm", return_value=Analysis(thought_process="t", analysis="Wise.", highlighted_analysis="**Wise.**")):
+        with TestClient(api.app) as test_client:
+            yield test_client
+
+def test_full_case_through_the_api(client):
+    created = client.post("/cases", json={"player_name": "Arthur", "difficulty": "Simple"})
+    assert created.status_code == 201
+    case = created.json()
+    assert case["scenario"]["characters"] == ["The Farmer", "The Merchant"]
+    assert case["questions_remaining"] == 3
+
+    asked = client.post(f"/cases/{case['case_id']}/questions", json={"character": "The Farmer", "question": "Whose goose?"})
+    assert asked.json() == {"response": "I saw nothing, Sire!", "questions_remaining": 2}
+    assert client.get(f"/cases/{case['case_id']}").json()["inquiry_history"][0]["question"] == "Whose goose?"
+
+    judged = client.post(f"/cases/{case['case_id']}/judgment", json={"judgment": "The goose goes home."})
+    assert judged.json()["saved"] is True
+    assert judged.json()["highlighted_analysis"] == "**Wise.**"
+    # The case leaves the in-progress store and shows up in the archive and the player's profile
+    assert client.get(f"/cases/{case['case_id']}").status_code == 404
+    assert client.get("/archive").json()["cases"][0]["case_id"] == case["case_id"]
+    assert client.get(f"/archive/{case['case_id']}").json()["inquiry_history"][0]["character"] == "The Farmer"
+    assert client.get("/players/arthur").json()["cases"] == 1
+    assert client.get("/leaderboard").json()[0]["name"] == "Arthur"
+
+def test_api_rejects_bad_requests(client):
+    assert client.post("/cases", json={"player_name": "", "difficulty": "Simple"}).status_code == 422
+    assert client.post("/cases", content=b"not json").status_code == 400
+    assert client.get("/cases/../../etc").status_code == 404
+    case_id = client.post("/cases", json={"player_name": "Arthur"}).json()["case_id"]
+    assert client.post(f"/cases/{case_id}/questions", json={"character": "The King", "question": "?"}).status_code == 422
+    for _ in range(3):
+        client.post(f"/cases/{case_id}/questions", json={"character": "The Farmer", "question": "Why?"})
+    assert client.post(f"/cases/{case_id}/questions", json={"character": "The Farmer", "question": "Why?"}).status_code == 409
+
+def test_llm_errors_and_auth(client, monkeypatch):
+    import api
+    with patch("llm_integration.start_case_scenario", return_value={"error": "down"}):
+        response = client.post("/cases", json={"player_name": "Arthur"})
+    assert response.status_code == 502 and "down" in response.json()["error"]
+
+    monkeypatch.setattr(api, "API_TOKEN", "secret")
+    assert client.get("/leaderboard").status_code == 401
+    assert client.get("/leaderboard", headers={"Authorization": "Bearer secret"}).status_code == 200
+    assert client.get("/health").status_code == 200
+
+def test_classroom_cases_share_scenario_and_brief(client, tmp_path, monkeypatch):
+    import api
+    from classroom import ClassroomStore
+    from models import AdvisorBrief
+    brief = AdvisorBrief(values_in_conflict=["property vs. need"], key_facts=[], ambiguities=[])
+    monkeypatch.setattr(api, "classrooms", ClassroomStore(str(tmp_path / "classrooms")))
+    with patch("llm_integration.generate_scenario_with_llm", return_value=SCENARIO), \
+            patch("llm_integration.generate_advisor_brief_with_llm", return_value=brief), \
+            patch("llm_integration.scenario_library"):
+        code = client.post("/classrooms", json={"difficulty": "Complex"}).json()["code"]
+        case = client.post("/cases", json={"player_name": "Arthur", "classroom_code": code}).json()
+        assert case["difficulty"] == "Complex" and case["classroom_code"] == code
+        client.post(f"/cases/{case['case_id']}/judgment", json={"judgment": "The goose goes home."})
+        assert client.post("/cases", json={"player_name": "Arthur", "classroom_code": "ZZZZZZ"}).status_code == 404
+    import llm_integration
+    assert llm_integration.analyze_judgment_with_llm.call_args.kwargs["advisor_brief"] == brief
+
+def test_questions_wait_for_the_case_lock_of_other_workers(client, tmp_path):
+    import os
+    import threading
+    fcntl = pytest.importorskip("fcntl")
+    case_id = client.post("/cases", json={"player_name": "Arthur"}).json()["case_id"]
+    # Another worker process holding the case's lock: a separate open file description
+    with open(tmp_path / "api_cases" / f".{case_id}.lock", "a") as held:
+        fcntl.flock(held.fileno(), fcntl.LOCK_EX)
+        responses = []
+        asker = threading.Thread(target=lambda: responses.append(client.post(
+            f"/cases/{case_id}/questions", json={"character": "The Farmer", "question": "<b>Whose</b> goose?"})))
+        asker.start()
+        asker.join(0.5)
+        assert asker.is_alive() and not responses
+        fcntl.flock(held.fileno(), fcntl.LOCK_UN)
+        asker.join(5)
+    assert responses[0].json()["questions_remaining"] == 2
+    history = client.get(f"/cases/{case_id}").json()["inquiry_history"]
+    assert history[0]["question"] == "&lt;b&gt;Whose&lt;/b&gt; goose?"
+    assert client.post(f"/cases/{case_id}/questions", json={"character": "The Farmer", "question": "   "}).status_code == 422
+    assert os.path.exists(tmp_path / "api_cases" / f"{case_id}.json")
+
+def test_empty_judgments_are_rejected_and_lock_files_do_not_pile_up(client, tmp_path):
+    import os
+    import llm_integration
+    case_id = client.post("/cases", json={"player_name": "Arthur"}).json()["case_id"]
+    assert client.post(f"/cases/{case_id}/judgment", json={"judgment": "   "}).status_code == 422
+    llm_integration.analyze_judgment_with_llm.assert_not_called()
+    client.post(f"/cases/{case_id}/questions", json={"character": "The Farmer", "question": "Whose goose?"})
+    assert client.post(f"/cases/{case_id}/judgment", json={"judgment": "The goose goes home."}).json()["saved"] is True
+    # Neither an archived case nor a request for an unknown one leaves a lock file behind
+    assert client.post("/cases/NOSUCHCASE/questions", json={"character": "The Farmer", "question": "?"}).status_code == 404
+    assert [f for f in os.listdir(tmp_path / "api_cases") if f.endswith(".lock")] == []
@@ -0,0 +1,20 @@
+from ui.archives import build_case_markdown
+from models import CaseRecord, InquiryEntry
+
+def test_build_case_markdown_escapes_stored_text():
+    case_record = CaseRecord(
+        case_id="render_1",
+        player_name="<script>alert(1)</script>",
+        difficulty="Simple",
+        scenario="The **golden goose** <img src=x onerror=alert(1)>",
+        inquiry_history=[InquiryEntry(character="The Farmer", question="Why?", response="Because.")],
+        judgment="Return the goose.",
+        analysis="A **wise** ruling."
+    )
+    rendered = build_case_markdown(case_record)
+    assert "<script>" not in rendered and "<img" not in rendered
+    assert "&lt;script&gt;" in rendered
+    # Markdown emphasis survives escaping
+    assert "**golden goose**" in rendered
+    assert "**To The Farmer:** Why?" in rendered
+    assert rendered.count('<section class="royal-card"') == 5
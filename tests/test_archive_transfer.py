@@ -0,0 +1,30 @@
+import gzip
+import json
+from archive_transfer import export_archive, import_archive
+from file_utils import save_case, list_past_cases
+
+def test_export_filters_and_compresses(temp_case_dir, tmp_path, make_record):
+    save_case(make_record("e1", "Arthur", "Simple", date="2026-01-05 10:00:00"))
+    save_case(make_record("e2", "Arthur", "Complex", date="2026-03-05 10:00:00"))
+    save_case(make_record("e3", "Merlin", "Complex", date="2026-03-06 10:00:00"))
+
+    path = str(tmp_path / "export.jsonl.gz")
+    assert export_archive(path, since="2026-02-01", difficulty="Complex") == 2
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        ids = sorted(json.loads(line)["case_id"] for line in f)
+    assert ids == ["e2", "e3"]
+
+    assert export_archive(path, judge="Merlin", until="2026-12-31") == 1
+
+def test_import_dedupes_by_case_id(temp_case_dir, tmp_path, make_record):
+    save_case(make_record("i1", "Arthur", "Simple", date="2026-01-05 10:00:00"))
+    path = str(tmp_path / "import.jsonl.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for case_id in ["i1", "i2", "i2"]:
+            f.write(make_record(case_id, "Lancelot", "Moderate", date="2026-01-06 10:00:00").model_dump_json() + "\n")
+        f.write(json.dumps({"case_id": "../escape", "player_name": "X", "difficulty": "Simple",
+                            "scenario": "s", "judgment": "j", "analysis": "a"}) + "\n")
+
+    counts = import_archive(path)
+    assert counts == {"imported": 1, "skipped": 2, "failed": 1}
+    assert sorted(list_past_cases()) == ["case_i1.json", "case_i2.json"]
@@ -0,0 +1,65 @@
+import os
+import time
+import shutil
+import pytest
+import file_utils
+from archive_watcher import ArchiveIndex, get_archive_index, Observer
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+def _write_externally(root, relative):
+    """Writes a case file the way another process's save_case would."""
+    path = os.path.join(str(root), *relative.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_utils.atomic_write_text(path, "{}", fsync=False)
+    return path
+
+@pytest.mark.parametrize("mode", ["auto", "poll"])
+def test_index_follows_changes_made_outside_the_process(temp_case_dir, tmp_path, mode, make_record):
+    if mode == "auto" and Observer is None:
+        pytest.skip("watchdog is not installed")
+    file_utils.save_case(make_record("20240101_120000_000000"))
+    index = ArchiveIndex(str(temp_case_dir), mode=mode, poll_seconds=0.05)
+    try:
+        assert index.mode == ("events" if mode == "auto" else "poll")
+        assert index.cases() == ["case_20240101_120000_000000.json"]
+        path = _write_externally(temp_case_dir, "2026/10/17/case_01AAAAAAAAAAAAAAAAAAAAAAAA.json")
+        assert _wait_for(lambda: index.count == 2)
+        assert index.cases()[0] == "2026/10/17/case_01AAAAAAAAAAAAAAAAAAAAAAAA.json"
+
+        os.remove(path)
+        assert _wait_for(lambda: index.count == 1)
+
+        # A backup restored as a whole directory tree, then a shard removed in one go
+        backup = tmp_path / "backup" / "2025"
+        _write_externally(backup, "12/31/case_00AAAAAAAAAAAAAAAAAAAAAAAA.json")
+        shutil.copytree(str(backup), str(temp_case_dir / "2025"))
+        assert _wait_for(lambda: index.count == 2)
+        shutil.rmtree(str(temp_case_dir / "2025"))
+        assert _wait_for(lambda: index.count == 1)
+        # Analytics and profile files next to the shards are not cases
+        assert index.cases() == ["case_20240101_120000_000000.json"]
+    finally:
+        index.stop()
+
+def test_shared_index_sees_own_saves_immediately(temp_case_dir, make_record):
+    index = get_archive_index()
+    assert get_archive_index() is index
+    case_id = file_utils.generate_case_id()
+    file_utils.save_case(make_record(case_id))
+    assert index.cases() == [file_utils.case_filename(case_id)]
+    assert index.mtime(file_utils.case_filename(case_id)) == os.path.getmtime(file_utils.case_path(file_utils.case_filename(case_id)))
+
+def test_polling_is_reported_once(temp_case_dir, monkeypatch, capsys):
+    import archive_watcher
+    monkeypatch.setattr(archive_watcher, "_polling_reported", False)
+    indexes = [ArchiveIndex(str(temp_case_dir), mode="poll", poll_seconds=60) for _ in range(2)]
+    for index in indexes:
+        index.stop()
+    assert capsys.readouterr().out.count("rescanning it every 60s (ARCHIVE_WATCH_MODE=poll)") == 1
@@ -0,0 +1,25 @@
+import pytest
+from case_view import CaseView, iter_case_views, load_case_view
+from file_utils import save_case
+
+def test_case_view_round_trips_to_record(make_record):
+    record = make_record("view_1", characters=["The Bellringer"])
+    view = CaseView.from_json(record.model_dump_json(indent=4))
+    assert view.case_id == "view_1"
+    assert view.inquiry_history[0].character == "The Bellringer"
+    assert view.to_record() == record
+
+def test_case_view_is_read_only_and_interns_names(make_record):
+    a = CaseView.from_json(make_record("view_2", "Judge" + "Interned", characters=["The Bellringer"]).model_dump_json())
+    b = CaseView.from_json(make_record("view_3", "Judge" + "Interned", characters=["The Bellringer"]).model_dump_json())
+    assert a.player_name is b.player_name
+    assert a.inquiry_history[0].character is b.inquiry_history[0].character
+    with pytest.raises(AttributeError):
+        a.judgment = "Overruled"
+
+def test_iter_case_views_reads_archive(temp_case_dir, make_record):
+    save_case(make_record("20240101_000000_000001"))
+    save_case(make_record("20240101_000000_000002"))
+    views = list(iter_case_views())
+    assert [v.case_id for v in views] == ["20240101_000000_000002", "20240101_000000_000001"]
+    assert load_case_view("case_missing.json") is None
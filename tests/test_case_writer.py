@@ -0,0 +1,47 @@
+import os
+from unittest.mock import patch
+from case_writer import CaseWriter, SAVED
+
+def test_writer_saves_case_in_background(temp_case_dir, make_record):
+    writer = CaseWriter()
+    assert writer.submit(make_record("bg_1")) is True
+    assert writer.flush(timeout=5)
+    assert writer.status("bg_1") == SAVED
+    assert os.path.exists(os.path.join(str(temp_case_dir), "case_bg_1.json"))
+    # No temporary files are left behind by the atomic rename
+    assert not [f for f in os.listdir(str(temp_case_dir)) if f.startswith(".tmp_")]
+
+def test_writer_is_exactly_once_per_case_id(temp_case_dir, make_record):
+    import file_utils
+    writer = CaseWriter()
+    with patch("case_writer.file_utils.save_case", wraps=file_utils.save_case) as save_spy:
+        assert writer.submit(make_record("once_1")) is True
+        assert writer.submit(make_record("once_1")) is False
+        writer.flush(timeout=5)
+        assert writer.submit(make_record("once_1")) is False
+        writer.flush(timeout=5)
+    assert save_spy.call_count == 1
+
+def test_shutdown_flushes_and_rejects_new_cases(temp_case_dir, make_record):
+    writer = CaseWriter()
+    writer.submit(make_record("shutdown_1"))
+    writer.shutdown()
+    assert writer.status("shutdown_1") == SAVED
+    assert writer.submit(make_record("shutdown_2")) is False
+
+def test_a_failing_save_does_not_stop_the_writer(temp_case_dir, make_record):
+    import file_utils
+    from case_writer import FAILED
+    real_save = file_utils.save_case
+    def save(case_record, sync_dir=True):
+        if case_record.case_id == "bad_1":
+            raise RuntimeError("disk on fire")
+        return real_save(case_record, sync_dir=sync_dir)
+    writer = CaseWriter()
+    with patch("case_writer.file_utils.save_case", side_effect=save):
+        writer.submit(make_record("bad_1"))
+        assert writer.flush(timeout=5)
+        writer.submit(make_record("good_1"))
+        assert writer.flush(timeout=5)
+    assert writer.status("bad_1") == FAILED
+    assert writer.status("good_1") == SAVED
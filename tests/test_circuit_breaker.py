@@ -0,0 +1,133 @@
+# tests/test_circuit_breaker.py
+import json
+import openai
+import pytest
+from unittest.mock import MagicMock, patch
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from models import Scenario
+from scenario_library import ScenarioLibrary
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=5, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_success(1.0)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    # A slow success counts as a failure
+    breaker.record_success(6.0)
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+    clock.now = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+    # Only one trial call at a time
+    assert breaker.allow() is False
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 20.0
+    assert breaker.allow() is True
+    breaker.record_success(1.0)
+    assert breaker.state == CLOSED
+
+def test_released_trial_neither_closes_the_breaker_nor_resets_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=5, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.release_trial()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 10.0
+    assert breaker.allow() is True
+    breaker.release_trial()
+    assert breaker.state == HALF_OPEN
+    # The next trial may go, and its failure opens the breaker again
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+def test_scenario_library_round_trip(tmp_path):
+    path = str(tmp_path / "library.jsonl")
+    goose = Scenario(scenario="A goose.", highlighted_scenario="A **goose**.", characters=["The Farmer"])
+    assert ScenarioLibrary(path).add("Simple", goose) is True
+    library = ScenarioLibrary(path)
+    assert library.count("Simple") == 1
+    assert library.take("Simple", "Arthur") == goose
+    assert ScenarioLibrary(str(tmp_path / "missing.jsonl")).take("Simple", "Arthur") is None
+
+@pytest.fixture
+def breaker_setup(tmp_path):
+    import llm_integration
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    library = ScenarioLibrary(str(tmp_path / "library.jsonl"))
+    with patch("llm_integration.client") as mock_client, \
+            patch.object(llm_integration, "circuit_breaker", breaker), \
+            patch.object(llm_integration, "scenario_library", library):
+        yield mock_client, breaker, library
+
+def test_open_breaker_serves_library_scenarios_and_fails_fast(breaker_setup):
+    from llm_integration import generate_scenario_with_llm, analyze_judgment_with_llm, LLM_TIMEOUTS, BACKEND_UNAVAILABLE_MESSAGE
+    mock_client, breaker, library = breaker_setup
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps({
+        "scenario": "A dispute over a golden goose.",
+        "highlighted_scenario": "A dispute over a **golden goose**.",
+        "characters": ["The Farmer", "The Merchant"],
+    })
+    mock_client.chat.completions.create.return_value = response
+    generated = generate_scenario_with_llm("Arthur", "Simple")
+    assert mock_client.chat.completions.create.call_args.kwargs["timeout"] == LLM_TIMEOUTS["scenario"]
+    assert library.count("Simple") == 1
+
+    mock_client.chat.completions.create.side_effect = openai.APITimeoutError(request=MagicMock())
+    assert generate_scenario_with_llm("Guinevere", "Simple") == generated
+    assert breaker.state == OPEN
+
+    # While open, nothing reaches the backend; a player who has seen every stored scenario
+    # gets an error rather than a repeat
+    mock_client.chat.completions.create.reset_mock()
+    assert generate_scenario_with_llm("Lancelot", "Simple") == generated
+    assert generate_scenario_with_llm("Arthur", "Simple") == {"error": BACKEND_UNAVAILABLE_MESSAGE}
+    assert "error" in analyze_judgment_with_llm("judgment", "scenario", "Arthur")
+    mock_client.chat.completions.create.assert_not_called()
+
+def test_client_errors_do_not_trip_breaker(breaker_setup):
+    from llm_integration import analyze_judgment_with_llm
+    mock_client, breaker, _ = breaker_setup
+    mock_client.chat.completions.create.side_effect = ValueError("bad request")
+    assert "error" in analyze_judgment_with_llm("judgment", "scenario", "Arthur")
+    assert breaker.state == CLOSED
+
+def test_stream_closed_early_releases_the_trial_without_closing_the_breaker():
+    import llm_integration
+    from types import SimpleNamespace
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    raw = json.dumps({"response": "I saw the merchant take the goose, Sire!"})
+    def chunks(**kwargs):
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=raw[i:i + 5]))])
+                     for i in range(0, len(raw), 5)])
+    with patch("llm_integration.client") as mock_client, patch.object(llm_integration, "circuit_breaker", breaker):
+        mock_client.chat.completions.create.side_effect = chunks
+        pieces = iter(llm_integration.stream_witness_response_with_llm("A dispute.", "The Farmer", "What did you see?"))
+        next(pieces)
+        # The reader goes away mid-answer: the trial is over, but it proved nothing
+        pieces.close()
+        assert breaker.state == HALF_OPEN
+        assert all(row["in_flight"] == 0 for row in llm_integration.llm_scheduler.report().values())
+        # The next trial goes ahead, and a stream read to its end closes the breaker
+        stream = llm_integration.stream_witness_response_with_llm("A dispute.", "The Farmer", "What did you see?")
+        assert "".join(stream) == "I saw the merchant take the goose, Sire!"
+        assert breaker.state == CLOSED
@@ -0,0 +1,74 @@
+import json
+import time
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from classroom import ClassroomStore, normalize_code
+from llm_integration import analyze_judgment_with_llm
+from models import Scenario, AdvisorBrief
+from scenario_library import ScenarioLibrary
+
+SCENARIO = Scenario(scenario="A dispute over a golden goose.", highlighted_scenario="A dispute over a **golden goose**.",
+                    characters=["The Farmer", "The Merchant"])
+BRIEF = AdvisorBrief(values_in_conflict=["property vs. need"], key_facts=["The goose lays golden eggs."],
+                     ambiguities=["Who raised the goose is unclear."])
+
+@pytest.fixture
+def store(tmp_path):
+    library = ScenarioLibrary(str(tmp_path / "library.jsonl"))
+    with patch("llm_integration.generate_scenario_with_llm", return_value=SCENARIO), \
+            patch("llm_integration.scenario_library", library):
+        yield ClassroomStore(str(tmp_path / "classrooms"))
+
+def test_classroom_shares_one_scenario_and_one_brief(store):
+    calls = []
+    def slow_brief(scenario_details, difficulty):
+        calls.append(scenario_details)
+        time.sleep(0.05)
+        return BRIEF
+
+    with patch("llm_integration.generate_advisor_brief_with_llm", side_effect=slow_brief):
+        classroom = store.create("Complex")
+        assert normalize_code(classroom.code.lower()) == classroom.code
+        assert store.join(classroom.code, "Arthur").scenario == SCENARIO
+        assert store.join(" " + classroom.code.lower(), "Guinevere").difficulty == "Complex"
+        assert store.join("NOPE", "Arthur") is None
+
+        # Judges arriving together wait for the one brief started at creation
+        briefs = []
+        threads = [threading.Thread(target=lambda: briefs.append(store.brief(classroom.code))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert briefs == [BRIEF] * 5
+    assert len(calls) == 1
+    # The brief is kept with the classroom for other processes
+    assert ClassroomStore(store.directory).get(classroom.code).brief == BRIEF
+
+def test_classroom_scenario_stays_out_of_the_library(store):
+    import llm_integration
+    with patch("llm_integration.generate_advisor_brief_with_llm", return_value={"error": "down"}):
+        classroom = store.create("Simple")
+        assert store.brief(classroom.code) is None
+    assert llm_integration.generate_scenario_with_llm.call_args.kwargs["add_to_library"] is False
+    store.join(classroom.code, "Arthur")
+    # Players outside the classroom are never served its scenario
+    assert llm_integration.scenario_library.count() == 0
+    assert llm_integration.scenario_library.take("Simple", "Guinevere") is None
+
+def test_analysis_with_brief_shares_prompt_prefix_and_steps_down():
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps({"thought_process": "t", "analysis": "Wise.", "highlighted_analysis": "**Wise.**"})
+    with patch("llm_integration.client") as client:
+        client.chat.completions.create.return_value = response
+        analyze_judgment_with_llm("The goose goes home.", SCENARIO.highlighted_scenario, "Arthur", difficulty="Complex", advisor_brief=BRIEF)
+        analyze_judgment_with_llm("Split the eggs.", SCENARIO.highlighted_scenario, "Guinevere", difficulty="Complex", advisor_brief=BRIEF)
+        analyze_judgment_with_llm("Split the eggs.", SCENARIO.highlighted_scenario, "Guinevere", difficulty="Complex")
+    first, second, unbriefed = [call.kwargs for call in client.chat.completions.create.call_args_list]
+    first_prompt, second_prompt = first["messages"][1]["content"], second["messages"][1]["content"]
+    shared = first_prompt.split("Judge Arthur")[0]
+    assert "property vs. need" in shared and "golden goose" in shared
+    assert second_prompt.startswith(shared)
+    assert first.get("reasoning_effort") == "low" and unbriefed.get("reasoning_effort") == "medium"
+    assert first["max_completion_tokens"] < unbriefed["max_completion_tokens"]
@@ -0,0 +1,140 @@
+import os
+import time
+import datetime
+import pytest
+import file_utils
+import cold_storage
+from archive_watcher import ArchiveIndex, Observer
+from case_view import load_case_view
+from models import InquiryEntry
+
+NOW = datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc)
+
+def _case_id(days_ago, n):
+    millis = int((NOW - datetime.timedelta(days=days_ago)).timestamp() * 1000)
+    return file_utils._encode(millis, 10) + file_utils._encode(7, 4) + file_utils._encode(n, 12)
+
+@pytest.fixture
+def case_record(make_record):
+    """Records with text long enough to be worth compressing."""
+    def build(case_id, n):
+        return make_record(
+            case_id, f"Judge{n % 3}", "Moderate", f"The goose returns to the farmer, who pays {n} coins for its keep.",
+            scenario="A dispute over a golden goose between two neighbours, each claiming to have raised it. " * 4,
+            inquiry_history=[InquiryEntry(character="The Farmer", question="Whose goose is it?", response=f"Mine, Sire, since spring number {n}!")],
+            analysis="A balanced ruling that weighs property against need and rewards honest labour. " * 3,
+        )
+    return build
+
+def _save_archive(case_record, days_ago_list):
+    records = {}
+    for n, days_ago in enumerate(days_ago_list):
+        record = case_record(_case_id(days_ago, n), n)
+        assert file_utils.save_case(record)
+        records[file_utils.case_filename(record.case_id)] = record
+    # A legacy top-level case, old by its file time
+    legacy = case_record("20240101_120000_000000", 99)
+    file_utils.save_case(legacy)
+    old = (NOW - datetime.timedelta(days=400)).timestamp()
+    os.utime(file_utils.case_path("case_20240101_120000_000000.json"), (old, old))
+    records["case_20240101_120000_000000.json"] = legacy
+    return records
+
+def test_old_cases_move_to_bundles_and_read_back_transparently(temp_case_dir, case_record):
+    records = _save_archive(case_record, [40, 40, 40, 45, 45, 2, 1])
+    listed = file_utils.list_past_cases()
+
+    counts = cold_storage.tier_archive(days=30, codec="zlib", now=NOW.timestamp())
+    assert counts["moved"] == 6 and counts["bundles"] == 3
+    assert counts["bytes_after"] < counts["bytes_before"] / 3
+    assert counts["dictionary"].endswith(".zlib")
+
+    # Same listing, same contents; only the two recent cases are still plain files
+    assert file_utils.list_past_cases() == listed
+    assert sum(os.path.exists(file_utils.case_path(f)) for f in listed) == 2
+    for filename, record in records.items():
+        assert file_utils.load_case(filename) == record
+        assert file_utils.case_exists(filename) and file_utils.case_mtime(filename) is not None
+    old_json = next(f for f in listed if "/" in f and not os.path.exists(file_utils.case_path(f)))
+    assert load_case_view(old_json).judgment == records[old_json].judgment
+
+    # A case restored into a tiered day joins its bundle on the next run
+    restored = case_record(_case_id(40, 50), 50)
+    file_utils.save_case(restored)
+    assert cold_storage.tier_archive(days=30, codec="zlib", now=NOW.timestamp())["moved"] == 1
+    assert file_utils.load_case(file_utils.case_filename(restored.case_id)) == restored
+    assert len(file_utils.list_past_cases()) == len(listed) + 1
+    day_dir = os.path.dirname(file_utils.case_path(file_utils.case_filename(restored.case_id)))
+    assert sorted(os.listdir(day_dir))[0].startswith("cold_") and len(os.listdir(day_dir)) == 2
+
+def test_zstd_dictionary_codec(temp_case_dir, case_record):
+    pytest.importorskip("zstandard")
+    records = _save_archive(case_record, [40] * 20)
+    counts = cold_storage.tier_archive(days=30, codec="zstd", now=NOW.timestamp())
+    assert counts["moved"] == 21
+    for filename, record in records.items():
+        assert file_utils.load_case(filename) == record
+
+@pytest.mark.parametrize("mode", ["auto", "poll"])
+def test_archive_index_keeps_tiered_cases(temp_case_dir, case_record, mode):
+    if mode == "auto" and Observer is None:
+        pytest.skip("watchdog is not installed")
+    _save_archive(case_record, [40, 40, 3])
+    index = ArchiveIndex(str(temp_case_dir), mode=mode, poll_seconds=0.05)
+    try:
+        before = index.cases()
+        cold_storage.tier_archive(days=30, codec="zlib", now=NOW.timestamp())
+        time.sleep(0.3)
+        assert index.cases() == before
+        # A fresh index lists bundled cases from the start
+        fresh = ArchiveIndex(str(temp_case_dir), mode="poll", poll_seconds=60)
+        fresh.stop()
+        assert fresh.cases() == before
+    finally:
+        index.stop()
+
+def test_dictionary_is_reused_until_retrained_and_unused_ones_are_deleted(temp_case_dir, case_record, monkeypatch):
+    records = _save_archive(case_record, [40, 40, 45, 45, 2])
+    first = cold_storage.tier_archive(days=30, codec="zlib", now=NOW.timestamp())
+    assert first["trained"] and cold_storage.current_dictionary("zlib") == first["dictionary"]
+
+    # Later runs compress new arrivals with the current dictionary
+    later = case_record(_case_id(50, 60), 60)
+    file_utils.save_case(later)
+    records[file_utils.case_filename(later.case_id)] = later
+    second = cold_storage.tier_archive(days=30, codec="zlib", now=NOW.timestamp())
+    assert not second["trained"] and second["dictionary"] == first["dictionary"] and second["moved"] == 1
+
+    # A retrain samples the whole archive, bundles included, though only one plain case is left to move
+    retrain_case = case_record(_case_id(40, 70), 70)
+    file_utils.save_case(retrain_case)
+    records[file_utils.case_filename(retrain_case.case_id)] = retrain_case
+    orphan = os.path.join(str(temp_case_dir), "_dictionaries", "0123456789abcdef.zlib")
+    with open(orphan, "wb") as f:
+        f.write(b"unused")
+    sampled = []
+    real_train = cold_storage.train_dictionary
+    def train(codec, samples):
+        sampled.extend(samples)
+        return real_train(codec, samples)
+    monkeypatch.setattr(cold_storage, "train_dictionary", train)
+    third = cold_storage.tier_archive(days=30, codec="zlib", now=NOW.timestamp(), retrain=True)
+    assert third["trained"] and len(sampled) == len(records)
+    assert cold_storage.current_dictionary("zlib") == third["dictionary"]
+    assert third["collected"] >= 1 and not os.path.exists(orphan)
+    # Dictionaries still used by untouched bundles stay; every case still reads back
+    for filename, record in records.items():
+        assert file_utils.load_case(filename) == record
+
+def test_cases_removed_while_tiering_are_skipped(temp_case_dir, case_record, monkeypatch):
+    records = _save_archive(case_record, [40, 40, 45])
+    gone = next(f for f in records if "/" in f)
+    real_age = cold_storage._case_age_days
+    def age_then_remove(filename, now):
+        if filename == gone and os.path.exists(file_utils.case_path(filename)):
+            os.remove(file_utils.case_path(filename))
+        return real_age(filename, now)
+    monkeypatch.setattr(cold_storage, "_case_age_days", age_then_remove)
+    counts = cold_storage.tier_archive(days=30, codec="zlib", now=NOW.timestamp())
+    assert counts["moved"] == len(records) - 1
+    assert not file_utils.case_exists(gone)
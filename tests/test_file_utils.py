@@ -1,19 +1,8 @@
 # tests/test_file_utils.py
 import os
-import pytest
 from file_utils import save_case, list_past_cases, generate_case_id, PAST_CASES_DIR
 from models import CaseRecord, InquiryEntry
 
-@pytest.fixture
-def temp_case_dir(tmp_path):
-    """Fixture to use a temporary directory for past cases during tests."""
-    import file_utils
-    original_dir = file_utils.PAST_CASES_DIR
-    temp_dir = tmp_path / "test_past_cases"
-    file_utils.PAST_CASES_DIR = str(temp_dir)
-    yield temp_dir
-    file_utils.PAST_CASES_DIR = original_dir
-
 def test_save_case(temp_case_dir):
     case_id = "test_case_123"
     player_name = "TestJudge"
@@ -83,3 +72,51 @@ def test_list_past_cases(temp_case_dir):
     cases = list_past_cases()
     assert len(cases) == 1
     assert "case_20240101_120000_000000.json" in cases
+
+def _ids(count):
+    return [generate_case_id() for _ in range(count)]
+
+def test_case_ids_are_sortable_and_unique_across_threads_and_processes():
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+    from file_utils import case_id_time
+    ids = _ids(1000)
+    assert ids == sorted(ids) and len(set(ids)) == 1000
+    assert case_id_time(ids[0]) is not None
+    with ThreadPoolExecutor(4) as pool:
+        threaded = [i for batch in pool.map(_ids, [500] * 4) for i in batch]
+    with ProcessPoolExecutor(2) as pool:
+        forked = [i for batch in pool.map(_ids, [500] * 2) for i in batch]
+    assert len(set(ids + threaded + forked)) == 4000
+
+def test_cases_are_sharded_by_date_and_listed_newest_first(temp_case_dir):
+    from file_utils import load_case, case_filename, iter_past_cases
+    def record(case_id):
+        return CaseRecord(case_id=case_id, player_name="Judge", difficulty="Simple", scenario="s", judgment="j", analysis="a")
+
+    older, newer = generate_case_id(), generate_case_id()
+    for case_id in (newer, older, "20240101_120000_000000"):
+        assert save_case(record(case_id)) is True
+    assert case_filename(newer).count("/") == 3
+    assert os.path.exists(os.path.join(str(temp_case_dir), *case_filename(newer).split("/")))
+    # An older shard from another day, and the analytics/profile files next to the shards
+    old_shard = os.path.join(str(temp_case_dir), "2025", "12", "31")
+    os.makedirs(old_shard)
+    with open(os.path.join(old_shard, "case_0000000000000000000000000A.json"), "w") as f:
+        f.write("{}")
+
+    cases = list_past_cases()
+    assert cases == [case_filename(newer), case_filename(older),
+                     "2025/12/31/case_0000000000000000000000000A.json", "case_20240101_120000_000000.json"]
+    assert next(iter_past_cases()) == case_filename(newer)
+    assert load_case(cases[0]).case_id == newer
+    assert load_case(cases[-1]).case_id == "20240101_120000_000000"
+
+def test_a_failing_save_hook_does_not_fail_the_save(temp_case_dir, make_record, monkeypatch):
+    import file_utils
+    seen = []
+    def broken(case_record, is_new):
+        raise OSError("log missing")
+    monkeypatch.setattr(file_utils, "_save_hooks", [broken, lambda case_record, is_new: seen.append(case_record.case_id)])
+    assert file_utils.save_case(make_record("hooked_1")) is True
+    assert seen == ["hooked_1"]
+    assert file_utils.case_exists(file_utils.case_filename("hooked_1"))
@@ -0,0 +1,90 @@
+import json
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+import job_queue
+from job_queue import JobQueue, QUEUED, RUNNING, DONE, FAILED
+
+PAYLOAD = {"player_judgment": "Split the cow.", "scenario_details": "A dispute over a cow.",
+           "player_name": "Arthur", "difficulty": "Simple", "classroom_code": None, "inquiry_history": []}
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+def test_results_are_reused_across_reruns_and_restarts(queue_path):
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps({"thought_process": "t", "analysis": "Wise.", "highlighted_analysis": "**Wise.**"})
+    with patch("llm_integration.client") as client:
+        client.chat.completions.create.return_value = response
+        jobs = JobQueue(queue_path)
+        assert jobs.submit("case1", "analysis", PAYLOAD).status == QUEUED
+        # A rerun submitting again finds the same job rather than queuing a second call
+        assert jobs.submit("case1", "analysis", {**PAYLOAD, "player_judgment": "Changed."}).payload == PAYLOAD
+        assert jobs.run_one() is True
+        assert jobs.run_one() is False
+
+        # After a restart the finished result is served from the database
+        restarted = JobQueue(queue_path)
+        job = restarted.submit("case1", "analysis", PAYLOAD)
+        assert job.status == DONE and job.result["highlighted_analysis"] == "**Wise.**"
+        assert restarted.run_one() is False
+    assert client.chat.completions.create.call_count == 1
+
+def test_jobs_of_a_dead_worker_are_claimed_again(queue_path):
+    crashed = JobQueue(queue_path, lease_seconds=0.05, max_attempts=2)
+    crashed.submit("case1", "analysis", PAYLOAD)
+    first = crashed.claim()
+    assert first.status == RUNNING
+    survivor = JobQueue(queue_path, lease_seconds=0.05, max_attempts=2)
+    assert survivor.claim() is None
+    time.sleep(0.1)
+    job = survivor.claim()
+    assert job.case_id == "case1" and job.attempts == 2
+    # The late result of the first claim is discarded; only the current claim finishes the job
+    assert crashed.finish(first, {"analysis": "Late."}) is False
+    assert survivor.get("case1", "analysis").status == RUNNING
+    assert survivor.finish(job, {"analysis": "Again."}) is True
+    assert survivor.finish(job, {"analysis": "Twice."}) is False
+    assert survivor.get("case1", "analysis").result == {"analysis": "Again."}
+
+    survivor.submit("case2", "analysis", PAYLOAD)
+    survivor.claim()
+    time.sleep(0.1)
+    survivor.claim()
+    time.sleep(0.1)
+    # Out of attempts: failed instead of claimed forever
+    assert survivor.claim() is None
+    assert survivor.get("case2", "analysis").status == FAILED
+
+def test_failed_jobs_are_retried_on_request(queue_path, monkeypatch):
+    calls = []
+    def flaky(payload):
+        calls.append(payload)
+        return {"error": "The Oracle is busy."} if len(calls) == 1 else {"analysis": "Wise."}
+    monkeypatch.setitem(job_queue.HANDLERS, "analysis", flaky)
+    jobs = JobQueue(queue_path)
+    jobs.start_workers(2)
+    try:
+        jobs.submit("case1", "analysis", PAYLOAD)
+        deadline = time.monotonic() + 5
+        while jobs.get("case1", "analysis").status != FAILED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert jobs.get("case1", "analysis").error == "The Oracle is busy."
+        jobs.retry("case1", "analysis")
+        while jobs.get("case1", "analysis").status != DONE and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert jobs.get("case1", "analysis").result == {"analysis": "Wise."}
+    finally:
+        jobs.stop()
+    assert len(calls) == 2
+
+def test_worker_pool_is_capped_at_the_analysis_ceiling(queue_path, monkeypatch):
+    from llm_scheduler import LLMScheduler, ANALYSIS
+    ceiling = LLMScheduler().ceilings[ANALYSIS]
+    for argv, threads in ((["--processes", "2"], ceiling // 2), (["--processes", "2", "--threads", "1000"], ceiling // 2),
+                          (["--threads", "1"], 1)):
+        monkeypatch.setattr("sys.argv", ["job_queue.py", "--path", queue_path] + argv)
+        with patch("job_queue.multiprocessing.Process") as process:
+            job_queue.main()
+        assert process.call_args.kwargs["args"] == (queue_path, threads)
@@ -0,0 +1,83 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from llm_cassette import CassetteClient, CassetteMissError, request_key
+
+class ScriptedClient:
+    """Answers each call with the next canned content."""
+
+    def __init__(self, contents):
+        self.contents = list(contents)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **request):
+        content = self.contents[self.calls % len(self.contents)]
+        self.calls += 1
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+REQUEST = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.7}
+
+def test_request_key_ignores_timeout_but_not_prompt():
+    assert request_key(dict(REQUEST, timeout=5)) == request_key(REQUEST)
+    assert request_key(dict(REQUEST, messages=[{"role": "user", "content": "bye"}])) != request_key(REQUEST)
+
+def test_record_then_replay_in_order(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = CassetteClient(ScriptedClient(["first", "second"]), path=path, mode="record")
+    assert recorder.chat.completions.create(**REQUEST).choices[0].message.content == "first"
+    assert recorder.chat.completions.create(**REQUEST).choices[0].message.content == "second"
+
+    player = CassetteClient(None, path=path, mode="replay")
+    replies = [player.chat.completions.create(**REQUEST) for _ in range(3)]
+    assert [r.choices[0].message.content for r in replies] == ["first", "second", "first"]
+    assert replies[0].usage.total_tokens == 15
+    with pytest.raises(CassetteMissError):
+        player.chat.completions.create(**dict(REQUEST, temperature=0.1))
+
+def test_llm_functions_replay_offline(tmp_path):
+    import llm_integration
+    from llm_integration import analyze_judgment_with_llm
+    path = str(tmp_path / "cassette.jsonl")
+    analysis = json.dumps({"thought_process": "t", "analysis": "a", "highlighted_analysis": "h"})
+    with patch.object(llm_integration, "client", CassetteClient(ScriptedClient([analysis]), path=path, mode="record")):
+        recorded = analyze_judgment_with_llm("judgment", "scenario", "Arthur")
+    with patch.object(llm_integration, "client", CassetteClient(None, path=path, mode="replay")):
+        assert analyze_judgment_with_llm("judgment", "scenario", "Arthur") == recorded
+        assert "error" in analyze_judgment_with_llm("another judgment", "scenario", "Arthur")
+
+def test_streamed_calls_record_and_replay_as_chunks(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    def chunks(text):
+        for i in range(0, len(text), 2):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 2]))], usage=None)
+    inner = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **request: chunks('{"response": "Aye"}'))))
+    recorder = CassetteClient(inner, path=path, mode="record")
+    streamed = list(recorder.chat.completions.create(**REQUEST, stream=True))
+    assert "".join(c.choices[0].delta.content for c in streamed) == '{"response": "Aye"}'
+
+    player = CassetteClient(None, path=path, mode="replay")
+    replayed = player.chat.completions.create(**REQUEST, stream=True)
+    assert "".join(c.choices[0].delta.content for c in replayed) == '{"response": "Aye"}'
+    # A streamed recording does not answer the same request made without streaming
+    with pytest.raises(CassetteMissError):
+        player.chat.completions.create(**REQUEST)
+
+def test_record_mode_without_api_key_leaves_client_unset():
+    import os
+    import importlib
+    import llm_cassette
+    import llm_integration
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    try:
+        with patch.dict(os.environ, dict(env, LLM_CASSETTE_MODE="record"), clear=True), patch("dotenv.load_dotenv"):
+            importlib.reload(llm_cassette)
+            importlib.reload(llm_integration)
+            assert llm_integration.LLM_CASSETTE_MODE == "record"
+            assert llm_integration.client is None
+            assert "error" in llm_integration.get_witness_response_with_llm("A dispute.", "The Farmer", "Why?")
+    finally:
+        importlib.reload(llm_cassette)
+        importlib.reload(llm_integration)
@@ -1,13 +1,16 @@
 # tests/test_llm_integration.py
 import json
 import pytest
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 from llm_integration import generate_scenario_with_llm, analyze_judgment_with_llm
 from models import Scenario, Analysis, WitnessResponse
+from scenario_library import ScenarioLibrary
 
 @pytest.fixture
-def mock_openai_client():
-    with patch("llm_integration.client") as mock_client:
+def mock_openai_client(tmp_path):
+    with patch("llm_integration.client") as mock_client, \
+            patch("llm_integration.scenario_library", ScenarioLibrary(str(tmp_path / "library.jsonl"))):
         yield mock_client
 
 def test_generate_scenario_with_llm_success(mock_openai_client):
@@ -26,6 +29,22 @@ def test_generate_scenario_with_llm_success(mock_openai_client):
     assert result.scenario == "A dispute over a golden goose."
     assert "The Farmer" in result.characters
 
+def test_generate_scenario_can_stay_out_of_the_library(mock_openai_client):
+    import llm_integration
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = json.dumps({
+        "scenario": "A dispute over a golden goose.",
+        "highlighted_scenario": "A dispute over a **golden goose**.",
+        "characters": ["The Farmer", "The Merchant"]
+    })
+    mock_openai_client.chat.completions.create.return_value = mock_response
+
+    with patch("llm_integration.scenario_index.admit", return_value=True):
+        assert isinstance(generate_scenario_with_llm(None, "Simple", add_to_library=False), Scenario)
+        assert llm_integration.scenario_library.count() == 0
+        generate_scenario_with_llm(None, "Simple")
+        assert llm_integration.scenario_library.count() == 1
+
 def test_generate_scenario_with_llm_error(mock_openai_client):
     # Mock an API error
     mock_openai_client.chat.completions.create.side_effect = Exception("API error")
@@ -86,3 +105,42 @@ def test_handle_llm_response_success_model():
     result = handle_llm_response(scenario, mock_callback)
     assert result is True
     mock_callback.assert_called_with(scenario)
+
+def _chunks(text, size):
+    for i in range(0, len(text), size):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + size]))])
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_json_field_stream_decodes_across_pieces(size):
+    from llm_integration import JsonFieldStream
+    answer = 'Sire, "I" saw\nit \\ all é \U0001F600!'
+    raw = json.dumps({"note": 'a \"response\": "decoy', "response": answer, "after": "x"})
+    field = JsonFieldStream("response")
+    assert "".join(field.feed(raw[i:i + size]) for i in range(0, len(raw), size)) == answer
+    assert field.done
+
+def test_stream_witness_response_yields_pieces_then_result(mock_openai_client):
+    from llm_integration import stream_witness_response_with_llm, WitnessStream, llm_scheduler
+    answer = "I saw the merchant take the goose, Sire!"
+    mock_openai_client.chat.completions.create.return_value = _chunks(json.dumps({"response": answer}), 5)
+
+    stream = stream_witness_response_with_llm("A dispute over a golden goose.", "The Farmer", "What did you see?")
+    assert isinstance(stream, WitnessStream)
+    assert mock_openai_client.chat.completions.create.call_count == 0
+    pieces = list(stream)
+    assert len(pieces) > 1 and "".join(pieces) == answer
+    assert stream.result == WitnessResponse(response=answer)
+    assert mock_openai_client.chat.completions.create.call_args.kwargs["stream"] is True
+    assert all(row["in_flight"] == 0 for row in llm_scheduler.report().values())
+
+def test_stream_witness_response_reports_errors(mock_openai_client):
+    from llm_integration import stream_witness_response_with_llm
+    # The reply breaks off mid-answer
+    mock_openai_client.chat.completions.create.return_value = _chunks('{"response": "I saw the mer', 4)
+    stream = stream_witness_response_with_llm("A dispute.", "The Farmer", "What did you see?")
+    assert "".join(stream) == "I saw the mer"
+    assert "error" in stream.result
+
+    mock_openai_client.chat.completions.create.side_effect = Exception("API error")
+    stream = stream_witness_response_with_llm("A dispute.", "The Farmer", "What did you see?")
+    assert list(stream) == [] and "error" in stream.result
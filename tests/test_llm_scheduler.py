@@ -0,0 +1,76 @@
+import time
+import threading
+import pytest
+from unittest.mock import patch
+import llm_integration
+from llm_scheduler import (LLMScheduler, QueueTimeoutError, INTERACTIVE, ANALYSIS, BACKGROUND,
+                           bind_session, background_priority, current_session, priority_for)
+
+def _queue_up(scheduler, granted, priority, session):
+    """Starts a call that records its session when admitted and holds its slot until released."""
+    name = ("interactive", "analysis", "background")[priority]
+    waiting = scheduler.report()[name]["waiting"]
+    def call():
+        scheduler.acquire(priority, session)
+        granted.append(session)
+    thread = threading.Thread(target=call, daemon=True)
+    thread.start()
+    while scheduler.report()[name]["waiting"] == waiting:
+        time.sleep(0.001)
+    return thread
+
+def _release_one(scheduler, granted, priority):
+    admitted = len(granted)
+    scheduler.release(priority)
+    deadline = time.monotonic() + 2
+    while len(granted) == admitted and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+def test_priority_first_then_round_robin_across_sessions():
+    scheduler = LLMScheduler(max_concurrency=1, interactive_reserve=0, background_ceiling=1)
+    scheduler.acquire(INTERACTIVE, "holder")
+    granted = []
+    for priority, session in [(BACKGROUND, "prefetch"), (ANALYSIS, "carol"), (INTERACTIVE, "alice"),
+                              (INTERACTIVE, "alice"), (INTERACTIVE, "alice"), (INTERACTIVE, "bob")]:
+        _queue_up(scheduler, granted, priority, session)
+    assert scheduler.under_pressure()
+
+    order = [INTERACTIVE, INTERACTIVE, INTERACTIVE, INTERACTIVE, ANALYSIS, BACKGROUND]
+    for previous, current in zip([INTERACTIVE] + order, order):
+        _release_one(scheduler, granted, previous)
+    # Bob's one question is not stuck behind Alice's burst; background goes last
+    assert granted == ["alice", "bob", "alice", "alice", "carol", "prefetch"]
+
+def test_background_never_takes_reserved_slots():
+    scheduler = LLMScheduler(max_concurrency=4, interactive_reserve=1, background_ceiling=2)
+    scheduler.acquire(BACKGROUND, "refill")
+    scheduler.acquire(BACKGROUND, "refill")
+    with pytest.raises(QueueTimeoutError):
+        scheduler.acquire(BACKGROUND, "refill", timeout=0.01)
+    scheduler.acquire(ANALYSIS, "carol", timeout=0.01)
+    # The last slot is kept for a judge waiting on a witness
+    with pytest.raises(QueueTimeoutError):
+        scheduler.acquire(ANALYSIS, "dave", timeout=0.01)
+    scheduler.acquire(INTERACTIVE, "alice", timeout=0.01)
+    report = scheduler.report()
+    assert report["background"]["in_flight"] == 2 and report["interactive"]["waiting"] == 0
+
+def test_sessions_and_background_priority_follow_the_caller():
+    assert priority_for("witness") == INTERACTIVE and priority_for("analysis") == ANALYSIS
+    with background_priority(), bind_session("case-1"):
+        assert priority_for("witness") == BACKGROUND
+        assert current_session() == "case-1"
+    assert current_session() == threading.current_thread().name
+
+def test_refill_waits_while_judges_are_queued(monkeypatch):
+    scheduler = LLMScheduler(max_concurrency=1, interactive_reserve=0)
+    monkeypatch.setattr(llm_integration, "llm_scheduler", scheduler)
+    monkeypatch.setattr(llm_integration, "client", object())
+    scheduler.acquire(INTERACTIVE, "alice")
+    with patch.object(llm_integration.scenario_library, "unused_count", return_value=0), \
+            patch("llm_integration.threading.Thread") as thread:
+        assert llm_integration.refill_scenario_library("Simple") is False
+        scheduler.release(INTERACTIVE)
+        assert llm_integration.refill_scenario_library("Simple") is True
+    thread.assert_called_once()
+    llm_integration._refilling.discard("Simple")
@@ -0,0 +1,42 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import model_policy
+from model_policy import ModelPolicy, Tier
+
+@pytest.fixture
+def policy():
+    return ModelPolicy({"analysis": [Tier("flagship", "medium"), Tier("flagship", "low"), Tier("mini", "low")]})
+
+def test_simple_cases_start_one_tier_down(policy):
+    assert policy.choose("analysis", "Complex")[1:3] == ("flagship", "medium")
+    assert policy.choose("analysis", "Simple")[1:3] == ("flagship", "low")
+
+def test_overload_and_latency_step_down_tiers(policy, monkeypatch):
+    monkeypatch.setattr(model_policy, "LLM_OVERLOAD_INFLIGHT", 1)
+    with policy.track("analysis"):
+        decision = policy.choose("analysis", "Moderate")
+    assert decision.tier == 1 and "inflight=1" in decision.reason
+
+    monkeypatch.setitem(model_policy.LLM_P95_TARGETS, "analysis", -1.0)
+    with policy.track("analysis"):
+        # Both pressures on a Simple case bottom out at the cheapest tier
+        assert policy.choose("analysis", "Simple")[1:3] == ("mini", "low")
+
+def test_decisions_are_logged(policy, caplog):
+    with caplog.at_level("INFO", logger="model_policy"):
+        policy.choose("analysis", "Simple")
+    assert "task=analysis model=flagship effort=low" in caplog.text
+
+def test_analyze_judgment_uses_policy_effort():
+    from llm_integration import analyze_judgment_with_llm
+    with patch("llm_integration.client") as mock_client:
+        mock_response = MagicMock()
+        mock_response.choices[0].message.content = json.dumps({
+            "thought_process": "t", "analysis": "a", "highlighted_analysis": "h"
+        })
+        mock_client.chat.completions.create.return_value = mock_response
+        analyze_judgment_with_llm("judgment", "scenario", "Arthur", difficulty="Simple")
+        assert mock_client.chat.completions.create.call_args.kwargs["reasoning_effort"] == "low"
+        analyze_judgment_with_llm("judgment", "scenario", "Arthur", difficulty="Complex")
+        assert mock_client.chat.completions.create.call_args.kwargs["reasoning_effort"] == "medium"
@@ -0,0 +1,68 @@
+import os
+from file_utils import save_case
+# Registers the save hook under test
+import player_profiles  # noqa: F401
+
+def test_profile_key_is_sanitized():
+    from player_profiles import profile_key
+    assert profile_key("  Sir  Arthur ") == profile_key("sir arthur") == "sir_arthur"
+    assert profile_key("../../etc") == "etc"
+    assert profile_key("???") == "unknown"
+
+def test_save_case_updates_profile_aggregates(temp_case_dir, make_record):
+    from player_profiles import load_profile
+    save_case(make_record("a1", "Arthur", "Simple", "x" * 10, characters=["The Farmer"], date="2026-10-16 09:00:00"))
+    save_case(make_record("a2", "arthur", "Complex", "x" * 30, characters=["The Farmer"] * 3, date="2026-10-17 10:00:00"))
+    save_case(make_record("g1", "Guinevere", "Simple", "x" * 20))
+    # Re-saving a case does not count it twice
+    save_case(make_record("a2", "arthur", "Complex", "x" * 30, characters=["The Farmer"] * 3, date="2026-10-17 10:00:00"))
+
+    profile = load_profile("ARTHUR")
+    assert profile.cases == 2
+    assert profile.difficulties == {"Simple": 1, "Complex": 1}
+    assert profile.avg_questions == 2.0
+    assert profile.avg_judgment_length == 20.0
+    assert (profile.first_case, profile.last_case) == ("2026-10-16 09:00:00", "2026-10-17 10:00:00")
+    assert load_profile("Lancelot") is None
+
+def test_leaderboard_ranks_profiles_and_sees_new_saves(temp_case_dir, make_record):
+    from player_profiles import get_leaderboard
+    save_case(make_record("g1", "Guinevere", "Simple", "x"))
+    save_case(make_record("a1", "Arthur", "Simple", "x"))
+    save_case(make_record("a2", "Arthur", "Moderate", "x"))
+    assert [(p.name, p.cases) for p in get_leaderboard().top()] == [("Arthur", 2), ("Guinevere", 1)]
+
+    save_case(make_record("g2", "Guinevere", "Simple", "x"))
+    save_case(make_record("g3", "Guinevere", "Simple", "x"))
+    assert [p.name for p in get_leaderboard().top(1)] == ["Guinevere"]
+
+def test_profiles_are_rebuilt_for_existing_archives(temp_case_dir, make_record):
+    import shutil
+    from player_profiles import load_profile, PROFILES_DIR
+    save_case(make_record("a1", "Arthur", "Simple", "x"))
+    save_case(make_record("a2", "Arthur", "Simple", "x"))
+    shutil.rmtree(os.path.join(temp_case_dir, PROFILES_DIR))
+
+    save_case(make_record("a3", "Arthur", "Complex", "x"))
+    assert load_profile("Arthur").cases == 3
+
+def _record_cases(cases_dir, prefix, count):
+    import file_utils
+    import player_profiles
+    from models import CaseRecord
+    file_utils.PAST_CASES_DIR = cases_dir
+    for i in range(count):
+        player_profiles.record_case(CaseRecord(case_id=f"{prefix}{i}", player_name="Arthur", difficulty="Simple",
+                                               scenario="s", judgment="j", analysis="a"))
+
+def test_concurrent_processes_do_not_lose_profile_updates(temp_case_dir):
+    import multiprocessing
+    from player_profiles import load_profile, PROFILES_DIR
+    os.makedirs(os.path.join(str(temp_case_dir), PROFILES_DIR))
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_record_cases, args=(str(temp_case_dir), f"p{n}_", 25)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert load_profile("Arthur").cases == 100
@@ -0,0 +1,61 @@
+import os
+import json
+import time
+import pytest
+from rerun_profiler import RerunProfiler
+
+class FakeRerunException(BaseException):
+    pass
+
+def test_disabled_profiler_records_nothing():
+    profiler = RerunProfiler(mode="")
+    profiler.begin()
+    with profiler.phase("display_welcome"):
+        pass
+    profiler.end()
+    assert not profiler.history
+
+def test_phases_are_timed_and_interrupted_reruns_are_closed():
+    profiler = RerunProfiler(mode="timing")
+    profiler.begin()
+    with profiler.phase("inject_custom_css"):
+        pass
+    with profiler.phase("display_welcome"):
+        time.sleep(0.01)
+    profiler.end()
+
+    # st.rerun() raises out of a phase: the rerun ends there
+    profiler.begin()
+    with pytest.raises(FakeRerunException):
+        with profiler.phase("display_archives"):
+            raise FakeRerunException()
+    with profiler.phase("sidebar"):
+        pass
+    profiler.end()
+
+    first, second = profiler.history
+    assert [name for name, _ in first.phases] == ["inject_custom_css", "display_welcome"]
+    assert first.outcome == "completed"
+    assert [name for name, _ in second.phases] == ["display_archives"]
+    assert second.outcome == "FakeRerunException"
+    rows = {row["phase"]: row for row in profiler.summary()}
+    assert rows["display_welcome"]["mean_ms"] >= 10
+    assert rows["total"]["reruns"] == 2
+
+def test_only_slowest_captures_are_kept_and_dumped(tmp_path):
+    profiler = RerunProfiler(mode="cprofile", keep=2)
+    for delay in (0.0, 0.03, 0.0, 0.02):
+        profiler.begin()
+        with profiler.phase("display_welcome"):
+            time.sleep(delay)
+        profiler.end()
+    slowest = profiler.slowest()
+    assert len(slowest) == 2 and all(r.total >= 0.02 for r in slowest)
+    assert slowest[0].total >= slowest[1].total
+    assert "sleep" in slowest[0].profile_text()
+    assert sum(r.capture is not None for r in profiler.history) == 2
+
+    path = profiler.dump(str(tmp_path))
+    with open(os.path.join(path, "summary.json"), encoding="utf-8") as f:
+        assert len(json.load(f)["reruns"]) == 4
+    assert len([name for name in os.listdir(path) if name.endswith(".prof")]) == 2
@@ -0,0 +1,100 @@
+import threading
+from unittest.mock import MagicMock, patch
+from models import Scenario
+from scenario_library import ScenarioLibrary
+from scenario_similarity import ScenarioIndex
+
+def make_scenario(text):
+    return Scenario(scenario=text, highlighted_scenario=f"**{text}**", characters=["The Farmer", "The Merchant"])
+
+def test_take_serves_least_used_and_never_repeats_for_a_player(tmp_path):
+    path = str(tmp_path / "library.jsonl")
+    library = ScenarioLibrary(path)
+    goose, mill = make_scenario("A goose."), make_scenario("A mill.")
+    library.add("Simple", goose, served_to="Arthur")
+    library.add("Simple", mill)
+    assert library.unused_count("Simple") == 1
+
+    assert library.take("Simple", "Guinevere") == mill
+    assert library.take("Simple", "guinevere ") == goose
+    assert library.take("Simple", "Guinevere") is None
+    assert library.take("Simple", "Arthur") == mill
+    assert library.take("Complex", "Lancelot") is None
+
+    # Usage survives a restart
+    reloaded = ScenarioLibrary(path)
+    assert reloaded.count() == 2
+    assert (reloaded.uses(goose), reloaded.uses(mill)) == (2, 2)
+    assert reloaded.take("Simple", "Arthur") is None
+
+def test_libraries_in_other_processes_see_each_others_uses(tmp_path):
+    path = str(tmp_path / "library.jsonl")
+    app, api = ScenarioLibrary(path), ScenarioLibrary(path)
+    goose, mill = make_scenario("A goose."), make_scenario("A mill.")
+    app.add("Simple", goose)
+    assert api.count() == 1
+    api.add("Simple", mill)
+    assert app.take("Simple", "Arthur") in (goose, mill)
+    assert api.take("Simple", "Arthur") in (goose, mill)
+    # Each library saw the other's use: Arthur has now had both, once each
+    assert app.take("Simple", "Arthur") is None and api.take("Simple", "Arthur") is None
+    assert app.uses(goose) == app.uses(mill) == 1
+
+def _take_all(path, player_count, results):
+    library = ScenarioLibrary(path)
+    for n in range(player_count):
+        scenario = library.take("Simple", f"Judge {n}")
+        results.put((n, scenario.scenario if scenario else None))
+
+def test_concurrent_processes_never_serve_a_player_twice(tmp_path):
+    import multiprocessing
+    path = str(tmp_path / "library.jsonl")
+    library = ScenarioLibrary(path)
+    for i in range(3):
+        library.add("Simple", make_scenario(f"Scenario number {i}."))
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_take_all, args=(path, 5, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    served = [results.get(timeout=10) for _ in range(20)]
+    for worker in workers:
+        worker.join()
+    for n in range(5):
+        given = [text for player, text in served if player == n and text is not None]
+        # Three scenarios for four processes asking on the same player's behalf: three served, all different
+        assert sorted(given) == [f"Scenario number {i}." for i in range(3)]
+
+def test_start_case_scenario_serves_stored_content_and_refills(tmp_path):
+    import llm_integration
+    from llm_integration import start_case_scenario
+    library = ScenarioLibrary(str(tmp_path / "library.jsonl"))
+    stored = make_scenario("A dispute over a golden goose found on the village green.")
+    library.add("Simple", stored)
+    generated = make_scenario("Two brothers quarrel over their late father's watermill and its customers.")
+    response = MagicMock()
+    response.choices[0].message.content = generated.model_dump_json()
+
+    refills = []
+    real_thread = threading.Thread
+
+    def tracked_thread(*args, **kwargs):
+        thread = real_thread(*args, **kwargs)
+        refills.append(thread)
+        return thread
+
+    with patch("llm_integration.client") as mock_client, \
+            patch.object(llm_integration, "scenario_library", library), \
+            patch.object(llm_integration, "scenario_index", ScenarioIndex(threshold=0.5)), \
+            patch.object(llm_integration, "SCENARIO_LIBRARY_MIN_UNUSED", 1), \
+            patch("llm_integration.threading.Thread", side_effect=tracked_thread):
+        mock_client.chat.completions.create.return_value = response
+        assert start_case_scenario("Arthur", "Simple") == stored
+        for thread in refills:
+            thread.join(timeout=5)
+        assert len(refills) == 1
+        assert library.unused_count("Simple") == 1
+        # Arthur has seen the stored case, so the refilled one comes next
+        assert start_case_scenario("Arthur", "Simple") == generated
+        for thread in refills:
+            thread.join(timeout=5)
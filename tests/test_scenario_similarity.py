@@ -0,0 +1,50 @@
+import json
+from unittest.mock import MagicMock, patch
+from scenario_similarity import ScenarioIndex, SimilarityIndex, minhash_signature, estimated_similarity
+
+GOOSE = ("Farmer Alden and the merchant Brisa both claim a golden goose found wandering the village green. "
+         "Alden says the goose hatched in his barn last spring, while Brisa says she bought it at the autumn fair. "
+         "Neither has a receipt, and the goose lays one golden egg every week.")
+GOOSE_REWORDED = GOOSE.replace("autumn fair", "harvest fair").replace("Farmer Alden", "Old farmer Alden")
+MILL = ("Two brothers inherited their late father's watermill but cannot agree on who should run it. "
+        "The elder wants to sell flour to the capital, the younger wants to keep grinding for the village at a fair price.")
+
+def test_signature_similarity_tracks_text_overlap():
+    assert estimated_similarity(minhash_signature(GOOSE), minhash_signature(GOOSE_REWORDED)) > 0.5
+    assert estimated_similarity(minhash_signature(GOOSE), minhash_signature(MILL)) < 0.2
+
+def test_scenario_index_rejects_near_duplicates_per_difficulty():
+    index = ScenarioIndex(threshold=0.5)
+    assert index.admit("Simple", GOOSE) is True
+    assert index.admit("Simple", GOOSE_REWORDED) is False
+    assert index.admit("Simple", MILL) is True
+    # Other difficulties keep their own history
+    assert index.admit("Complex", GOOSE_REWORDED) is True
+    assert index.admit("Simple", GOOSE_REWORDED, force=True) is True
+
+def test_similarity_index_evicts_oldest_entries():
+    index = SimilarityIndex(capacity=1)
+    index.add(GOOSE)
+    index.add(MILL)
+    assert len(index) == 1
+    assert index.most_similar(GOOSE)[0] < 0.5
+
+def test_generate_scenario_regenerates_near_duplicates(tmp_path):
+    import llm_integration
+    from scenario_library import ScenarioLibrary
+    from llm_integration import generate_scenario_with_llm
+
+    def make_response(text):
+        response = MagicMock()
+        response.choices[0].message.content = json.dumps({
+            "scenario": text, "highlighted_scenario": text, "characters": ["The Farmer", "The Merchant"]
+        })
+        return response
+
+    with patch("llm_integration.client") as mock_client, \
+            patch.object(llm_integration, "scenario_index", ScenarioIndex(threshold=0.5)), \
+            patch.object(llm_integration, "scenario_library", ScenarioLibrary(str(tmp_path / "library.jsonl"))):
+        mock_client.chat.completions.create.side_effect = [make_response(GOOSE), make_response(GOOSE_REWORDED), make_response(MILL)]
+        assert generate_scenario_with_llm("Arthur", "Simple").scenario == GOOSE
+        assert generate_scenario_with_llm("Arthur", "Simple").scenario == MILL
+        assert mock_client.chat.completions.create.call_count == 3
@@ -0,0 +1,79 @@
+import os
+import pytest
+import session_budget
+from session_budget import SessionRegistry, enforce_caps, state_report
+from models import InquiryEntry
+
+@pytest.fixture
+def temp_drafts_dir(tmp_path, monkeypatch):
+    """Fixture to keep evicted session drafts in a temporary directory."""
+    monkeypatch.setattr(session_budget, "SESSION_DRAFTS_DIR", str(tmp_path / "drafts"))
+    return tmp_path / "drafts"
+
+def make_state():
+    return {
+        "game_stage": "scenario_presented",
+        "current_scenario": "A dispute over a **golden goose**.",
+        "characters": ["The Farmer"],
+        "inquiry_history": [InquiryEntry(character="The Farmer", question="Why?", response="Because.")],
+        "ai_analysis": None,
+        "player_judgment": "",
+    }
+
+def test_enforce_caps_trims_history_and_text(monkeypatch):
+    monkeypatch.setattr(session_budget, "SESSION_MAX_INQUIRY_HISTORY", 2)
+    monkeypatch.setattr(session_budget, "SESSION_MAX_TEXT_CHARS", 10)
+    state = make_state()
+    state["inquiry_history"] = [InquiryEntry(character="C", question=str(i), response="R") for i in range(5)]
+    assert enforce_caps(state) is True
+    assert [entry.question for entry in state["inquiry_history"]] == ["3", "4"]
+    assert state["current_scenario"] == "A dispute" + "…"
+    assert enforce_caps(state) is False
+
+def test_state_report_sizes_every_key():
+    sizes, total = state_report(make_state())
+    assert dict(sizes).keys() == make_state().keys()
+    assert total == sum(size for _, size in sizes)
+
+def test_idle_session_is_evicted_and_rehydrated(temp_drafts_dir):
+    registry = SessionRegistry(idle_seconds=60)
+    state = make_state()
+    registry.touch("session-1", state)
+    # The sweep only marks the session; its own heartbeat then evicts it
+    registry.sweep(now=1e12)
+    assert state["current_scenario"] == "A dispute over a **golden goose**."
+    registry.touch("session-1", state, activity=False)
+    assert state["current_scenario"] is None and state["inquiry_history"] == []
+    assert os.path.exists(temp_drafts_dir / "session-1.json")
+
+    registry.touch("session-1", state)
+    assert state["current_scenario"] == "A dispute over a **golden goose**."
+    assert state["inquiry_history"][0] == InquiryEntry(character="The Farmer", question="Why?", response="Because.")
+    assert not os.path.exists(temp_drafts_dir / "session-1.json")
+
+def test_marked_session_that_reruns_is_not_evicted(temp_drafts_dir):
+    registry = SessionRegistry(idle_seconds=60)
+    state = make_state()
+    registry.touch("session-1", state)
+    registry.sweep(now=1e12)
+    registry.touch("session-1", state)
+    registry.touch("session-1", state, activity=False)
+    assert state["current_scenario"] == "A dispute over a **golden goose**."
+
+def test_failed_restore_is_not_retried(temp_drafts_dir):
+    registry = SessionRegistry(idle_seconds=60)
+    state = make_state()
+    registry.touch("session-1", state)
+    registry.sweep(now=1e12)
+    registry.touch("session-1", state, activity=False)
+    with open(temp_drafts_dir / "session-1.json", "w") as f:
+        f.write("{not json")
+    assert registry.touch("session-1", state) is False
+    assert state["case_evicted"] is False
+    assert registry.touch("session-1", state) is True
+
+def test_closed_sessions_are_forgotten(temp_drafts_dir):
+    registry = SessionRegistry(idle_seconds=60)
+    registry.touch("gone", make_state())
+    registry.sweep(is_active=lambda session_id: False)
+    assert registry.report() == []
@@ -0,0 +1,38 @@
+import json
+import logging
+from unittest.mock import MagicMock, patch
+from token_budget import build_prompt, count_tokens, strip_markup, truncate_tokens
+
+def test_strip_markup_removes_bold_tags_and_entities():
+    assert strip_markup("The **golden  goose** of <b>Alden</b> &amp; Brisa&#x27;s claim") == "The golden goose of Alden & Brisa's claim"
+
+def test_truncate_tokens_keeps_start_or_end():
+    text = " ".join(f"word{i}" for i in range(200))
+    head = truncate_tokens(text, 20)
+    tail = truncate_tokens(text, 20, keep="end")
+    assert count_tokens(head) <= 20 and head.startswith("word0") and head.endswith("[…]")
+    assert count_tokens(tail) <= 20 and tail.endswith("word199")
+    assert truncate_tokens("short", 20) == "short"
+
+def test_build_prompt_trims_fields_in_order_within_budget(caplog):
+    template = "History: {history}\nScenario: {scenario}\nQuestion: {question}"
+    history = " ".join(f"old{i}" for i in range(300)) + " latest exchange"
+    scenario = "A dispute over a **golden goose**. " * 5
+    with caplog.at_level(logging.INFO, logger="token_budget"):
+        prompt, tokens = build_prompt("witness", template, fixed={"question": "Who?"},
+                                      trimmable=[("history", history, "end"), ("scenario", scenario, "start")], budget=120)
+    assert tokens <= 120
+    assert "latest exchange" in prompt
+    # The scenario survives intact because trimming the history was enough
+    assert "A dispute over a golden goose. " * 4 in prompt
+    assert "task=witness" in caplog.text and "truncated=True" in caplog.text
+
+def test_witness_prompt_is_sent_without_markup():
+    from llm_integration import get_witness_response_with_llm
+    with patch("llm_integration.client") as mock_client:
+        mock_response = MagicMock()
+        mock_response.choices[0].message.content = json.dumps({"response": "I saw nothing, Sire!"})
+        mock_client.chat.completions.create.return_value = mock_response
+        get_witness_response_with_llm("A dispute over a **golden goose**.", "The Farmer", "What did you see?")
+        prompt = mock_client.chat.completions.create.call_args.kwargs["messages"][-1]["content"]
+    assert "golden goose" in prompt and "**" not in prompt.split("Guidelines")[0]
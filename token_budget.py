@@ -0,0 +1,125 @@
+# token_budget.py
+"""
+Measures and trims LLM prompts before they are sent.
+
+Token counts come from tiktoken when it is installed, otherwise from a bundled
+approximation that counts short word pieces and punctuation the way BPE tokenizers
+tend to split English prose. Every prompt is logged with its measured size.
+"""
+import os
+import re
+import html
+import logging
+import threading
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+# Input budgets in tokens for each prompt, after presentation markup is stripped
+PROMPT_TOKEN_BUDGETS = {
+    "scenario": int(os.getenv("PROMPT_BUDGET_SCENARIO", "800")),
+    "witness": int(os.getenv("PROMPT_BUDGET_WITNESS", "1200")),
+    "analysis": int(os.getenv("PROMPT_BUDGET_ANALYSIS", "1500")),
+}
+ELLIPSIS = " […]"
+
+_MARKUP = re.compile(r"\*\*|__|`|<[^>\n]+>")
+_SPACES = re.compile(r"[ \t]+")
+_WORD_PIECES = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]")
+
+def _load_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        # The encoding file is downloaded on first use; offline hosts fall back to the approximation.
+        print(f"tiktoken encoding {TOKENIZER_ENCODING} unavailable, using approximate counts: {e}")
+        return None
+
+_encoding = _load_encoding()
+
+def count_tokens(text):
+    """Tokens in text, exact with tiktoken and approximate otherwise."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(_WORD_PIECES.findall(text))
+
+def strip_markup(text):
+    """Removes Markdown emphasis, HTML tags and entities, and runs of spaces."""
+    text = html.unescape(_MARKUP.sub("", text))
+    return _SPACES.sub(" ", text).strip()
+
+def truncate_tokens(text, max_tokens, keep="start"):
+    """Cuts text to at most max_tokens, keeping its start or its end and marking the cut."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= count_tokens(ELLIPSIS):
+        return ""
+    limit = max_tokens - count_tokens(ELLIPSIS)
+    if _encoding is not None:
+        tokens = _encoding.encode(text)
+        kept = tokens[:limit] if keep == "start" else tokens[-limit:]
+        body = _encoding.decode(kept)
+    else:
+        pieces = list(_WORD_PIECES.finditer(text))
+        if keep == "start":
+            body = text[:pieces[limit - 1].end()] if limit else ""
+        else:
+            body = text[pieces[-limit].start():] if limit else ""
+    return body + ELLIPSIS if keep == "start" else ELLIPSIS.lstrip() + " " + body
+
+class PromptStats:
+    """Running totals of measured prompt tokens per task."""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def add(self, task, tokens, truncated):
+        with self._lock:
+            calls, total, peak, trimmed = self._totals.get(task, (0, 0, 0, 0))
+            self._totals[task] = (calls + 1, total + tokens, max(peak, tokens), trimmed + int(truncated))
+
+    def report(self):
+        """{task: {"calls", "mean_tokens", "max_tokens", "truncated"}}"""
+        with self._lock:
+            return {
+                task: {"calls": calls, "mean_tokens": total / calls, "max_tokens": peak, "truncated": trimmed}
+                for task, (calls, total, peak, trimmed) in self._totals.items()
+            }
+
+prompt_stats = PromptStats()
+
+def build_prompt(task, template, fixed=None, trimmable=(), budget=None):
+    """
+    Formats a prompt template within the task's token budget.
+
+    `fixed` fields are inserted as given (markup stripped). `trimmable` is a sequence of
+    (name, text, keep) fields, trimmed in the order listed while the prompt is over budget;
+    keep="end" preserves the most recent part of a field (e.g. conversation history).
+    Returns (prompt, tokens).
+    """
+    budget = PROMPT_TOKEN_BUDGETS.get(task) if budget is None else budget
+    fields = {name: strip_markup(value) for name, value in (fixed or {}).items()}
+    fields.update({name: strip_markup(text) for name, text, _ in trimmable})
+    prompt = template.format(**fields)
+    tokens = count_tokens(prompt)
+    truncated = False
+    for name, _, keep in trimmable:
+        if budget is None or tokens <= budget:
+            break
+        fields[name] = truncate_tokens(fields[name], max(0, count_tokens(fields[name]) - (tokens - budget)), keep)
+        prompt = template.format(**fields)
+        tokens = count_tokens(prompt)
+        truncated = True
+    prompt_stats.add(task, tokens, truncated)
+    logger.info("prompt_tokens task=%s tokens=%d budget=%s truncated=%s", task, tokens, budget, truncated)
+    if budget is not None and tokens > budget:
+        logger.warning("prompt_over_budget task=%s tokens=%d budget=%d", task, tokens, budget)
+    return prompt, tokens
@@ -1,11 +1,75 @@
 # ui/analysis.py
 import streamlit as st
-import time
 import os
-from llm_integration import analyze_judgment_with_llm
-from file_utils import save_case
-from ui.welcome import handle_llm_response
-from models import Analysis, CaseRecord
+from case_writer import get_case_writer, SAVED, FAILED
+from job_queue import get_job_queue, QUEUED, RUNNING, DONE
+from file_utils import case_exists, case_filename
+from ui.styles import fragment
+from ui.welcome import handle_llm_response, return_to_welcome
+from models import Analysis, CaseRecord, InquiryEntry
+
+ANALYSIS_POLL_SECONDS = 1
+
+def analysis_job_payload():
+    """Everything the analysis job needs, and enough to restore the case if the session is lost."""
+    return {
+        "player_judgment": st.session_state.player_judgment,
+        "scenario_details": st.session_state.current_scenario,
+        "player_name": st.session_state.player_name,
+        "difficulty": st.session_state.difficulty,
+        "classroom_code": st.session_state.classroom_code,
+        "inquiry_history": [entry.model_dump() if isinstance(entry, InquiryEntry) else entry
+                            for entry in st.session_state.inquiry_history],
+    }
+
+def resume_case_from_url():
+    """
+    Reopens the case named by the ?case= URL parameter in a fresh session, after a reload
+    or a server restart, so its queued or finished analysis is shown instead of redone.
+    A case whose analysis has finished and which is already archived is not reopened.
+    """
+    case_id = st.query_params.get("case")
+    if not case_id or st.session_state.current_case_id is not None:
+        return
+    job = get_job_queue().get(case_id, "analysis")
+    if job is None or (job.status not in (QUEUED, RUNNING) and case_exists(case_filename(case_id))):
+        st.query_params.pop("case", None)
+        return
+    payload = job.payload
+    st.session_state.current_case_id = case_id
+    st.session_state.player_name = payload["player_name"]
+    st.session_state.judge_name = f"Judge {payload['player_name']}"
+    st.session_state.difficulty = payload["difficulty"]
+    st.session_state.classroom_code = payload.get("classroom_code")
+    st.session_state.current_scenario = payload["scenario_details"]
+    st.session_state.player_judgment = payload["player_judgment"]
+    st.session_state.inquiry_history = [InquiryEntry(**entry) for entry in payload.get("inquiry_history", [])]
+    st.session_state.ai_analysis = None
+    st.session_state.game_stage = "judgment_submitted"
+
+@fragment(run_every=ANALYSIS_POLL_SECONDS)
+def await_analysis(case_id):
+    """Polls the analysis job; reruns the whole page once it has finished."""
+    job = get_job_queue().get(case_id, "analysis")
+    if job is not None and job.status not in (QUEUED, RUNNING):
+        st.rerun()
+    st.info(f"⏳ The Royal Advisor is diligently reviewing your judgment, {st.session_state.judge_name}... This may take a moment.")
+
+@fragment(run_every=ANALYSIS_POLL_SECONDS)
+def show_archive_status(case_id):
+    """Whether the background writer has saved the case yet; refreshes itself while it is pending."""
+    status = get_case_writer().status(case_id)
+    if status == SAVED:
+        st.success(f"This case (ID: {case_id}) has been chronicled in the royal archives.")
+    elif status == FAILED:
+        st.error("There was an issue archiving this case.")
+    else:
+        st.info(f"✍️ The royal scribes are chronicling this case (ID: {case_id})...")
+
+def retry_analysis():
+    get_job_queue().retry(st.session_state.current_case_id, "analysis")
+    st.session_state.ai_analysis = None
+    st.rerun()
 
 def display_ai_analysis():
     placeholder = st.empty()
@@ -13,13 +77,16 @@ def display_ai_analysis():
         st.balloons()
         st.markdown('<div class="royal-banner" role="heading" aria-level="1">The Royal Advisor\'s Counsel for {}</div>'.format(st.session_state.judge_name), unsafe_allow_html=True)
         if st.session_state.ai_analysis is None:
-            with st.spinner(f"The Royal Advisor is diligently reviewing your judgment, {st.session_state.judge_name}... This may take a moment."):
-                analysis_data = analyze_judgment_with_llm(
-                    st.session_state.player_judgment,
-                    st.session_state.current_scenario,
-                    st.session_state.player_name
-                )
-            
+            # The analysis runs as a durable job keyed by the case: reruns, reloads and restarts
+            # find the same job (and its result) rather than calling the Advisor again.
+            case_id = st.session_state.current_case_id
+            job = get_job_queue().submit(case_id, "analysis", analysis_job_payload())
+            if job.status in (QUEUED, RUNNING):
+                st.query_params["case"] = case_id
+                await_analysis(case_id)
+                return
+            analysis_data = Analysis(**job.result) if job.status == DONE else {"error": job.error}
+
             def set_analysis(data):
                 if isinstance(data, Analysis):
                     st.session_state.ai_analysis = data.highlighted_analysis
@@ -28,8 +95,7 @@ def display_ai_analysis():
             
             if not handle_llm_response(analysis_data, set_analysis, "Failed to get Advisor's analysis: "):
                 if st.button("Try Analysis Again", key="try_analysis_btn"):
-                    st.session_state.ai_analysis = None
-                    st.rerun()
+                    retry_analysis()
                 return
         if st.session_state.ai_analysis:
             st.markdown('<section class="royal-card" role="region" aria-label="Advisor Analysis"><span class="royal-label">🧐 Advisor\'s Analysis:</span><br>', unsafe_allow_html=True)
@@ -38,37 +104,34 @@ def display_ai_analysis():
             st.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
             if st.session_state.current_case_id and st.session_state.current_scenario and st.session_state.player_judgment and st.session_state.ai_analysis:
                 if not st.session_state.ai_analysis.startswith("Error:"):
-                    try:
-                        case_record = CaseRecord(
-                            case_id=st.session_state.current_case_id,
-                            player_name=st.session_state.player_name,
-                            difficulty=st.session_state.difficulty,
-                            scenario=st.session_state.current_scenario,
-                            inquiry_history=st.session_state.inquiry_history,
-                            judgment=st.session_state.player_judgment,
-                            analysis=st.session_state.ai_analysis
-                        )
-                        if save_case(case_record):
-                            st.success(f"This case (ID: {st.session_state.current_case_id}) has been chronicled in the royal archives.")
-                        else:
-                            st.error("There was an issue archiving this case.")
-                    except Exception as e:
-                        print(f"Error creating CaseRecord or saving: {e}")
-                        st.error("There was a secure file handling error while archiving this case.")
+                    # Saving happens on the background writer; reruns only check its status.
+                    writer = get_case_writer()
+                    status = writer.status(st.session_state.current_case_id)
+                    if status is None:
+                        try:
+                            case_record = CaseRecord(
+                                case_id=st.session_state.current_case_id,
+                                player_name=st.session_state.player_name,
+                                difficulty=st.session_state.difficulty,
+                                scenario=st.session_state.current_scenario,
+                                inquiry_history=st.session_state.inquiry_history,
+                                judgment=st.session_state.player_judgment,
+                                analysis=st.session_state.ai_analysis
+                            )
+                            writer.submit(case_record)
+                        except Exception as e:
+                            print(f"Error creating CaseRecord: {e}")
+                            status = FAILED
+                    if status == FAILED:
+                        st.error("There was an issue archiving this case.")
+                    else:
+                        show_archive_status(st.session_state.current_case_id)
                 else:
                     st.info("Case not saved as the AI analysis encountered an error.")
             if st.button("📜 Hear Another Case", key="hear_another_case_btn", help="Start a new case", use_container_width=True, type="primary"):
-                st.session_state.game_stage = "welcome"
-                st.session_state.player_name = ""
-                st.session_state.current_scenario = None
-                st.session_state.player_judgment = ""
-                st.session_state.ai_analysis = None
-                st.session_state.current_case_id = None
-                placeholder.empty()
-                time.sleep(0.5)
+                return_to_welcome()
                 st.rerun()
         else:
             st.error("The Advisor seems to be indisposed. Unable to retrieve analysis at this time.")
             if st.button("Try Analysis Again", key="try_analysis_btn2"):
-                st.session_state.ai_analysis = None
-                st.rerun()
+                retry_analysis()
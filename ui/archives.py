@@ -1,85 +1,95 @@
 # ui/archives.py
 import streamlit as st
-from file_utils import list_past_cases, load_case
-from models import CaseRecord
+import html
+from file_utils import load_case, case_id_time
+from archive_watcher import get_archive_index
+from ui.styles import fragment
+
+RENDER_CACHE_SIZE = 256
+
+def _card(label, body, style=""):
+    # Blank lines around the body let Streamlit render its Markdown inside the HTML card.
+    return f'<section class="royal-card"{style}><span class="royal-label">{label}</span>\n\n{body}\n\n</section>'
+
+def build_case_markdown(case_data):
+    """
+    Renders a whole archived case as a single Markdown/HTML block.
+    Every stored field is HTML-escaped so only the card markup itself is live HTML.
+    """
+    e = html.escape
+    parts = [
+        f'<section class="royal-card"><b>Case ID:</b> {e(case_data.case_id)}<br><b>Date:</b> {e(case_data.date)}<br>'
+        f'<b>Judge:</b> {e(case_data.player_name)}<br><b>Difficulty:</b> {e(case_data.difficulty)}</section>',
+        _card("📜 The Case:", e(case_data.scenario)),
+    ]
+    if case_data.inquiry_history:
+        transcript = "\n\n---\n\n".join(
+            f"**To {e(entry.character)}:** {e(entry.question)}\n\n**Response:** {e(entry.response)}"
+            for entry in case_data.inquiry_history
+        )
+        parts.append(_card("🕵️ Investigation:", transcript))
+    parts.append(_card("⚖️ Judgment:", e(case_data.judgment)))
+    parts.append(_card("🧐 Advisor's Analysis:", e(case_data.analysis), ' style="background:#fefce8;"'))
+    return "\n\n".join(parts)
+
+def case_label(case_file):
+    """A readable label for a case file: its creation time, or the legacy timestamp in its name."""
+    case_id = case_file.rsplit("/", 1)[-1].replace("case_", "").replace(".json", "").replace(".txt", "")
+    created = case_id_time(case_id)
+    if created is not None:
+        return created.astimezone().strftime("%Y-%m-%d %H:%M:%S") + f" ({case_id[-4:]})"
+    # e.g. from case_20240325_... to 20240325 ...
+    return case_id.replace("_", " ")
+
+@st.cache_data(max_entries=RENDER_CACHE_SIZE, show_spinner=False)
+def render_case(case_file, mtime):
+    """Cached render of a case file; mtime is part of the key so edited files are re-rendered."""
+    case_data = load_case(case_file)
+    return build_case_markdown(case_data) if case_data else None
+
+@fragment
+def display_archive_browser():
+    """
+    The case list and the selected case. Runs as a fragment: picking a case reruns only
+    this part of the page.
+    """
+    archive_index = get_archive_index()
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.markdown('<span class="royal-label">Select a Case:</span>', unsafe_allow_html=True)
+        for case_file in archive_index.cases():
+            label = case_label(case_file)
+            if st.button(f"📜 {label}", key=f"select_{case_file}"):
+                st.session_state.selected_archive_case = case_file
+
+        st.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
+        if st.button("🔙 Back to Kingdom", key="back_to_kingdom_btn", use_container_width=True):
+            st.session_state.game_stage = "welcome"
+            st.session_state.selected_archive_case = None
+            st.rerun()
+
+    with col2:
+        if st.session_state.selected_archive_case:
+            case_file = st.session_state.selected_archive_case
+            rendered = render_case(case_file, archive_index.mtime(case_file))
+            if rendered:
+                st.markdown(rendered, unsafe_allow_html=True)
+            else:
+                st.error("Failed to load case data.")
+        else:
+            st.info("Select a scroll from the left to read its chronicles.")
 
 def display_archives():
     placeholder = st.empty()
     with placeholder.container():
         st.markdown('<div class="royal-banner" role="heading" aria-level="1">The Royal Archives</div>', unsafe_allow_html=True)
-        
-        past_cases = list_past_cases()
-        if not past_cases:
+
+        if not get_archive_index().count:
             st.info("The royal archives are currently empty. Resolve some cases to see them here!")
             if st.button("Back to Kingdom", key="back_to_kingdom_empty_btn"):
                 st.session_state.game_stage = "welcome"
                 st.rerun()
             return
 
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.markdown('<span class="royal-label">Select a Case:</span>', unsafe_allow_html=True)
-            for case_file in past_cases:
-                # Format label for better readability (e.g., from case_20240325_... to 2024-03-25 ...)
-                label = case_file.replace("case_", "").replace(".json", "").replace(".txt", "").replace("_", " ")
-                if st.button(f"📜 {label}", key=f"select_{case_file}"):
-                    st.session_state.selected_archive_case = case_file
-            
-            st.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
-            if st.button("🔙 Back to Kingdom", key="back_to_kingdom_btn", use_container_width=True):
-                st.session_state.game_stage = "welcome"
-                st.session_state.selected_archive_case = None
-                st.rerun()
-
-        with col2:
-            if st.session_state.selected_archive_case:
-                case_data = load_case(st.session_state.selected_archive_case)
-                if case_data:
-                    # case_data is now a CaseRecord object or a dict (if legacy TXT fallback worked)
-                    if isinstance(case_data, CaseRecord):
-                        st.markdown(f'<section class="royal-card"><b>Case ID:</b> {case_data.case_id}<br><b>Date:</b> {case_data.date}<br><b>Judge:</b> {case_data.player_name}<br><b>Difficulty:</b> {case_data.difficulty}</section>', unsafe_allow_html=True)
-                        
-                        st.markdown('<section class="royal-card"><span class="royal-label">📜 The Case:</span><br>', unsafe_allow_html=True)
-                        st.markdown(case_data.scenario)
-                        st.markdown('</section>', unsafe_allow_html=True)
-                        
-                        if case_data.inquiry_history:
-                            st.markdown('<section class="royal-card"><span class="royal-label">🕵️ Investigation:</span><br>', unsafe_allow_html=True)
-                            for entry in case_data.inquiry_history:
-                                st.markdown(f"**To {entry.character}:** {entry.question}")
-                                st.markdown(f"**Response:** {entry.response}")
-                                st.markdown("---")
-                            st.markdown('</section>', unsafe_allow_html=True)
-                        
-                        st.markdown('<section class="royal-card"><span class="royal-label">⚖️ Judgment:</span><br>', unsafe_allow_html=True)
-                        st.markdown(case_data.judgment)
-                        st.markdown('</section>', unsafe_allow_html=True)
-                        
-                        st.markdown('<section class="royal-card" style="background:#fefce8;"><span class="royal-label">🧐 Advisor\'s Analysis:</span><br>', unsafe_allow_html=True)
-                        st.markdown(case_data.analysis)
-                        st.markdown('</section>', unsafe_allow_html=True)
-                    else:
-                        # Legacy dict fallback
-                        st.markdown(f'<section class="royal-card"><b>Case ID:</b> {case_data.get("case_id")}<br><b>Date:</b> {case_data.get("date")}<br><b>Judge:</b> {case_data.get("player_name")}</section>', unsafe_allow_html=True)
-                        
-                        st.markdown('<section class="royal-card"><span class="royal-label">📜 The Case:</span><br>', unsafe_allow_html=True)
-                        st.markdown(case_data.get("scenario"))
-                        st.markdown('</section>', unsafe_allow_html=True)
-                        
-                        if case_data.get("inquiry"):
-                            st.markdown('<section class="royal-card"><span class="royal-label">🕵️ Investigation:</span><br>', unsafe_allow_html=True)
-                            st.markdown(case_data.get("inquiry"))
-                            st.markdown('</section>', unsafe_allow_html=True)
-                        
-                        st.markdown('<section class="royal-card"><span class="royal-label">⚖️ Judgment:</span><br>', unsafe_allow_html=True)
-                        st.markdown(case_data.get("judgment"))
-                        st.markdown('</section>', unsafe_allow_html=True)
-                        
-                        st.markdown('<section class="royal-card" style="background:#fefce8;"><span class="royal-label">🧐 Advisor\'s Analysis:</span><br>', unsafe_allow_html=True)
-                        st.markdown(case_data.get("analysis"))
-                        st.markdown('</section>', unsafe_allow_html=True)
-                else:
-                    st.error("Failed to load case data.")
-            else:
-                st.info("Select a scroll from the left to read its chronicles.")
+        display_archive_browser()
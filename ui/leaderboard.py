@@ -0,0 +1,29 @@
+# ui/leaderboard.py
+import streamlit as st
+import pandas as pd
+from player_profiles import get_leaderboard
+
+LEADERBOARD_SIZE = 50
+DIFFICULTIES = ("Simple", "Moderate", "Complex")
+
+def display_leaderboard():
+    placeholder = st.empty()
+    with placeholder.container():
+        st.markdown('<div class="royal-banner" role="heading" aria-level="1">The Royal Leaderboard</div>', unsafe_allow_html=True)
+
+        profiles = get_leaderboard().top(LEADERBOARD_SIZE)
+        if not profiles:
+            st.info("No judge has resolved a case yet. Be the first to earn a place on the leaderboard!")
+        else:
+            rows = [
+                [rank, p.name, p.cases] + [p.difficulties.get(d, 0) for d in DIFFICULTIES]
+                + [round(p.avg_questions, 2), round(p.avg_judgment_length), p.last_case]
+                for rank, p in enumerate(profiles, start=1)
+            ]
+            columns = ["Rank", "Judge", "Cases"] + list(DIFFICULTIES) + ["Avg. Questions", "Avg. Judgment Length", "Last Case"]
+            st.dataframe(pd.DataFrame(rows, columns=columns), hide_index=True, use_container_width=True)
+
+        st.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
+        if st.button("🔙 Back to Kingdom", key="leaderboard_back_btn", use_container_width=True):
+            st.session_state.game_stage = "welcome"
+            st.rerun()
@@ -1,10 +1,96 @@
 # ui/scenario.py
+import itertools
 import streamlit as st
-import time
-from ui.styles import sanitize_input
-from llm_integration import get_witness_response_with_llm
+from ui.styles import sanitize_input, fragment
+from ui.welcome import return_to_welcome
+from session_budget import touch_current_session
+from llm_integration import stream_witness_response_with_llm, WitnessStream
 from models import WitnessResponse, InquiryEntry
 
+def stream_witness_answer(character, question):
+    """
+    Shows a question and the witness's answer as it is generated. The answer joins
+    inquiry_history (and uses up a question) only once it has arrived complete.
+    """
+    st.markdown(f"**You asked {character}:** *{question}*")
+    stream = stream_witness_response_with_llm(
+        st.session_state.current_scenario,
+        character,
+        question,
+        history=st.session_state.inquiry_history,
+        difficulty=st.session_state.difficulty
+    )
+    result, streamed = stream, False
+    if isinstance(stream, WitnessStream):
+        with st.spinner(f"{character} is preparing a response..."):
+            pieces = iter(stream)
+            first = next(pieces, "")
+        if first:
+            st.write_stream(itertools.chain([f"**{character} says:** ", first], pieces))
+            streamed = True
+        result = stream.result
+
+    if isinstance(result, WitnessResponse):
+        if not streamed:
+            # None of the answer could be picked out while it arrived; show the parsed reply
+            st.markdown(f"**{character} says:** {result.response}")
+        st.session_state.inquiry_history.append(InquiryEntry(
+            character=character,
+            question=question,
+            response=result.response
+        ))
+        st.session_state.questions_remaining -= 1
+    else:
+        st.error(f"{character} could not answer: {result.get('error', 'no response')}")
+
+@fragment
+def display_inquiry_panel():
+    """
+    Witness buttons, the question box and the transcript. Runs as a fragment: choosing a
+    witness or asking a question reruns only this panel, not the case or the sidebar.
+    """
+    touch_current_session()
+    if not st.session_state.characters:
+        return
+    # Filled in last, so the count already reflects a question asked in this run
+    header = st.empty()
+    pending_question = None
+
+    cols = st.columns(len(st.session_state.characters))
+    for i, char in enumerate(st.session_state.characters):
+        if cols[i].button(f"👤 {char}", key=f"char_{i}"):
+            st.session_state.selected_witness = char
+
+    if st.session_state.selected_witness:
+        st.markdown(f"**Questioning: {st.session_state.selected_witness}**")
+        if st.session_state.questions_remaining > 0:
+            q_input = st.text_input("What is your question, Sire?", key="witness_q_input")
+            if st.button("Ask Question", key="ask_q_btn"):
+                if q_input:
+                    pending_question = q_input
+                else:
+                    st.warning("The King must speak his mind. Please enter a question.")
+        else:
+            st.info("You have exhausted your inquiries for this case.")
+
+    if st.session_state.inquiry_history or pending_question:
+        st.markdown("---")
+        for entry in st.session_state.inquiry_history:
+            # Handle both models and legacy dicts (though new should be models)
+            if isinstance(entry, InquiryEntry):
+                st.markdown(f"**You asked {entry.character}:** *{entry.question}*")
+                st.markdown(f"**{entry.character} says:** {entry.response}")
+            else:
+                st.markdown(f"**You asked {entry['character']}:** *{entry['question']}*")
+                st.markdown(f"**{entry['character']} says:** {entry['response']}")
+        if pending_question:
+            # The new answer types out at the end of the transcript
+            stream_witness_answer(st.session_state.selected_witness, pending_question)
+
+    header.markdown('<section class="royal-card" role="region" aria-label="Summon Witnesses"><span class="royal-label">📜 Summon the Witnesses:</span><br>'
+                    f'You may summon up to {st.session_state.questions_remaining} more witnesses or ask further questions.', unsafe_allow_html=True)
+    st.markdown('</section>', unsafe_allow_html=True)
+
 def display_scenario_and_task():
     placeholder = st.empty()
     with placeholder.container():
@@ -17,59 +103,7 @@ def display_scenario_and_task():
 
             # --- Witness Inquiry Section ---
             if st.session_state.characters:
-                st.markdown('<section class="royal-card" role="region" aria-label="Summon Witnesses"><span class="royal-label">📜 Summon the Witnesses:</span><br>'
-                            f'You may summon up to {st.session_state.questions_remaining} more witnesses or ask further questions.', unsafe_allow_html=True)
-                
-                cols = st.columns(len(st.session_state.characters))
-                for i, char in enumerate(st.session_state.characters):
-                    if cols[i].button(f"👤 {char}", key=f"char_{i}"):
-                        st.session_state.selected_witness = char
-                
-                if st.session_state.selected_witness:
-                    st.markdown(f"**Questioning: {st.session_state.selected_witness}**")
-                    if st.session_state.questions_remaining > 0:
-                        q_input = st.text_input("What is your question, Sire?", key="witness_q_input")
-                        if st.button("Ask Question", key="ask_q_btn"):
-                            if q_input:
-                                with st.spinner(f"{st.session_state.selected_witness} is preparing a response..."):
-                                    resp_data = get_witness_response_with_llm(
-                                        st.session_state.current_scenario,
-                                        st.session_state.selected_witness,
-                                        q_input,
-                                        history=st.session_state.inquiry_history
-                                    )
-                                
-                                response_text = ""
-                                if isinstance(resp_data, WitnessResponse):
-                                    response_text = resp_data.response
-                                elif isinstance(resp_data, dict) and "response" in resp_data:
-                                    response_text = resp_data["response"]
-                                
-                                if response_text:
-                                    st.session_state.inquiry_history.append(InquiryEntry(
-                                        character=st.session_state.selected_witness,
-                                        question=q_input,
-                                        response=response_text
-                                    ))
-                                    st.session_state.questions_remaining -= 1
-                                    st.rerun()
-                            else:
-                                st.warning("The King must speak his mind. Please enter a question.")
-                    else:
-                        st.info("You have exhausted your inquiries for this case.")
-
-                if st.session_state.inquiry_history:
-                    st.markdown("---")
-                    for entry in st.session_state.inquiry_history:
-                        # Handle both models and legacy dicts (though new should be models)
-                        if isinstance(entry, InquiryEntry):
-                            st.markdown(f"**You asked {entry.character}:** *{entry.question}*")
-                            st.markdown(f"**{entry.character} says:** {entry.response}")
-                        else:
-                            st.markdown(f"**You asked {entry['character']}:** *{entry['question']}*")
-                            st.markdown(f"**{entry['character']} says:** {entry['response']}")
-                
-                st.markdown('</section>', unsafe_allow_html=True)
+                display_inquiry_panel()
                 st.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
 
             st.markdown('<section class="royal-card" role="region" aria-label="Your Task"><span class="royal-label">Your Task, {}</span><br>'.format(st.session_state.judge_name) +
@@ -86,20 +120,11 @@ def display_scenario_and_task():
                 if sanitized_judgment:
                     st.session_state.player_judgment = sanitized_judgment
                     st.session_state.game_stage = "judgment_submitted"
-                    placeholder.empty()
-                    time.sleep(0.5)
                     st.rerun()
                 else:
                     st.warning("An empty or invalid scroll offers no wisdom. Please pen your judgment.")
         else:
             st.error("Apologies, the scenario is missing. Let's try to fetch a new one.")
             if st.button("Fetch New Case", key="fetch_new_case_btn"):
-                st.session_state.game_stage = "welcome"
-                st.session_state.player_name = ""
-                st.session_state.current_scenario = None
-                st.session_state.player_judgment = ""
-                st.session_state.ai_analysis = None
-                st.session_state.current_case_id = None
-                placeholder.empty()
-                time.sleep(0.5)
+                return_to_welcome()
                 st.rerun()
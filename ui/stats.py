@@ -0,0 +1,40 @@
+# ui/stats.py
+import streamlit as st
+import pandas as pd
+from archive_analytics import get_archive_analytics
+
+def display_stats():
+    placeholder = st.empty()
+    with placeholder.container():
+        st.markdown('<div class="royal-banner" role="heading" aria-level="1">The Royal Statistics</div>', unsafe_allow_html=True)
+
+        analytics = get_archive_analytics()
+        if not analytics.case_count:
+            st.info("No judgments have been chronicled yet. Resolve some cases to see the kingdom's statistics!")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Cases Resolved", analytics.case_count)
+            col2.metric("Avg. Judgment Length", f"{analytics.average('judgment_len'):.0f} chars")
+            col3.metric("Avg. Witness Questions", f"{analytics.average('questions'):.2f}")
+
+            st.markdown('<span class="royal-label">📅 Judgments Over Time:</span>', unsafe_allow_html=True)
+            per_day = analytics.cases_per_day()
+            if per_day:
+                st.line_chart(pd.DataFrame(per_day, columns=["Date", "Cases"]).set_index("Date"))
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown('<span class="royal-label">⚖️ Cases per Difficulty:</span>', unsafe_allow_html=True)
+                st.bar_chart(pd.DataFrame(analytics.cases_by("difficulty"), columns=["Difficulty", "Cases"]).set_index("Difficulty"))
+                st.markdown('<span class="royal-label">🕵️ Questions per Case by Difficulty:</span>', unsafe_allow_html=True)
+                st.dataframe(pd.DataFrame(analytics.mean_by("difficulty", "questions"), columns=["Difficulty", "Avg. Questions"]), hide_index=True, use_container_width=True)
+            with col2:
+                st.markdown('<span class="royal-label">👑 Most Active Judges:</span>', unsafe_allow_html=True)
+                st.dataframe(pd.DataFrame(analytics.cases_by("judge")[:20], columns=["Judge", "Cases"]), hide_index=True, use_container_width=True)
+                st.markdown('<span class="royal-label">👤 Most Interrogated Characters:</span>', unsafe_allow_html=True)
+                st.dataframe(pd.DataFrame(analytics.top_characters(10), columns=["Character", "Questions"]), hide_index=True, use_container_width=True)
+
+        st.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
+        if st.button("🔙 Back to Kingdom", key="stats_back_btn", use_container_width=True):
+            st.session_state.game_stage = "welcome"
+            st.rerun()
@@ -2,6 +2,9 @@
 import streamlit as st
 import html
 
+# Parts of a page that rerun on their own; st.experimental_fragment became st.fragment in Streamlit 1.37
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
 # --- Custom CSS for Legible, Modern Theme ---
 def inject_custom_css():
     st.markdown(
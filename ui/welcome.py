@@ -1,10 +1,10 @@
 # ui/welcome.py
 import streamlit as st
-import time
 from ui.styles import sanitize_input
-from llm_integration import generate_scenario_with_llm, OPENAI_API_KEY
+from llm_integration import start_case_scenario, OPENAI_API_KEY
 from file_utils import generate_case_id
-from models import Scenario
+from classroom import classrooms
+from models import Scenario, Classroom
 
 def handle_llm_response(response, success_callback, error_message_prefix=""):
     if isinstance(response, Scenario):
@@ -29,6 +29,19 @@ def handle_llm_response(response, success_callback, error_message_prefix=""):
         success_callback(response)
         return True
 
+def return_to_welcome():
+    """
+    Ends the current case and goes back to the welcome screen. The ?case= URL parameter
+    goes with the case, so a reload does not reopen it.
+    """
+    st.session_state.game_stage = "welcome"
+    st.session_state.player_name = ""
+    st.session_state.current_scenario = None
+    st.session_state.player_judgment = ""
+    st.session_state.ai_analysis = None
+    st.session_state.current_case_id = None
+    st.query_params.pop("case", None)
+
 def display_welcome():
     placeholder = st.empty()
     with placeholder.container():
@@ -66,6 +79,17 @@ OPENAI_API_KEY=\"your_actual_api_key_here\"\n```
 
         name_input = st.text_input("Pray, tell us your esteemed name to begin:", key="player_name_input_key", help="Enter your name to start the game.")
 
+        with st.expander("🏫 Classroom"):
+            class_code_input = st.text_input("Classroom code (optional):", key="classroom_code_input_key",
+                                             help="Enter the code your teacher gave you to judge the same case as your class.")
+            if st.button("Create a Classroom Case", key="create_classroom_btn", help="Generate one case for a whole class to judge."):
+                with st.spinner("Preparing a case for the whole court..."):
+                    created = classrooms.create(st.session_state.difficulty)
+                if isinstance(created, Classroom):
+                    st.success(f"Classroom code: **{created.code}** ({created.difficulty}). Share it with your judges.")
+                else:
+                    st.error(f"Failed to create the classroom case: {created['error']}")
+
         st.markdown('<hr class="royal-divider" />', unsafe_allow_html=True)
 
         if st.button("✨ Begin My Tenure as Judge", key="begin_judge_btn", help="Start the game!", type="primary"):
@@ -75,8 +99,18 @@ OPENAI_API_KEY=\"your_actual_api_key_here\"\n```
                 st.session_state.judge_name = f"Judge {sanitized_name}"
                 st.session_state.game_stage = "scenario_presented"
                 st.session_state.current_case_id = generate_case_id()
-                with st.spinner(f"Summoning a new case for {st.session_state.judge_name}... This may take a moment."):
-                    scenario_data = generate_scenario_with_llm(st.session_state.player_name, st.session_state.difficulty)
+                st.session_state.classroom_code = None
+                if class_code_input.strip():
+                    classroom = classrooms.join(class_code_input, st.session_state.player_name)
+                    if classroom is None:
+                        scenario_data = {"error": "No classroom has that code."}
+                    else:
+                        st.session_state.classroom_code = classroom.code
+                        st.session_state.difficulty = classroom.difficulty
+                        scenario_data = classroom.scenario
+                else:
+                    with st.spinner(f"Summoning a new case for {st.session_state.judge_name}... This may take a moment."):
+                        scenario_data = start_case_scenario(st.session_state.player_name, st.session_state.difficulty)
                 
                 def set_scenario(data):
                     if isinstance(data, Scenario):
@@ -90,8 +124,6 @@ OPENAI_API_KEY=\"your_actual_api_key_here\"\n```
                     st.session_state.selected_witness = None
                 
                 if handle_llm_response(scenario_data, set_scenario, "Failed to generate scenario: "):
-                    placeholder.empty()
-                    time.sleep(0.5)
                     st.rerun()
                 else:
                     st.session_state.game_stage = "welcome"